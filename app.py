@@ -1,25 +1,103 @@
-"""This is the dependencies module of our application."""
-from flask_restful import Api
+"""This is the dependencies module of our application.
+
+``create_app()`` sets the application up; ``main()`` runs it on the development server, and
+``wsgi.py`` serves it with gunicorn in production (see ``gunicorn.conf.py``).
+"""
+import importlib
+
+from flask import Flask
+from sqlalchemy.orm import configure_mappers
 
 import config
-from resources import constellations, galaxies, stars, users
+from controllers import admission, hashing, instrumentation, representations
+from controllers.cache import sync_versions
+from controllers.tokens import JWTApi
+from models import sky
 
-def main() -> None:
-    """The application entrypoint."""
 
-    api = Api(config.app)
+# (URL, module in resources, resource class), imported by create_app() rather than with this module
+RESOURCES = (
+    ("/constellations", "constellations", "ConstellationRegisterOrList"),
+    ("/constellations/bulk", "constellations", "ConstellationBulk"),
+    ("/constellations/<int:constellation_id>", "constellations", "Constellation"),
+    ("/constellations/<int:constellation_id>/stars", "constellations", "ConstellationStars"),
+    ("/galaxies", "galaxies", "GalaxyRegisterOrList"),
+    ("/galaxies/bulk", "galaxies", "GalaxyBulk"),
+    ("/galaxies/<int:galaxy_id>", "galaxies", "Galaxy"),
+    ("/galaxies/<int:galaxy_id>/constellations", "galaxies", "GalaxyConstellations"),
+    ("/galaxies/<int:galaxy_id>/tree", "galaxies", "GalaxyTree"),
+    ("/stars", "stars", "StarRegisterOrList"),
+    ("/stars/bulk", "stars", "StarBulk"),
+    ("/stars/near", "stars", "StarNear"),
+    ("/stars/<int:star_id>", "stars", "Star"),
+    ("/users", "users", "UserRegisterOrList"),
+    ("/users/bulk", "users", "UserBulk"),
+    ("/users/<int:user_id>", "users", "User"),
+    ("/login", "users", "UserLogin"),
+    ("/cache", "cache", "CacheStats"),
+    ("/cache/tokens", "cache", "TokenCacheStats"),
+    ("/cache/compressed", "cache", "CompressedCacheStats"),
+    ("/metrics", "metrics", "Metrics"),
+    ("/search", "search", "Search"),
+    ("/stats", "stats", "StatsList"),
+    ("/stats/users/<int:user_id>", "stats", "UserStats"),
+    ("/stats/<string:name>", "stats", "Stats")
+)
+
+_created = False
+
+
+def create_app(multiprocess: bool = False) -> Flask:
+    """Register the resources on the application, configure it and return it.
+
+    With ``multiprocess``, every request first invalidates the cached documents the other server
+    processes wrote to.  The application is set up once; later calls return it as it is.
+    """
+    global _created
+    if _created:
+        return config.app
+    _created = True
+
+    api = JWTApi(config.app, decorators=[instrumentation.resource])
+    api.representations["application/json"] = representations.output_json
 
-    api.add_resource(constellations.ConstellationRegisterOrList, "/constellations")
-    api.add_resource(constellations.Constellation, "/constellations/<int:constellation_id>")
-    api.add_resource(galaxies.GalaxyRegisterOrList, "/galaxies")
-    api.add_resource(galaxies.Galaxy, "/galaxies/<int:galaxy_id>")
-    api.add_resource(stars.StarRegisterOrList, "/stars")
-    api.add_resource(stars.Star, "/stars/<int:star_id>")
-    api.add_resource(users.UserRegisterOrList, "/users")
-    api.add_resource(users.User, "/users/<int:user_id>")
-    api.add_resource(users.UserLogin, "/login")
+    for url, module, name in RESOURCES:
+        resource = getattr(importlib.import_module(f"resources.{module}"), name)
+        api.add_resource(resource, url)
+    # configure the mappers now rather than on the first request, once for every forked worker
+    configure_mappers()
+    with config.app.app_context():
+        sky.require_math_functions()
 
-    config.app.run(port=5000, debug=True)
+    if multiprocess:
+        config.app.before_request(sync_versions)
+
+    rounds = hashing.configure(config.app.config["BCRYPT_ROUNDS"])
+    config.app.logger.info("Hashing passwords with a bcrypt cost of %d.", rounds)
+    encoder = representations.configure(config.app.config["JSON_ENCODER"])
+    config.app.logger.info("Encoding the responses with %s.", encoder)
+    return config.app
+
+
+def after_fork(server_workers: int = 1) -> None:
+    """Reset the state inherited from the parent, in one of the server_workers started by fork()."""
+    with config.app.app_context():
+        # the pooled connections belong to the parent, which keeps using them
+        config.db.engine.dispose(close=False)
+    hashing.after_fork(server_workers)
+    admission.after_fork(server_workers)
+
+
+def worker_exit() -> None:
+    """Release the connections and the hashing processes of a server worker that stops."""
+    with config.app.app_context():
+        config.db.engine.dispose()
+    hashing.shutdown()
+
+
+def main() -> None:
+    """The application entrypoint, on the single-process development server."""
+    create_app().run(port=5000, debug=True)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,14 @@
+ALTER TABLE users ADD COLUMN version INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE users ADD COLUMN updated_at DATETIME;
+ALTER TABLE galaxies ADD COLUMN version INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE galaxies ADD COLUMN updated_at DATETIME;
+ALTER TABLE constellations ADD COLUMN version INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE constellations ADD COLUMN updated_at DATETIME;
+ALTER TABLE stars ADD COLUMN version INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE stars ADD COLUMN updated_at DATETIME;
+
+CREATE TABLE table_versions (
+	table_name VARCHAR(100),
+	version INTEGER NOT NULL DEFAULT 0,
+	PRIMARY KEY (table_name)
+);
@@ -0,0 +1,20 @@
+CREATE UNIQUE INDEX IF NOT EXISTS ix_users_username ON users (username);
+CREATE INDEX IF NOT EXISTS ix_users_last_name ON users (last_name);
+
+CREATE INDEX IF NOT EXISTS ix_galaxies_galaxy_name ON galaxies (galaxy_name);
+CREATE INDEX IF NOT EXISTS ix_galaxies_distance_mly ON galaxies (distance_mly);
+CREATE INDEX IF NOT EXISTS ix_galaxies_added_by ON galaxies (added_by);
+CREATE INDEX IF NOT EXISTS ix_galaxies_verified_by ON galaxies (verified_by);
+
+CREATE INDEX IF NOT EXISTS ix_constellations_constellation_name ON constellations (constellation_name);
+CREATE INDEX IF NOT EXISTS ix_constellations_galaxy_id ON constellations (galaxy_id);
+CREATE INDEX IF NOT EXISTS ix_constellations_added_by ON constellations (added_by);
+CREATE INDEX IF NOT EXISTS ix_constellations_verified_by ON constellations (verified_by);
+
+CREATE INDEX IF NOT EXISTS ix_stars_star_name ON stars (star_name);
+CREATE INDEX IF NOT EXISTS ix_stars_apparent_magnitude ON stars (apparent_magnitude);
+CREATE INDEX IF NOT EXISTS ix_stars_constellation_id_apparent_magnitude ON stars (constellation_id, apparent_magnitude);
+CREATE INDEX IF NOT EXISTS ix_stars_added_by ON stars (added_by);
+CREATE INDEX IF NOT EXISTS ix_stars_verified_by ON stars (verified_by);
+
+ANALYZE;
@@ -0,0 +1,6 @@
+CREATE INDEX IF NOT EXISTS ix_stars_star_type ON stars (star_type);
+CREATE INDEX IF NOT EXISTS ix_stars_spectral_type ON stars (spectral_type);
+CREATE INDEX IF NOT EXISTS ix_galaxies_galaxy_type ON galaxies (galaxy_type);
+CREATE INDEX IF NOT EXISTS ix_galaxies_redshift ON galaxies (redshift);
+
+ANALYZE;
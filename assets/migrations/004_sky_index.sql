@@ -0,0 +1,27 @@
+CREATE VIRTUAL TABLE IF NOT EXISTS stars_sky USING rtree(star_id, ra_min, ra_max, dec_min, dec_max);
+
+CREATE TRIGGER IF NOT EXISTS stars_sky_insert AFTER INSERT ON stars
+WHEN NEW.right_ascension IS NOT NULL AND NEW.declination IS NOT NULL
+BEGIN
+    INSERT INTO stars_sky VALUES (NEW.star_id, NEW.right_ascension, NEW.right_ascension,
+                                  NEW.declination, NEW.declination);
+END;
+
+CREATE TRIGGER IF NOT EXISTS stars_sky_update AFTER UPDATE OF star_id, right_ascension, declination
+ON stars
+BEGIN
+    DELETE FROM stars_sky WHERE star_id = OLD.star_id;
+    INSERT INTO stars_sky SELECT NEW.star_id, NEW.right_ascension, NEW.right_ascension,
+                                 NEW.declination, NEW.declination
+    WHERE NEW.right_ascension IS NOT NULL AND NEW.declination IS NOT NULL;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stars_sky_delete AFTER DELETE ON stars
+BEGIN
+    DELETE FROM stars_sky WHERE star_id = OLD.star_id;
+END;
+
+INSERT INTO stars_sky
+SELECT star_id, right_ascension, right_ascension, declination, declination
+FROM stars
+WHERE right_ascension IS NOT NULL AND declination IS NOT NULL;
@@ -0,0 +1,338 @@
+-- the key has no type, so that it keeps the type of the counted column
+CREATE TABLE IF NOT EXISTS summary_counts (
+    statistic TEXT NOT NULL,
+    key NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (statistic, key)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS stars_per_constellation_insert AFTER INSERT ON stars
+BEGIN
+    INSERT INTO summary_counts SELECT 'stars_per_constellation', NEW.constellation_id, 1
+    WHERE NEW.constellation_id IS NOT NULL
+    ON CONFLICT (statistic, key) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stars_per_constellation_update AFTER UPDATE OF constellation_id ON stars
+WHEN OLD.constellation_id IS NOT NEW.constellation_id
+BEGIN
+    UPDATE summary_counts SET count = count - 1
+    WHERE statistic = 'stars_per_constellation' AND key = OLD.constellation_id;
+    DELETE FROM summary_counts
+    WHERE statistic = 'stars_per_constellation' AND key = OLD.constellation_id AND count = 0;
+    INSERT INTO summary_counts SELECT 'stars_per_constellation', NEW.constellation_id, 1
+    WHERE NEW.constellation_id IS NOT NULL
+    ON CONFLICT (statistic, key) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stars_per_constellation_delete AFTER DELETE ON stars
+BEGIN
+    UPDATE summary_counts SET count = count - 1
+    WHERE statistic = 'stars_per_constellation' AND key = OLD.constellation_id;
+    DELETE FROM summary_counts
+    WHERE statistic = 'stars_per_constellation' AND key = OLD.constellation_id AND count = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stars_per_magnitude_insert AFTER INSERT ON stars
+BEGIN
+    INSERT INTO summary_counts SELECT 'stars_per_magnitude', NEW.apparent_magnitude, 1
+    WHERE NEW.apparent_magnitude IS NOT NULL
+    ON CONFLICT (statistic, key) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stars_per_magnitude_update AFTER UPDATE OF apparent_magnitude ON stars
+WHEN OLD.apparent_magnitude IS NOT NEW.apparent_magnitude
+BEGIN
+    UPDATE summary_counts SET count = count - 1
+    WHERE statistic = 'stars_per_magnitude' AND key = OLD.apparent_magnitude;
+    DELETE FROM summary_counts
+    WHERE statistic = 'stars_per_magnitude' AND key = OLD.apparent_magnitude AND count = 0;
+    INSERT INTO summary_counts SELECT 'stars_per_magnitude', NEW.apparent_magnitude, 1
+    WHERE NEW.apparent_magnitude IS NOT NULL
+    ON CONFLICT (statistic, key) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stars_per_magnitude_delete AFTER DELETE ON stars
+BEGIN
+    UPDATE summary_counts SET count = count - 1
+    WHERE statistic = 'stars_per_magnitude' AND key = OLD.apparent_magnitude;
+    DELETE FROM summary_counts
+    WHERE statistic = 'stars_per_magnitude' AND key = OLD.apparent_magnitude AND count = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stars_per_spectral_type_insert AFTER INSERT ON stars
+BEGIN
+    INSERT INTO summary_counts SELECT 'stars_per_spectral_type', NEW.spectral_type, 1
+    WHERE NEW.spectral_type IS NOT NULL
+    ON CONFLICT (statistic, key) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stars_per_spectral_type_update AFTER UPDATE OF spectral_type ON stars
+WHEN OLD.spectral_type IS NOT NEW.spectral_type
+BEGIN
+    UPDATE summary_counts SET count = count - 1
+    WHERE statistic = 'stars_per_spectral_type' AND key = OLD.spectral_type;
+    DELETE FROM summary_counts
+    WHERE statistic = 'stars_per_spectral_type' AND key = OLD.spectral_type AND count = 0;
+    INSERT INTO summary_counts SELECT 'stars_per_spectral_type', NEW.spectral_type, 1
+    WHERE NEW.spectral_type IS NOT NULL
+    ON CONFLICT (statistic, key) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stars_per_spectral_type_delete AFTER DELETE ON stars
+BEGIN
+    UPDATE summary_counts SET count = count - 1
+    WHERE statistic = 'stars_per_spectral_type' AND key = OLD.spectral_type;
+    DELETE FROM summary_counts
+    WHERE statistic = 'stars_per_spectral_type' AND key = OLD.spectral_type AND count = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS constellations_per_galaxy_insert AFTER INSERT ON constellations
+BEGIN
+    INSERT INTO summary_counts SELECT 'constellations_per_galaxy', NEW.galaxy_id, 1
+    WHERE NEW.galaxy_id IS NOT NULL
+    ON CONFLICT (statistic, key) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS constellations_per_galaxy_update AFTER UPDATE OF galaxy_id ON constellations
+WHEN OLD.galaxy_id IS NOT NEW.galaxy_id
+BEGIN
+    UPDATE summary_counts SET count = count - 1
+    WHERE statistic = 'constellations_per_galaxy' AND key = OLD.galaxy_id;
+    DELETE FROM summary_counts
+    WHERE statistic = 'constellations_per_galaxy' AND key = OLD.galaxy_id AND count = 0;
+    INSERT INTO summary_counts SELECT 'constellations_per_galaxy', NEW.galaxy_id, 1
+    WHERE NEW.galaxy_id IS NOT NULL
+    ON CONFLICT (statistic, key) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS constellations_per_galaxy_delete AFTER DELETE ON constellations
+BEGIN
+    UPDATE summary_counts SET count = count - 1
+    WHERE statistic = 'constellations_per_galaxy' AND key = OLD.galaxy_id;
+    DELETE FROM summary_counts
+    WHERE statistic = 'constellations_per_galaxy' AND key = OLD.galaxy_id AND count = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stars_added_by_user_insert AFTER INSERT ON stars
+BEGIN
+    INSERT INTO summary_counts SELECT 'stars_added_by_user', NEW.added_by, 1
+    WHERE NEW.added_by IS NOT NULL
+    ON CONFLICT (statistic, key) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stars_added_by_user_update AFTER UPDATE OF added_by ON stars
+WHEN OLD.added_by IS NOT NEW.added_by
+BEGIN
+    UPDATE summary_counts SET count = count - 1
+    WHERE statistic = 'stars_added_by_user' AND key = OLD.added_by;
+    DELETE FROM summary_counts
+    WHERE statistic = 'stars_added_by_user' AND key = OLD.added_by AND count = 0;
+    INSERT INTO summary_counts SELECT 'stars_added_by_user', NEW.added_by, 1
+    WHERE NEW.added_by IS NOT NULL
+    ON CONFLICT (statistic, key) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stars_added_by_user_delete AFTER DELETE ON stars
+BEGIN
+    UPDATE summary_counts SET count = count - 1
+    WHERE statistic = 'stars_added_by_user' AND key = OLD.added_by;
+    DELETE FROM summary_counts
+    WHERE statistic = 'stars_added_by_user' AND key = OLD.added_by AND count = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stars_verified_by_user_insert AFTER INSERT ON stars
+BEGIN
+    INSERT INTO summary_counts SELECT 'stars_verified_by_user', NEW.verified_by, 1
+    WHERE NEW.verified_by IS NOT NULL
+    ON CONFLICT (statistic, key) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stars_verified_by_user_update AFTER UPDATE OF verified_by ON stars
+WHEN OLD.verified_by IS NOT NEW.verified_by
+BEGIN
+    UPDATE summary_counts SET count = count - 1
+    WHERE statistic = 'stars_verified_by_user' AND key = OLD.verified_by;
+    DELETE FROM summary_counts
+    WHERE statistic = 'stars_verified_by_user' AND key = OLD.verified_by AND count = 0;
+    INSERT INTO summary_counts SELECT 'stars_verified_by_user', NEW.verified_by, 1
+    WHERE NEW.verified_by IS NOT NULL
+    ON CONFLICT (statistic, key) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stars_verified_by_user_delete AFTER DELETE ON stars
+BEGIN
+    UPDATE summary_counts SET count = count - 1
+    WHERE statistic = 'stars_verified_by_user' AND key = OLD.verified_by;
+    DELETE FROM summary_counts
+    WHERE statistic = 'stars_verified_by_user' AND key = OLD.verified_by AND count = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS constellations_added_by_user_insert AFTER INSERT ON constellations
+BEGIN
+    INSERT INTO summary_counts SELECT 'constellations_added_by_user', NEW.added_by, 1
+    WHERE NEW.added_by IS NOT NULL
+    ON CONFLICT (statistic, key) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS constellations_added_by_user_update AFTER UPDATE OF added_by ON constellations
+WHEN OLD.added_by IS NOT NEW.added_by
+BEGIN
+    UPDATE summary_counts SET count = count - 1
+    WHERE statistic = 'constellations_added_by_user' AND key = OLD.added_by;
+    DELETE FROM summary_counts
+    WHERE statistic = 'constellations_added_by_user' AND key = OLD.added_by AND count = 0;
+    INSERT INTO summary_counts SELECT 'constellations_added_by_user', NEW.added_by, 1
+    WHERE NEW.added_by IS NOT NULL
+    ON CONFLICT (statistic, key) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS constellations_added_by_user_delete AFTER DELETE ON constellations
+BEGIN
+    UPDATE summary_counts SET count = count - 1
+    WHERE statistic = 'constellations_added_by_user' AND key = OLD.added_by;
+    DELETE FROM summary_counts
+    WHERE statistic = 'constellations_added_by_user' AND key = OLD.added_by AND count = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS constellations_verified_by_user_insert AFTER INSERT ON constellations
+BEGIN
+    INSERT INTO summary_counts SELECT 'constellations_verified_by_user', NEW.verified_by, 1
+    WHERE NEW.verified_by IS NOT NULL
+    ON CONFLICT (statistic, key) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS constellations_verified_by_user_update AFTER UPDATE OF verified_by ON constellations
+WHEN OLD.verified_by IS NOT NEW.verified_by
+BEGIN
+    UPDATE summary_counts SET count = count - 1
+    WHERE statistic = 'constellations_verified_by_user' AND key = OLD.verified_by;
+    DELETE FROM summary_counts
+    WHERE statistic = 'constellations_verified_by_user' AND key = OLD.verified_by AND count = 0;
+    INSERT INTO summary_counts SELECT 'constellations_verified_by_user', NEW.verified_by, 1
+    WHERE NEW.verified_by IS NOT NULL
+    ON CONFLICT (statistic, key) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS constellations_verified_by_user_delete AFTER DELETE ON constellations
+BEGIN
+    UPDATE summary_counts SET count = count - 1
+    WHERE statistic = 'constellations_verified_by_user' AND key = OLD.verified_by;
+    DELETE FROM summary_counts
+    WHERE statistic = 'constellations_verified_by_user' AND key = OLD.verified_by AND count = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS galaxies_added_by_user_insert AFTER INSERT ON galaxies
+BEGIN
+    INSERT INTO summary_counts SELECT 'galaxies_added_by_user', NEW.added_by, 1
+    WHERE NEW.added_by IS NOT NULL
+    ON CONFLICT (statistic, key) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS galaxies_added_by_user_update AFTER UPDATE OF added_by ON galaxies
+WHEN OLD.added_by IS NOT NEW.added_by
+BEGIN
+    UPDATE summary_counts SET count = count - 1
+    WHERE statistic = 'galaxies_added_by_user' AND key = OLD.added_by;
+    DELETE FROM summary_counts
+    WHERE statistic = 'galaxies_added_by_user' AND key = OLD.added_by AND count = 0;
+    INSERT INTO summary_counts SELECT 'galaxies_added_by_user', NEW.added_by, 1
+    WHERE NEW.added_by IS NOT NULL
+    ON CONFLICT (statistic, key) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS galaxies_added_by_user_delete AFTER DELETE ON galaxies
+BEGIN
+    UPDATE summary_counts SET count = count - 1
+    WHERE statistic = 'galaxies_added_by_user' AND key = OLD.added_by;
+    DELETE FROM summary_counts
+    WHERE statistic = 'galaxies_added_by_user' AND key = OLD.added_by AND count = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS galaxies_verified_by_user_insert AFTER INSERT ON galaxies
+BEGIN
+    INSERT INTO summary_counts SELECT 'galaxies_verified_by_user', NEW.verified_by, 1
+    WHERE NEW.verified_by IS NOT NULL
+    ON CONFLICT (statistic, key) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS galaxies_verified_by_user_update AFTER UPDATE OF verified_by ON galaxies
+WHEN OLD.verified_by IS NOT NEW.verified_by
+BEGIN
+    UPDATE summary_counts SET count = count - 1
+    WHERE statistic = 'galaxies_verified_by_user' AND key = OLD.verified_by;
+    DELETE FROM summary_counts
+    WHERE statistic = 'galaxies_verified_by_user' AND key = OLD.verified_by AND count = 0;
+    INSERT INTO summary_counts SELECT 'galaxies_verified_by_user', NEW.verified_by, 1
+    WHERE NEW.verified_by IS NOT NULL
+    ON CONFLICT (statistic, key) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS galaxies_verified_by_user_delete AFTER DELETE ON galaxies
+BEGIN
+    UPDATE summary_counts SET count = count - 1
+    WHERE statistic = 'galaxies_verified_by_user' AND key = OLD.verified_by;
+    DELETE FROM summary_counts
+    WHERE statistic = 'galaxies_verified_by_user' AND key = OLD.verified_by AND count = 0;
+END;
+
+-- count the rows already in the tables
+INSERT INTO summary_counts
+SELECT 'stars_per_constellation', constellation_id, COUNT(*)
+FROM stars
+WHERE constellation_id IS NOT NULL
+GROUP BY constellation_id;
+
+INSERT INTO summary_counts
+SELECT 'stars_per_magnitude', apparent_magnitude, COUNT(*)
+FROM stars
+WHERE apparent_magnitude IS NOT NULL
+GROUP BY apparent_magnitude;
+
+INSERT INTO summary_counts
+SELECT 'stars_per_spectral_type', spectral_type, COUNT(*)
+FROM stars
+WHERE spectral_type IS NOT NULL
+GROUP BY spectral_type;
+
+INSERT INTO summary_counts
+SELECT 'constellations_per_galaxy', galaxy_id, COUNT(*)
+FROM constellations
+WHERE galaxy_id IS NOT NULL
+GROUP BY galaxy_id;
+
+INSERT INTO summary_counts
+SELECT 'stars_added_by_user', added_by, COUNT(*)
+FROM stars
+WHERE added_by IS NOT NULL
+GROUP BY added_by;
+
+INSERT INTO summary_counts
+SELECT 'stars_verified_by_user', verified_by, COUNT(*)
+FROM stars
+WHERE verified_by IS NOT NULL
+GROUP BY verified_by;
+
+INSERT INTO summary_counts
+SELECT 'constellations_added_by_user', added_by, COUNT(*)
+FROM constellations
+WHERE added_by IS NOT NULL
+GROUP BY added_by;
+
+INSERT INTO summary_counts
+SELECT 'constellations_verified_by_user', verified_by, COUNT(*)
+FROM constellations
+WHERE verified_by IS NOT NULL
+GROUP BY verified_by;
+
+INSERT INTO summary_counts
+SELECT 'galaxies_added_by_user', added_by, COUNT(*)
+FROM galaxies
+WHERE added_by IS NOT NULL
+GROUP BY added_by;
+
+INSERT INTO summary_counts
+SELECT 'galaxies_verified_by_user', verified_by, COUNT(*)
+FROM galaxies
+WHERE verified_by IS NOT NULL
+GROUP BY verified_by;
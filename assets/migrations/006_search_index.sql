@@ -0,0 +1,91 @@
+CREATE VIRTUAL TABLE IF NOT EXISTS search_index
+USING fts5(name, prefix='2 3', tokenize='unicode61 remove_diacritics 2');
+
+CREATE TRIGGER IF NOT EXISTS stars_search_insert AFTER INSERT ON stars
+BEGIN
+    INSERT INTO search_index (rowid, name)
+    VALUES (NEW.star_id * 4 + 0, NEW.star_name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS stars_search_update AFTER UPDATE OF star_id, star_name ON stars
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.star_id * 4 + 0;
+    INSERT INTO search_index (rowid, name)
+    VALUES (NEW.star_id * 4 + 0, NEW.star_name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS stars_search_delete AFTER DELETE ON stars
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.star_id * 4 + 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS constellations_search_insert AFTER INSERT ON constellations
+BEGIN
+    INSERT INTO search_index (rowid, name)
+    VALUES (NEW.constellation_id * 4 + 1, NEW.constellation_name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS constellations_search_update AFTER UPDATE OF constellation_id, constellation_name ON constellations
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.constellation_id * 4 + 1;
+    INSERT INTO search_index (rowid, name)
+    VALUES (NEW.constellation_id * 4 + 1, NEW.constellation_name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS constellations_search_delete AFTER DELETE ON constellations
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.constellation_id * 4 + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS galaxies_search_insert AFTER INSERT ON galaxies
+BEGIN
+    INSERT INTO search_index (rowid, name)
+    VALUES (NEW.galaxy_id * 4 + 2, NEW.galaxy_name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS galaxies_search_update AFTER UPDATE OF galaxy_id, galaxy_name ON galaxies
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.galaxy_id * 4 + 2;
+    INSERT INTO search_index (rowid, name)
+    VALUES (NEW.galaxy_id * 4 + 2, NEW.galaxy_name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS galaxies_search_delete AFTER DELETE ON galaxies
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.galaxy_id * 4 + 2;
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_search_insert AFTER INSERT ON users
+BEGIN
+    INSERT INTO search_index (rowid, name)
+    VALUES (NEW.user_id * 4 + 3, COALESCE(NEW.first_name, '') || ' ' || COALESCE(NEW.last_name, ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_search_update AFTER UPDATE OF user_id, first_name, last_name ON users
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.user_id * 4 + 3;
+    INSERT INTO search_index (rowid, name)
+    VALUES (NEW.user_id * 4 + 3, COALESCE(NEW.first_name, '') || ' ' || COALESCE(NEW.last_name, ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_search_delete AFTER DELETE ON users
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.user_id * 4 + 3;
+END;
+
+-- index the names already in the tables
+INSERT INTO search_index (rowid, name)
+SELECT stars.star_id * 4 + 0, stars.star_name
+FROM stars;
+
+INSERT INTO search_index (rowid, name)
+SELECT constellations.constellation_id * 4 + 1, constellations.constellation_name
+FROM constellations;
+
+INSERT INTO search_index (rowid, name)
+SELECT galaxies.galaxy_id * 4 + 2, galaxies.galaxy_name
+FROM galaxies;
+
+INSERT INTO search_index (rowid, name)
+SELECT users.user_id * 4 + 3, COALESCE(users.first_name, '') || ' ' || COALESCE(users.last_name, '')
+FROM users;
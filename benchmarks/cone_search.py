@@ -0,0 +1,86 @@
+"""Compares the cost of a cone search through the R*Tree index and by comparing every star.
+
+Run it from the project root with ``python -m benchmarks.cone_search``.  The stars are generated by
+``deps.synthetic`` into a temporary database, with their positions spread uniformly over the sky
+(the synthetic positions are whole numbers, which would pile the stars up on a grid).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import pathlib
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from config import db
+from deps import synthetic
+from models import sky
+from models.stars import Star
+
+
+def make_database(path: str, count: int, seed: int) -> None:
+    """Create the tables, with the R*Tree and its triggers, and insert the synthetic stars."""
+    engine = create_engine(f"sqlite:///{path}")
+    db.metadata.create_all(engine)
+    rng = random.Random(seed)
+    rows = []
+    for row in synthetic.stars(range(1, count + 1), range(1, 101), range(1, 101), seed):
+        star = dict(zip(synthetic.STAR_COLUMNS, row))
+        star["right_ascension"] = rng.uniform(0, 24)
+        star["declination"] = math.degrees(math.asin(rng.uniform(-1, 1)))
+        rows.append(star)
+    with engine.begin() as connection:
+        connection.execute(insert(Star.__table__), rows)
+    engine.dispose()
+
+
+def run(path: str, queries: int, radius: float, limit: int, indexed: bool, seed: int
+        ) -> dict[str, float]:
+    """Run the cone searches around random centers and return the time taken by each."""
+    engine = create_engine(f"sqlite:///{path}")
+    rng = random.Random(seed)
+    found = 0
+    with Session(engine) as session:
+        start = time.perf_counter()
+        for _ in range(queries):
+            ra, dec = rng.uniform(0, 24), rng.uniform(-90, 90)
+            found += len(session.execute(sky.cone(Star, ra, dec, radius, limit, indexed)).all())
+        elapsed = time.perf_counter() - start
+    engine.dispose()
+    return {
+        "query_milliseconds": round(elapsed / queries * 1000, 3),
+        "stars_per_query": round(found / queries, 1)
+    }
+
+
+def main() -> None:
+    """The benchmark entrypoint."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stars", type=int, default=200000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--radius", type=float, default=1.0, help="In degrees.")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=pathlib.Path, help="Also save the results as JSON.")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        path = f"{directory}/stars.sqlite3"
+        make_database(path, args.stars, args.seed)
+        for name, indexed in (("scan", False), ("rtree", True)):
+            # the same centers for both, so they return the same stars
+            results[name] = run(path, args.queries, args.radius, args.limit, indexed, args.seed)
+            print(f"{name:>6}: {results[name]}")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
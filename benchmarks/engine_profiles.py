@@ -0,0 +1,116 @@
+"""Compares the throughput of the SQLite engine profiles under concurrent readers and writers.
+
+Run it from the project root with ``python -m benchmarks.engine_profiles``.  Each profile gets a
+fresh copy of the dummy database from ``assets``; the baseline profile is the engine as it was
+configured before the profiles were introduced (no PRAGMAs, default pool).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import pathlib
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+
+from config import basedir, set_sqlite_pragmas
+from deps import constants
+
+
+PROFILES = {
+    "baseline": ({}, {}),
+    **{name: (constants.SQLITE_PRAGMAS[name], constants.ENGINE_OPTIONS[name])
+       for name in constants.SQLITE_PRAGMAS}
+}
+
+
+def make_database(directory: str, name: str) -> str:
+    """Create a database from the scripts in assets and return its path."""
+    path = f"{directory}/{name}.sqlite3"
+    connection = sqlite3.connect(path)
+    connection.executescript((basedir / "assets" / "create.sql").read_text())
+    connection.executescript((basedir / "assets" / "load.sql").read_text())
+    connection.commit()
+    connection.close()
+    return path
+
+
+def run(path: str, pragmas: dict[str, str | int], options: dict[str, int], readers: int,
+        writers: int, seconds: float) -> dict[str, float]:
+    """Run the readers and writers against the database and return the throughput."""
+    engine = create_engine(f"sqlite:///{path}", **options)
+    event.listen(engine, "connect", lambda connection, _: set_sqlite_pragmas(connection, pragmas))
+    counts = {"reads": 0, "writes": 0, "locked": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def reader(seed: int) -> None:
+        rng = random.Random(seed)
+        done = 0
+        while time.perf_counter() < deadline:
+            with engine.connect() as connection:
+                connection.execute(text("SELECT * FROM stars WHERE star_id = :id"),
+                                   {"id": rng.randint(1, 100)}).fetchall()
+            done += 1
+        with lock:
+            counts["reads"] += done
+
+    def writer(seed: int) -> None:
+        rng = random.Random(seed)
+        done = locked = 0
+        while time.perf_counter() < deadline:
+            try:
+                with engine.begin() as connection:
+                    connection.execute(
+                        text("UPDATE stars SET apparent_magnitude = :m WHERE star_id = :id"),
+                        {"m": rng.randint(-29, 30), "id": rng.randint(1, 100)}
+                    )
+                done += 1
+            except OperationalError:
+                locked += 1
+        with lock:
+            counts["writes"] += done
+            counts["locked"] += locked
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads += [threading.Thread(target=writer, args=(1000 + i,)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    return {
+        "reads_per_second": round(counts["reads"] / seconds, 1),
+        "writes_per_second": round(counts["writes"] / seconds, 1),
+        "locked_errors": counts["locked"]
+    }
+
+
+def main() -> None:
+    """The benchmark entrypoint."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--output", type=pathlib.Path, help="Also save the results as JSON.")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, (pragmas, options) in PROFILES.items():
+            path = make_database(directory, name)
+            results[name] = run(path, pragmas, options, args.readers, args.writers, args.seconds)
+            print(f"{name:>12}: {results[name]}")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Measures the overhead of the request instrumentation.
+
+Run it from the project root with ``python -m benchmarks.instrumentation``.  The same requests
+are sent to the application on the current database through the Flask test client, so that no
+network time is measured, alternately with the instrumentation enabled and disabled: both modes
+share the state of the process and the noise of the machine, which is larger than the overhead.
+Disabled, only the event listeners remain, returning at once.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import pathlib
+import statistics
+import time
+
+import app
+from controllers import instrumentation
+
+
+PATHS = ("/galaxies/1", "/stars/1", "/stars?limit=100", "/galaxies/1/tree", "/stats")
+
+
+def main() -> None:
+    """The benchmark entrypoint."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=2000, help="Requests sent to each path.")
+    parser.add_argument("--output", type=pathlib.Path, help="Also save the results as JSON.")
+    args = parser.parse_args()
+
+    client = app.create_app().test_client()
+    if not instrumentation.enabled:
+        parser.error("The instrumentation is off, unset STARZZ_INSTRUMENTATION.")
+
+    results = {}
+    for path in PATHS:
+        samples: dict[bool, list[float]] = {True: [], False: []}
+        for index in range(args.rounds + 100):
+            instrumentation.enabled = mode = index % 2 == 0
+            start = time.perf_counter()
+            client.get(path)
+            if index >= 100:
+                samples[mode].append(time.perf_counter() - start)
+        instrumentation.enabled = True
+        off, on = (round(statistics.median(samples[mode]) * 1e6, 1) for mode in (False, True))
+        results[path] = {"off_microseconds": off, "on_microseconds": on,
+                         "overhead_microseconds": round(on - off, 1)}
+        print(f"{path:>20}: off {off} us, on {on} us ({on - off:+.1f} us, {(on - off) / off:+.1%})")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Compares the cost of encoding the JSON responses with each encoder.
+
+Run it from the project root with ``python -m benchmarks.json_encoding``.  The documents are the
+``to_full_json()`` and ``to_partial_json()`` outputs of synthetic objects, built in memory with
+their relations so that no database is needed.  The flask_restful baseline is its default
+representation in debug mode, as the application used to run: ``json.dumps(indent=4)``.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import pathlib
+import time
+from collections.abc import Callable
+
+from controllers import representations
+from deps import constants, synthetic
+from models.constellations import Constellation
+from models.galaxies import Galaxy
+from models.stars import Star
+from models.users import User
+
+
+def make_objects(count: int, seed: int) -> tuple[list[Star], list[Constellation]]:
+    """Return the synthetic stars and constellations, with their relations set."""
+    user_ids, galaxy_ids, constellation_ids = range(1, 101), range(1, 11), range(1, 101)
+    users = {row[0]: User(dict(zip(synthetic.USER_COLUMNS, row)))
+             for row in synthetic.users(user_ids, seed, "hash")}
+    galaxies = {row[0]: Galaxy(dict(zip(synthetic.GALAXY_COLUMNS, row)))
+                for row in synthetic.galaxies(galaxy_ids, user_ids, seed)}
+    constellations = []
+    for row in synthetic.constellations(constellation_ids, galaxy_ids, user_ids, seed):
+        obj = Constellation(dict(zip(synthetic.CONSTELLATION_COLUMNS, row)))
+        obj.galaxy_info = galaxies[obj.galaxy_id]
+        obj.constellation_added_info = users[obj.added_by]
+        obj.constellation_verified_info = users.get(obj.verified_by)
+        constellations.append(obj)
+    stars = []
+    for row in synthetic.stars(range(1, count + 1), constellation_ids, user_ids, seed):
+        obj = Star(dict(zip(synthetic.STAR_COLUMNS, row)))
+        obj.constellation_info = constellations[obj.constellation_id - 1]
+        obj.star_added_info = users[obj.added_by]
+        obj.star_verified_info = users.get(obj.verified_by)
+        stars.append(obj)
+    return stars, constellations
+
+
+def flask_restful_debug(obj: object) -> bytes:
+    """Return the document as flask_restful's default representation does in debug mode."""
+    return (json.dumps(obj, indent=4) + "\n").encode()
+
+
+def per_call(function: Callable[[object], bytes], obj: object, seconds: float) -> tuple[float, int]:
+    """Return the microseconds taken by an encoding of the object, and the size of the document."""
+    size = len(function(obj))
+    calls, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        function(obj)
+        calls += 1
+    return round((time.perf_counter() - start) / calls * 1e6, 1), size
+
+
+def main() -> None:
+    """The benchmark entrypoint."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=1.0, help="Time spent on each case.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=pathlib.Path, help="Also save the results as JSON.")
+    args = parser.parse_args()
+
+    stars, constellations = make_objects(constants.MAX_PAGE_SIZE, args.seed)
+    pages = {
+        "stars_full_100": [obj.to_full_json() for obj in stars[:constants.DEFAULT_PAGE_SIZE]],
+        "stars_full_1000": [obj.to_full_json() for obj in stars],
+        "stars_partial_1000": [obj.to_partial_json() for obj in stars],
+        "constellations_full_100": [obj.to_full_json() for obj in constellations]
+    }
+    encoders = {"flask_restful_debug": flask_restful_debug, **representations.ENCODERS}
+
+    results = {}
+    for page, documents in pages.items():
+        body = {"result": documents, "next": None, "message": "Objects successfully retrieved."}
+        results[page] = {}
+        for name, function in encoders.items():
+            microseconds, size = per_call(function, body, args.seconds)
+            results[page][name] = {"microseconds": microseconds, "bytes": size}
+        print(f"{page:>24}: {results[page]}")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
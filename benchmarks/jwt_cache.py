@@ -0,0 +1,65 @@
+"""Compares the cost of authenticating a request with and without the verified token cache.
+
+Run it from the project root with ``python -m benchmarks.jwt_cache``.  Each manager verifies the
+same token, sent in the Authorization header of a request context, the given number of times.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import pathlib
+import time
+
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token, verify_jwt_in_request
+
+from controllers import tokens
+from deps import constants
+
+
+MANAGERS = {
+    "baseline": JWTManager,
+    "cached": tokens.CachingJWTManager
+}
+
+
+def run(manager: type, requests: int) -> dict[str, float]:
+    """Authenticate the requests with the manager and return the cost per request."""
+    app = Flask(__name__)
+    app.config["JWT_SECRET_KEY"] = constants.JWT_SECRET_KEY
+    manager(app)
+    tokens.store.clear()
+
+    with app.app_context():
+        headers = {"Authorization": f"Bearer {create_access_token(identity='benchmark')}"}
+    with app.test_request_context(headers=headers):
+        start = time.perf_counter()
+        for _ in range(requests):
+            verify_jwt_in_request()
+        elapsed = time.perf_counter() - start
+
+    return {
+        "microseconds_per_request": round(elapsed / requests * 1e6, 2),
+        "requests_per_second": round(requests / elapsed, 1)
+    }
+
+
+def main() -> None:
+    """The benchmark entrypoint."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100000)
+    parser.add_argument("--output", type=pathlib.Path, help="Also save the results as JSON.")
+    args = parser.parse_args()
+
+    results = {}
+    for name, manager in MANAGERS.items():
+        results[name] = run(manager, args.requests)
+        print(f"{name:>10}: {results[name]}")
+    results["cache"] = tokens.stats()
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
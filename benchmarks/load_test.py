@@ -0,0 +1,401 @@
+"""Load-tests the application with the requests of the Postman collection.
+
+Run it from the project root with ``python -m benchmarks.load_test``.  A database is created in a
+temporary directory and seeded with ``db generate``, then concurrent clients send the requests of
+assets/starzz.postman_collection.json, drawn as reads, writes and logins in the given ratios, to the
+application in this process or to a local server started on that database.  Each request of the
+collection is reported with its latency percentiles, its throughput and, in process, the number
+of SQL statements it ran.
+
+The ids in the URLs and the bodies are drawn from the seeded rows; the objects are registered with
+ids above them, and only these are updated (for the users) or deleted, so the seeded catalog and
+the passwords the logins use stay as they are.
+"""
+from __future__ import annotations
+
+import argparse
+import collections
+import http.client
+import itertools
+import json
+import os
+import pathlib
+import random
+import signal
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from collections.abc import Callable
+
+from benchmarks.serving import wait_until_up
+from deps import constants
+
+
+ROOT = pathlib.Path(__file__).parent.parent
+COLLECTION = ROOT / "assets" / "starzz.postman_collection.json"
+PASSWORD = "string"
+CATEGORIES = ("read", "write", "login")
+# kind of object -> (primary key, foreign keys -> kind of object they refer to)
+KINDS = {
+    "users": ("user_id", {}),
+    "galaxies": ("galaxy_id", {"added_by": "users", "verified_by": "users"}),
+    "constellations": ("constellation_id", {"galaxy_id": "galaxies", "added_by": "users",
+                                            "verified_by": "users"}),
+    "stars": ("star_id", {"constellation_id": "constellations", "added_by": "users",
+                          "verified_by": "users"})
+}
+SERVERS = {
+    "development": ([sys.executable, "app.py"], 5000),
+    "gunicorn": ([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"],
+                 int(constants.SERVER_BIND.rsplit(":", 1)[1]))
+}
+
+# sends a request (method, path, JSON body, headers) and returns the status and the body
+Send = Callable[[str, str, "dict | None", "dict[str, str]"], "tuple[int, bytes]"]
+
+
+def load_scenarios(path: pathlib.Path) -> list[dict[str, object]]:
+    """Return the requests of the Postman collection, with their kind of object and category."""
+    def requests(items: list[dict]) -> list[dict]:
+        flat = []
+        for item in items:
+            flat += requests(item["item"]) if "item" in item else [item]
+        return flat
+
+    scenarios = []
+    for item in requests(json.loads(path.read_text())["item"]):
+        request = item["request"]
+        url = request["url"]["raw"] if isinstance(request["url"], dict) else request["url"]
+        segments = urllib.parse.urlsplit(url.replace("{{port}}", "0")).path.strip("/").split("/")
+        raw = (request.get("body") or {}).get("raw")
+        scenarios.append({
+            "name": item["name"],
+            "method": request["method"],
+            "kind": segments[0],
+            "has_id": segments[-1].isdigit(),
+            "body": json.loads(raw) if raw else None,
+            "auth": any(header["key"] == "Authorization" for header in request.get("header", [])),
+            "category": ("login" if segments[0] == "login"
+                         else "read" if request["method"] == "GET" else "write")
+        })
+    return scenarios
+
+
+class Dataset:
+    """The ids of the seeded objects and of the objects registered by the run."""
+
+    def __init__(self, sizes: dict[str, int], usernames: list[str]) -> None:
+        self.sizes = sizes
+        self.usernames = usernames
+        self._next_ids = {kind: itertools.count(size + 1) for kind, size in sizes.items()}
+        self._registered: dict[str, dict[int, dict]] = {kind: {} for kind in sizes}
+        self._lock = threading.Lock()
+
+    def seeded(self, kind: str, rng: random.Random) -> int:
+        """Return the id of a random seeded object."""
+        return rng.randint(1, self.sizes[kind])
+
+    def new_id(self, kind: str) -> int:
+        """Return the id of an object to register."""
+        with self._lock:
+            return next(self._next_ids[kind])
+
+    def add(self, kind: str, pk: int, body: dict) -> None:
+        """Record an object registered by the run, once the server registered it."""
+        with self._lock:
+            self._registered[kind][pk] = body
+
+    def take(self, kind: str, rng: random.Random) -> tuple[int, dict] | None:
+        """Remove a random object registered by the run and return it, if there is one.
+
+        The object is added back once updated, so that no other client deletes it meanwhile.
+        """
+        with self._lock:
+            if not self._registered[kind]:
+                return None
+            pk = rng.choice(list(self._registered[kind]))
+            return pk, self._registered[kind].pop(pk)
+
+
+def prepare(scenario: dict, scenarios: list[dict], dataset: Dataset,
+            rng: random.Random) -> tuple[str, str, str, dict | None, tuple | None]:
+    """Return the name, method, path and body of a request of the scenario.
+
+    The last item is the object to record, as (kind, id, body), if the request succeeds.
+    """
+    kind, method = scenario["kind"], scenario["method"]
+    if kind == "login":
+        body = {"username": rng.choice(dataset.usernames), "password": PASSWORD}
+        return scenario["name"], method, "/login", body, None
+
+    pk_column, foreign_keys = KINDS[kind]
+    body = dict(scenario["body"]) if scenario["body"] else None
+    for column, target in foreign_keys.items():
+        if body and body.get(column) is not None:
+            body[column] = dataset.seeded(target, rng)
+
+    if not scenario["has_id"]:
+        if method != "POST":
+            return scenario["name"], method, f"/{kind}", body, None
+        pk = body[pk_column] = dataset.new_id(kind)
+        if kind == "users":
+            body["username"] = f"{body['username']}-{pk}"
+        return scenario["name"], method, f"/{kind}", body, (kind, pk, body)
+
+    # the users are only updated and every object is only deleted if registered by the run
+    if method == "DELETE" or (method == "PUT" and kind == "users"):
+        registered = dataset.take(kind, rng)
+        if registered is None:
+            register = next(other for other in scenarios
+                            if other["kind"] == kind and other["method"] == "POST")
+            return prepare(register, scenarios, dataset, rng)
+        pk, registered_body = registered
+        if method == "DELETE":
+            return scenario["name"], method, f"/{kind}/{pk}", body, None
+        body["username"] = registered_body["username"]
+        return scenario["name"], method, f"/{kind}/{pk}", body, (kind, pk, body)
+    return scenario["name"], method, f"/{kind}/{dataset.seeded(kind, rng)}", body, None
+
+
+def seed(database: pathlib.Path, sizes: dict[str, int], environment: dict[str, str]) -> list[str]:
+    """Create and populate the database with the CLI commands; return the seeded usernames."""
+    command = [sys.executable, "-m", "flask", "--app", "commands", "db"]
+    subprocess.run(command + ["create"], cwd=ROOT, env=environment, check=True,
+                   stdout=subprocess.DEVNULL)
+    subprocess.run(command + ["generate", "--password", PASSWORD,
+                              *itertools.chain.from_iterable((f"--{kind}", str(size))
+                                                             for kind, size in sizes.items())],
+                   cwd=ROOT, env=environment, check=True, stdout=subprocess.DEVNULL)
+    with sqlite3.connect(database) as connection:
+        return [row[0] for row in connection.execute("SELECT username FROM users LIMIT 1000")]
+
+
+def in_process(multiprocess: bool = False) -> tuple[Callable[[], Send], Callable[[], int | None]]:
+    """Return a factory of senders to the application in this process, and the query counter.
+
+    With ``multiprocess``, the application is set up as ``wsgi.py`` does for gunicorn.
+    """
+    from sqlalchemy import event
+
+    import app
+    import config
+
+    application = app.create_app(multiprocess)
+    counter = threading.local()
+
+    def count(*args: object) -> None:
+        counter.queries = getattr(counter, "queries", 0) + 1
+
+    with application.app_context():
+        event.listen(config.db.engine, "before_cursor_execute", count)
+
+    def sender() -> Send:
+        client = application.test_client()
+
+        def send(method: str, path: str, body: dict | None,
+                 headers: dict[str, str]) -> tuple[int, bytes]:
+            response = client.open(path, method=method, json=body, headers=headers)
+            return response.status_code, response.data
+        return send
+
+    def queries() -> int:
+        value, counter.queries = getattr(counter, "queries", 0), 0
+        return value
+
+    return sender, queries
+
+
+def over_http(port: int) -> Callable[[], Send]:
+    """Return a factory of senders to the server listening on the port."""
+    def sender() -> Send:
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+
+        def send(method: str, path: str, body: dict | None,
+                 headers: dict[str, str]) -> tuple[int, bytes]:
+            nonlocal connection
+            headers = {**headers, "Content-Type": "application/json"}
+            try:
+                connection.request(method, path, json.dumps(body) if body is not None else None,
+                                   headers)
+                response = connection.getresponse()
+                return response.status, response.read()
+            except OSError:
+                connection.close()
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+                return 0, b""
+        return send
+
+    return sender
+
+
+def run(sender: Callable[[], Send], queries: Callable[[], int | None], scenarios: list[dict],
+        dataset: Dataset, mix: dict[str, float], clients: int, seconds: float,
+        seed_value: int) -> tuple[dict[str, list[tuple[float, int, int | None]]], float]:
+    """Send requests from concurrent clients for the given time; return the samples by name."""
+    by_category = {category: [s for s in scenarios if s["category"] == category]
+                   for category in CATEGORIES}
+    categories = [category for category in CATEGORIES if mix.get(category) and by_category[category]]
+    weights = [mix[category] for category in categories]
+    samples: dict[str, list[tuple[float, int, int | None]]] = collections.defaultdict(list)
+    lock = threading.Lock()
+
+    def client(index: int, token: str) -> None:
+        rng = random.Random(seed_value + index)
+        send = sender()
+        mine = collections.defaultdict(list)
+        while time.monotonic() < deadline:
+            category = rng.choices(categories, weights)[0]
+            scenario = rng.choice(by_category[category])
+            name, method, path, body, record = prepare(scenario, scenarios, dataset, rng)
+            headers = {"Authorization": f"Bearer {token}"} if scenario["auth"] else {}
+            queries()
+            start = time.perf_counter()
+            status, _ = send(method, path, body, headers)
+            mine[name].append((time.perf_counter() - start, status, queries()))
+            if record is not None and 200 <= status < 300:
+                dataset.add(*record)
+        with lock:
+            for name, values in mine.items():
+                samples[name] += values
+
+    token = login_token(sender, dataset)
+    threads = [threading.Thread(target=client, args=(i, token)) for i in range(clients)]
+    start = time.monotonic()
+    deadline = start + seconds
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.monotonic() - start
+
+
+def login_token(sender: Callable[[], Send], dataset: Dataset) -> str:
+    """Return an access token of a seeded user, for the requests that need one."""
+    status, body = sender()("POST", "/login", {"username": dataset.usernames[0],
+                                               "password": PASSWORD}, {})
+    if status != 200:
+        raise RuntimeError(f"Cannot log in to the application ({status}).")
+    return json.loads(body)["token"]
+
+
+def summarize(samples: list[tuple[float, int, int | None]], seconds: float) -> dict[str, object]:
+    """Return the statistics of the samples of an endpoint."""
+    latencies = sorted(sample[0] for sample in samples)
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    counted = [sample[2] for sample in samples if sample[2] is not None]
+    return {
+        "requests": len(samples),
+        "requests_per_second": round(len(samples) / seconds, 1),
+        "errors": sum(not 200 <= sample[1] < 400 for sample in samples),
+        "p50_ms": round(quantiles[49] * 1000, 2),
+        "p95_ms": round(quantiles[94] * 1000, 2),
+        "p99_ms": round(quantiles[98] * 1000, 2),
+        "queries_per_request": round(statistics.mean(counted), 2) if counted else None
+    }
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    """Parse the ratios of the categories, e.g. "read=90,write=8,login=2"."""
+    mix = {}
+    for part in value.split(","):
+        category, _, weight = part.partition("=")
+        if category not in CATEGORIES:
+            raise argparse.ArgumentTypeError(f"The categories are {', '.join(CATEGORIES)}.")
+        mix[category] = float(weight)
+    return mix
+
+
+def compare(results: dict, baseline: dict) -> None:
+    """Print the changes of the main statistics from a previous run."""
+    print(f"compared with {baseline.get('commit') or 'the baseline'}:")
+    for name, current in {"total": results["total"], **results["endpoints"]}.items():
+        previous = baseline["endpoints"].get(name) if name != "total" else baseline["total"]
+        if not previous:
+            continue
+        changes = ", ".join(f"{key} {previous[key]} -> {current[key]}"
+                            for key in ("requests_per_second", "p50_ms", "p95_ms", "p99_ms",
+                                        "queries_per_request"))
+        print(f"{name:>24}: {changes}")
+
+
+def git_commit() -> str | None:
+    """Return the commit of the working tree, if it is a git repository."""
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                            capture_output=True, text=True)
+    return result.stdout.strip() or None
+
+
+def main() -> None:
+    """The benchmark entrypoint."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--server", choices=["in-process", *SERVERS], default="in-process")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--galaxies", type=int, default=100)
+    parser.add_argument("--constellations", type=int, default=1000)
+    parser.add_argument("--stars", type=int, default=100000)
+    parser.add_argument("--mix", type=parse_mix, default="read=90,write=8,login=2",
+                        help="Ratios of the reads, writes and logins.")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=1.0, help="Seconds not measured.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--bcrypt-rounds", help="bcrypt cost of the seeded and new passwords.")
+    parser.add_argument("--output", type=pathlib.Path, help="Also save the results as JSON.")
+    parser.add_argument("--compare", type=pathlib.Path, help="Results of a previous run.")
+    args = parser.parse_args()
+
+    sizes = {kind: getattr(args, kind) for kind in KINDS}
+    scenarios = load_scenarios(COLLECTION)
+    with tempfile.TemporaryDirectory() as directory:
+        database = pathlib.Path(directory) / "db.sqlite3"
+        os.environ["STARZZ_DATABASE_URI"] = f"sqlite:///{database}"
+        if args.bcrypt_rounds:
+            os.environ["STARZZ_BCRYPT_ROUNDS"] = args.bcrypt_rounds
+        start = time.perf_counter()
+        dataset = Dataset(sizes, seed(database, sizes, os.environ.copy()))
+        print(f"Seeded {sizes} in {time.perf_counter() - start:.1f}s.")
+
+        server = None
+        if args.server == "in-process":
+            sender, queries = in_process()
+        else:
+            command, port = SERVERS[args.server]
+            server = subprocess.Popen(command, cwd=ROOT, start_new_session=True,
+                                      env={**os.environ, "STARZZ_BIND": f"127.0.0.1:{port}"},
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            sender, queries = over_http(port), lambda: None
+        try:
+            if server is not None:
+                wait_until_up(SERVERS[args.server][1])
+            if args.warmup:
+                run(sender, queries, scenarios, dataset, args.mix, args.clients, args.warmup,
+                    args.seed - args.clients)
+            samples, seconds = run(sender, queries, scenarios, dataset, args.mix, args.clients,
+                                   args.seconds, args.seed)
+        finally:
+            if server is not None:
+                os.killpg(server.pid, signal.SIGTERM)
+                server.wait()
+
+    results = {
+        "commit": git_commit(),
+        "parameters": {"server": args.server, "mix": args.mix, "clients": args.clients,
+                       "seconds": args.seconds, "seed": args.seed, "dataset": sizes},
+        "total": summarize(list(itertools.chain.from_iterable(samples.values())), seconds),
+        "endpoints": {name: summarize(samples[name], seconds) for name in sorted(samples)}
+    }
+    for name, summary in {"total": results["total"], **results["endpoints"]}.items():
+        print(f"{name:>24}: {summary}")
+    if args.compare:
+        compare(results, json.loads(args.compare.read_text()))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""Checks the exact number of SQL statements each resource method runs.
+
+Run it from the project root with ``python -m benchmarks.query_counts``, or as a test with
+``python -m pytest`` (``tests/test_query_counts.py``).  A small database is created in a temporary
+directory and seeded with ``db generate``, then every method of every route
+is requested in this process, with the document cache cleared, and the statements of each request
+are counted.  The application is set up as in production, where every request also reads the table
+versions, and its query budgets are checked in raise mode.  It exits with an error if a count
+differs from the one expected below, if an expected count is over the route's QUERY_BUDGETS, if a
+route has no budget or was not requested, or if a request failed, e.g. for running more statements
+than its budget: a count going up is usually an N+1 query, and a count going down is an expectation
+to lower along with the code.  It also checks that a protected method answers 401 to a request
+without a token or with an invalid one, the application running with debug off as in production.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import pathlib
+import sys
+import tempfile
+
+from benchmarks.load_test import PASSWORD, in_process, seed
+from deps import constants
+
+
+SIZES = {"users": 20, "galaxies": 2, "constellations": 10, "stars": 200}
+GALAXY = {"galaxy_name": "Galaxy", "galaxy_type": "Spiral", "distance_mly": 1.0, "redshift": 0.1,
+          "mass_solar": 1.0, "diameter_ly": 1.0, "added_by": 1, "verified_by": None}
+CONSTELLATION = {"constellation_name": "Constellation", "galaxy_id": 1, "added_by": 1,
+                 "verified_by": None}
+STAR = {"star_name": "Star", "star_type": "Pulsar", "constellation_id": 1, "right_ascension": 1.0,
+        "declination": 1.0, "apparent_magnitude": 1.0, "spectral_type": "D", "added_by": 1,
+        "verified_by": None}
+# statements of every request besides those of its resource method: reading the table versions
+SYNC_STATEMENTS = 1
+# (method, path) of protected methods, requested without a token and with an invalid one
+PROTECTED = (("GET", "/users/1"), ("DELETE", "/stars/1"), ("POST", "/galaxies"),
+             ("PUT", "/constellations/1"), ("PATCH", "/users/1"), ("POST", "/stars/bulk"))
+USER = {"username": "query_counts", "email": "query@counts.com", "password": PASSWORD,
+        "first_name": "Query", "last_name": "Counts", "date_of_birth": "1990-01-01"}
+
+
+def requests(username: str) -> list[tuple[str, str, object, int]]:
+    """Return the (method, path, JSON body, statements) of the requests, for every resource method.
+
+    The objects are registered with ids above the seeded ones, then updated and deleted.
+    """
+    calls: list[tuple[str, str, object, int]] = [
+        ("POST", "/login", {"username": username, "password": PASSWORD}, 1)]
+    first = max(SIZES.values()) + 1
+    for kind, pk, body in (("galaxies", "galaxy_id", GALAXY),
+                           ("constellations", "constellation_id", CONSTELLATION),
+                           ("stars", "star_id", STAR),
+                           ("users", "user_id", USER)):
+        calls += [
+            ("GET", f"/{kind}", None, 2),
+            ("GET", f"/{kind}/1", None, 2),
+            ("POST", f"/{kind}", {**body, pk: first}, 2),
+            ("PUT", f"/{kind}/{first}", body, 2),
+            ("PATCH", f"/{kind}/{first}", {key: body[key] for key in list(body)[:1]}, 2),
+            ("DELETE", f"/{kind}/{first}", None, 2),
+            ("POST", f"/{kind}/bulk",
+             [{**body, pk: first + i, **({"username": f"bulk{i}"} if kind == "users" else {})}
+              for i in range(1, 4)], 4)
+        ]
+    calls += [
+        ("GET", "/stars?expand=constellation,added_by", None, 2),
+        ("GET", "/stars?constellation_id=1", None, 2),
+        ("GET", "/constellations?galaxy_id=1", None, 2),
+        ("GET", "/galaxies?galaxy_type=Spiral", None, 2),
+        ("GET", "/stars/1?expand=constellation,added_by", None, 2),
+        ("GET", "/stars/near?ra=10&dec=10&radius=5", None, 2),
+        # more stars than seeded, so the cone widens to the whole sky
+        ("GET", f"/stars/near?ra=10&dec=10&k={constants.MAX_PAGE_SIZE}", None, 6),
+        ("GET", "/constellations/1/stars", None, 3),
+        ("GET", "/galaxies/1/constellations", None, 3),
+        ("GET", "/galaxies/1/tree", None, 4),
+        ("GET", "/search?q=an", None, 2),
+        ("GET", "/stats", None, 0),
+        ("GET", "/stats/stars_per_constellation", None, 1),
+        ("GET", "/stats/users/1", None, 1),
+        ("GET", "/cache", None, 0),
+        ("GET", "/cache/tokens", None, 0),
+        ("GET", "/cache/compressed", None, 0),
+        ("GET", "/metrics", None, 0)
+    ]
+    return calls
+
+
+def prepare(directory: pathlib.Path) -> str:
+    """Seed a database in the directory, set the application up to use it and return a username.
+
+    The environment is read when config is imported, so this runs before the application is.
+    """
+    database = directory / "db.sqlite3"
+    os.environ["STARZZ_DATABASE_URI"] = f"sqlite:///{database}"
+    # a request over its budget fails, and the hashing is cheap
+    os.environ["STARZZ_QUERY_BUDGET_MODE"] = "raise"
+    os.environ["STARZZ_BCRYPT_ROUNDS"] = "4"
+    return seed(database, SIZES, os.environ.copy())[0]
+
+
+def check(username: str) -> tuple[dict[str, list[int]], list[str]]:
+    """Send the requests and return the statement counts by route, and the problems found."""
+    # imported once the database is chosen, which happens when config is imported
+    import app
+    from models import cache
+
+    sender, queries = in_process(multiprocess=True)
+    send = sender()
+    adapter = app.create_app().url_map.bind("localhost")
+    routes = {f"{method} {rule.rule}" for rule in adapter.map.iter_rules()
+              if rule.endpoint != "static" for method in rule.methods - {"HEAD", "OPTIONS"}}
+
+    counts: dict[str, list[int]] = {}
+    problems = []
+    headers: dict[str, str] = {}
+    for method, path, body, expected in requests(username):
+        rule, _ = adapter.match(path.split("?")[0], method, return_rule=True)
+        route = f"{method} {rule.rule}"
+        cache.store.clear()
+        queries()
+        status, data = send(method, path, body, headers)
+        count = queries() - SYNC_STATEMENTS
+        if path == "/login" and status == 200:
+            headers["Authorization"] = f"Bearer {json.loads(data)['token']}"
+        counts.setdefault(route, []).append(count)
+        budget = constants.QUERY_BUDGETS.get(route)
+        if status >= 400:
+            problems.append(f"{method} {path} failed with {status}: {data[:200]!r}")
+        elif count != expected:
+            problems.append(f"{method} {path} ran {count} SQL statements instead of {expected}.")
+        if budget is not None and expected > budget:
+            problems.append(f"{method} {path} runs {expected} SQL statements, over its budget "
+                            f"of {budget}.")
+
+    for method, path in PROTECTED:
+        for token in (None, "invalid"):
+            status, data = send(method, path, None,
+                                {"Authorization": f"Bearer {token}"} if token else {})
+            if status != 401:
+                problems.append(f"{method} {path} answered {status} instead of 401 "
+                                f"{'with an invalid' if token else 'without a'} token: {data[:200]!r}")
+
+    problems += [f"{route} has no query budget." for route in sorted(routes)
+                 if route not in constants.QUERY_BUDGETS]
+    problems += [f"{route} was not requested." for route in sorted(routes) if route not in counts]
+    problems += [f"{route} is not a route of the application." for route in constants.QUERY_BUDGETS
+                 if route not in routes]
+    return counts, problems
+
+
+def main() -> None:
+    """The benchmark entrypoint."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", type=pathlib.Path, help="Also save the counts as JSON.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        counts, problems = check(prepare(pathlib.Path(directory)))
+
+    for route, route_counts in sorted(counts.items()):
+        budget = constants.QUERY_BUDGETS.get(route)
+        print(f"{route:>52}: {', '.join(map(str, route_counts))} (budget {budget})")
+    if args.output:
+        args.output.write_text(json.dumps(counts, indent=2))
+    if problems:
+        sys.exit("\n".join(problems))
+    print("Every request ran the expected SQL statements.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Compares the cost of parsing a request with reqparse and with the precompiled schemas.
+
+Run it from the project root with ``python -m benchmarks.request_parsing``.  The reqparse baseline
+builds a ``RequestParser`` from the same arguments on every request, as the resources used to do.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import pathlib
+import time
+from collections.abc import Callable
+
+from flask import Flask
+from flask_restful import reqparse
+
+from resources import schemas, stars
+
+
+BODY = {
+    "star_id": 1,
+    "star_name": "Sirius",
+    "star_type": "Main sequence",
+    "constellation_id": 1,
+    "right_ascension": 101,
+    "declination": -16,
+    "apparent_magnitude": -1,
+    "spectral_type": "A1V",
+    "added_by": 1,
+    "verified_by": 2
+}
+
+
+def make_parser(schema: schemas.Schema) -> reqparse.RequestParser:
+    """Return a RequestParser with the arguments of the schema."""
+    parser = reqparse.RequestParser(bundle_errors=True)
+    for argument in schema.arguments:
+        parser.add_argument(argument.name, type=argument.type, required=argument.required,
+                            help=argument.help, default=argument.default,
+                            location=schema.location)
+    return parser
+
+
+def per_call(function: Callable[[], object], calls: int) -> float:
+    """Return the microseconds taken by a call of the function."""
+    start = time.perf_counter()
+    for _ in range(calls):
+        function()
+    return round((time.perf_counter() - start) / calls * 1e6, 2)
+
+
+def main() -> None:
+    """The benchmark entrypoint."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--rows", type=int, default=10000, help="Rows of the bulk body.")
+    parser.add_argument("--output", type=pathlib.Path, help="Also save the results as JSON.")
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    with app.test_request_context(method="POST", json=BODY):
+        assert make_parser(stars.SCHEMA).parse_args() == stars.SCHEMA.parse()
+        results = {
+            "request_microseconds": {
+                "reqparse": per_call(lambda: make_parser(stars.SCHEMA).parse_args(), args.requests),
+                "schema": per_call(stars.SCHEMA.parse, args.requests)
+            }
+        }
+
+    rows = [dict(BODY, star_id=i) for i in range(args.rows)]
+    results["bulk_row_microseconds"] = {
+        "schema": round(per_call(lambda: stars.SCHEMA.validate_many(rows), 1) / args.rows, 2)
+    }
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Compares the throughput of the development server and of gunicorn serving the application.
+
+Run it from the project root with ``python -m benchmarks.serving``.  Each server is started in
+turn on the current database, as ``python app.py`` does and as ``gunicorn -c gunicorn.conf.py``
+does, then concurrent clients request a few read-only endpoints for the given time.
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import pathlib
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from deps import constants
+
+
+PATHS = ("/galaxies/1", "/constellations?limit=100", "/stars?limit=100", "/stats")
+ROOT = pathlib.Path(__file__).parent.parent
+
+
+def wait_until_up(port: int, seconds: float = 30.0) -> None:
+    """Wait until the server accepts requests."""
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", PATHS[0])
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"The server on port {port} did not start.")
+
+
+def hammer(port: int, clients: int, seconds: float) -> dict[str, float]:
+    """Request the PATHS from concurrent clients and return the throughput and the latencies."""
+    latencies: list[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def client(offset: int) -> None:
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        mine, failed, i = [], 0, offset
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                connection.request("GET", PATHS[i % len(PATHS)])
+                response = connection.getresponse()
+                response.read()
+                failed += response.status != 200
+            except OSError:
+                failed += 1
+                connection.close()
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            mine.append(time.perf_counter() - start)
+            i += 1
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {"requests_per_second": round(len(latencies) / seconds, 1),
+            "p50_ms": round(quantiles[49] * 1000, 2), "p99_ms": round(quantiles[98] * 1000, 2),
+            "errors": errors[0]}
+
+
+def serve(command: list[str], port: int, clients: int, seconds: float) -> dict[str, float]:
+    """Start the server, measure it and stop it."""
+    environment = {**os.environ, "STARZZ_BIND": f"127.0.0.1:{port}"}
+    server = subprocess.Popen(command, cwd=ROOT, env=environment, start_new_session=True,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_up(port)
+        hammer(port, clients, 1.0)
+        return hammer(port, clients, seconds)
+    finally:
+        os.killpg(server.pid, signal.SIGTERM)
+        server.wait()
+
+
+def main() -> None:
+    """The benchmark entrypoint."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10.0, help="Time spent on each server.")
+    parser.add_argument("--output", type=pathlib.Path, help="Also save the results as JSON.")
+    args = parser.parse_args()
+
+    servers = {
+        "development": ([sys.executable, "app.py"], 5000),
+        "gunicorn": ([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"],
+                     int(constants.SERVER_BIND.rsplit(":", 1)[1]))
+    }
+    results = {}
+    for name, (command, port) in servers.items():
+        results[name] = serve(command, port, args.clients, args.seconds)
+        print(f"{name:>12}: {results[name]}")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Measures the startup of the application and checks it against the budget.
+
+Run it from the project root with ``python -m benchmarks.startup``.  Each run is a fresh
+interpreter, as a server worker or a CLI invocation would be: it reports the import times
+(``python -X importtime``) grouped by package, and the milliseconds taken to import the
+application, to set it up with ``create_app()`` and to handle the first requests.  With
+``--check``, it exits with an error if a phase is over its STARTUP_BUDGET_MS.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import pathlib
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from deps import constants
+
+
+ROOT = pathlib.Path(__file__).parent.parent
+FIRST_PARTY = ("app", "commands", "config", "controllers", "deps", "models", "resources", "wsgi")
+PATH = "/galaxies/1"
+
+PHASES = f"""
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+client = application.test_client()
+client.get("{PATH}")
+first = time.perf_counter()
+client.get("{PATH}")
+second = time.perf_counter()
+print(json.dumps({{"import": imported - start, "create_app": created - imported,
+                  "first_request": first - created, "second_request": second - first}}))
+"""
+
+
+def run(*arguments: str) -> subprocess.CompletedProcess:
+    """Run a fresh interpreter in the project root."""
+    return subprocess.run([sys.executable, *arguments], cwd=ROOT, capture_output=True, text=True,
+                          check=True)
+
+
+def import_times(module: str) -> dict[str, dict[str, float]]:
+    """Return the milliseconds spent importing each package, and each first party module."""
+    packages: dict[str, float] = defaultdict(float)
+    modules = {}
+    for line in run("-X", "importtime", "-c", f"import {module}").stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = (field.strip() for field in line[12:].split("|"))
+        package = name.split(".")[0]
+        packages[package] += int(own) / 1000
+        if package in FIRST_PARTY:
+            modules[name] = int(own) / 1000
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+    return {
+        "packages": {name: round(ms, 1) for name, ms in ranked},
+        "first_party_modules": {name: round(ms, 1) for name, ms in
+                                sorted(modules.items(), key=lambda item: item[1], reverse=True)},
+        "first_party_total": round(sum(packages[name] for name in FIRST_PARTY), 1),
+        "total": round(sum(packages.values()), 1)
+    }
+
+
+def phases(runs: int) -> dict[str, float]:
+    """Return the median milliseconds of each startup phase, over the runs."""
+    samples = [json.loads(run("-c", PHASES).stdout.splitlines()[-1]) for _ in range(runs)]
+    return {phase: round(statistics.median(sample[phase] for sample in samples) * 1000, 1)
+            for phase in samples[0]}
+
+
+def main() -> None:
+    """The benchmark entrypoint."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Interpreters started per phase.")
+    parser.add_argument("--top", type=int, default=10, help="Packages and modules listed.")
+    parser.add_argument("--check", action="store_true", help="Fail if over the budget.")
+    parser.add_argument("--output", type=pathlib.Path, help="Also save the results as JSON.")
+    args = parser.parse_args()
+
+    imports = {module: import_times(module) for module in ("app", "commands")}
+    for module, times in imports.items():
+        print(f"import {module}: {times['total']} ms, {times['first_party_total']} ms first party")
+        for name, ms in list(times["packages"].items())[:args.top]:
+            print(f"{name:>28}: {ms} ms")
+    print("first party modules of app:")
+    for name, ms in list(imports["app"]["first_party_modules"].items())[:args.top]:
+        print(f"{name:>28}: {ms} ms")
+
+    timings = phases(args.runs)
+    timings["first_party_import"] = imports["app"]["first_party_total"]
+    over = {phase: ms for phase, ms in timings.items()
+            if ms > constants.STARTUP_BUDGET_MS.get(phase, float("inf"))}
+    for phase, ms in timings.items():
+        budget = constants.STARTUP_BUDGET_MS.get(phase)
+        print(f"{phase:>28}: {ms} ms" + (f" (budget {budget} ms)" if budget else ""))
+
+    if args.output:
+        args.output.write_text(json.dumps({"imports": imports, "phases": timings}, indent=2))
+    if args.check and over:
+        sys.exit(f"Over the startup budget: {over}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""This module defines the flask CLI commands to create and populate the database.
+
+Run them with ``flask --app commands db <command>``.
+"""
+from __future__ import annotations
+
+import pathlib
+import sqlite3
+import time
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import func
+
+from config import app, db
+from controllers import hashing
+from deps import synthetic
+from models import (constellations, galaxies, loader, migrations, query_plans, search, stars,
+                    stats, users)
+
+
+db_cli = AppGroup("db", help="Create and populate the database.")
+
+
+@db_cli.command("create")
+def create() -> None:
+    """Create the tables that do not exist yet, from the models."""
+    db.create_all()
+    migrations.stamp()
+    click.echo("Tables created.")
+
+
+@db_cli.command("migrate")
+def migrate() -> None:
+    """Apply the pending migrations in assets/migrations."""
+    names = migrations.migrate()
+    for name in names:
+        click.echo(f"Applied {name}.")
+    if not names:
+        click.echo("The database is up to date.")
+
+
+@db_cli.command("check-plans")
+def check_plans() -> None:
+    """Fail if a query of the models scans a whole table."""
+    problems = query_plans.check()
+    for problem in problems:
+        click.echo(problem, err=True)
+    if problems:
+        raise SystemExit(1)
+    click.echo("No full table scans found.")
+
+
+@db_cli.command("check-migrations")
+def check_migrations() -> None:
+    """Fail if a migration creates other tables or triggers than the models."""
+    problems = migrations.check()
+    for problem in problems:
+        click.echo(problem, err=True)
+    if problems:
+        raise SystemExit(1)
+    click.echo("The migrations match the models.")
+
+
+@db_cli.command("rebuild-stats")
+def rebuild_stats() -> None:
+    """Recompute the summary tables of the statistics from the counted tables."""
+    start = time.perf_counter()
+    stats.rebuild()
+    click.echo(f"Statistics rebuilt in {time.perf_counter() - start:.1f}s.")
+
+
+@db_cli.command("check-stats")
+def check_stats() -> None:
+    """Fail if the summary tables differ from a GROUP BY of the counted tables."""
+    problems = stats.check()
+    for problem in problems:
+        click.echo(problem, err=True)
+    if problems:
+        raise SystemExit(1)
+    click.echo("The statistics are consistent.")
+
+
+@db_cli.command("rebuild-search")
+def rebuild_search() -> None:
+    """Index the names of every star, constellation, galaxy and user again for /search."""
+    start = time.perf_counter()
+    search.rebuild()
+    click.echo(f"Search index rebuilt in {time.perf_counter() - start:.1f}s.")
+
+
+@db_cli.command("load")
+@click.argument("table", type=click.Choice(["users", "galaxies", "constellations", "stars"]))
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+def load(table: str, path: str) -> None:
+    """Bulk load a CSV or NDJSON file into TABLE.
+
+    The columns are taken from the CSV header, or from the keys of the first NDJSON object.
+    """
+    if pathlib.Path(path).suffix.lower() in (".ndjson", ".jsonl"):
+        columns, rows = loader.read_ndjson(path)
+    else:
+        columns, rows = loader.read_csv(path)
+
+    start = time.perf_counter()
+    try:
+        count = loader.load_rows(table, columns, rows)
+    except ValueError as e:
+        raise click.BadParameter(str(e)) from e
+    except sqlite3.IntegrityError as e:
+        raise click.ClickException(f"Nothing was loaded: {e}.") from e
+    click.echo(f"Loaded {count} rows into {table} in {time.perf_counter() - start:.1f}s.")
+
+
+@db_cli.command("generate")
+@click.option("--users", "n_users", type=click.IntRange(min=1), default=1000,
+              show_default=True)
+@click.option("--galaxies", "n_galaxies", type=click.IntRange(min=1), default=1000,
+              show_default=True)
+@click.option("--constellations", "n_constellations", type=click.IntRange(min=1), default=10000,
+              show_default=True)
+@click.option("--stars", "n_stars", type=click.IntRange(min=0), default=1000000,
+              show_default=True)
+@click.option("--seed", default=0, show_default=True, help="Seed of the random generator.")
+@click.option("--password", default="string", show_default=True,
+              help="Password of every generated user.")
+def generate(n_users: int, n_galaxies: int, n_constellations: int, n_stars: int, seed: int,
+             password: str) -> None:
+    """Generate a reproducible synthetic catalog, appended after the existing rows."""
+    hashing.configure(app.config["BCRYPT_ROUNDS"])
+    password_hash = hashing.bcrypt(password)
+
+    def ids(model: type, count: int) -> range:
+        pk = model.__mapper__.primary_key[0]
+        first = (db.session.query(func.max(pk)).scalar() or 0) + 1
+        return range(first, first + count)
+
+    user_ids = ids(users.User, n_users)
+    galaxy_ids = ids(galaxies.Galaxy, n_galaxies)
+    constellation_ids = ids(constellations.Constellation, n_constellations)
+    star_ids = ids(stars.Star, n_stars)
+    tables = [
+        ("users", synthetic.USER_COLUMNS, synthetic.users(user_ids, seed, password_hash)),
+        ("galaxies", synthetic.GALAXY_COLUMNS, synthetic.galaxies(galaxy_ids, user_ids, seed)),
+        ("constellations", synthetic.CONSTELLATION_COLUMNS,
+         synthetic.constellations(constellation_ids, galaxy_ids, user_ids, seed)),
+        ("stars", synthetic.STAR_COLUMNS,
+         synthetic.stars(star_ids, constellation_ids, user_ids, seed))
+    ]
+    for table, columns, rows in tables:
+        start = time.perf_counter()
+        count = loader.load_rows(table, columns, rows)
+        click.echo(f"Generated {count} rows into {table} in {time.perf_counter() - start:.1f}s.")
+
+
+app.cli.add_command(db_cli)
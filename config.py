@@ -1,23 +1,73 @@
 """This module contains the configuration of the Flask application."""
+from __future__ import annotations
+
+import os
 import pathlib
+import sqlite3
 from datetime import timedelta
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from flask_jwt_extended import JWTManager
+from sqlalchemy import event
 
+from controllers import compression, instrumentation
+from controllers.tokens import CachingJWTManager, invalid_token
 from deps import constants
 
 
 basedir = pathlib.Path(__file__).parent.resolve()
+environment = os.environ.get("STARZZ_ENV", constants.DEFAULT_ENVIRONMENT)
 app = Flask(__name__)
 
 # specify the location of the database file
-app.config["SQLALCHEMY_DATABASE_URI"] = constants.SQLITE_URI.format(basedir)
+app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("STARZZ_DATABASE_URI",
+                                                       constants.SQLITE_URI.format(basedir))
 # turns the SQLAlchemy event system off
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+# specify the connection pool options and the PRAGMAs set on every new SQLite connection
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = constants.ENGINE_OPTIONS[environment]
+app.config["SQLITE_PRAGMAS"] = constants.SQLITE_PRAGMAS[environment]
 # specify the JWT secret key and token expiration (in minutes)
 app.config["JWT_SECRET_KEY"] = constants.JWT_SECRET_KEY
 app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(minutes=constants.JWT_ACCESS_TOKEN_EXPIRES)
+# specify the bcrypt cost, or "auto" to pick the one hashing in about BCRYPT_TARGET_SECONDS
+app.config["BCRYPT_ROUNDS"] = os.environ.get("STARZZ_BCRYPT_ROUNDS", constants.BCRYPT_ROUNDS)
+# specify the encoder of the JSON responses, or "auto" for the fastest one installed
+app.config["JSON_ENCODER"] = os.environ.get("STARZZ_JSON_ENCODER", constants.JSON_ENCODER)
+# specify the zlib level and the minimum size of the compressed responses
+app.config["COMPRESSION_LEVEL"] = int(os.environ.get("STARZZ_COMPRESSION_LEVEL",
+                                                     constants.COMPRESSION_LEVEL))
+app.config["COMPRESSION_MIN_BYTES"] = constants.COMPRESSION_MIN_BYTES
+# measure the requests for the Server-Timing header and /metrics
+app.config["INSTRUMENTATION"] = os.environ.get("STARZZ_INSTRUMENTATION",
+                                               constants.INSTRUMENTATION) == "on"
+# check the statements of each request against the budget of its route: "warn", "raise" or "off"
+app.config["QUERY_BUDGET_MODE"] = os.environ.get("STARZZ_QUERY_BUDGET_MODE",
+                                                 constants.QUERY_BUDGET_MODE)
+# log the statements of the requests taking at least this many seconds
+app.config["SLOW_QUERY_SECONDS"] = float(os.environ.get("STARZZ_SLOW_QUERY_SECONDS",
+                                                        constants.SLOW_QUERY_SECONDS))
 
 db = SQLAlchemy(app)
-jwt = JWTManager(app)
+jwt = CachingJWTManager(app)
+jwt.invalid_token_loader(invalid_token)
+if app.config["INSTRUMENTATION"]:
+    # installed first, so that its after_request hook runs last and measures the compression too
+    instrumentation.install(app, db)
+app.after_request(compression.compress)
+
+
+def set_sqlite_pragmas(dbapi_connection: sqlite3.Connection, pragmas: dict[str, str | int]) -> None:
+    """Set the PRAGMAs on a new SQLite connection."""
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+    cursor.close()
+
+
+def on_connect(dbapi_connection: sqlite3.Connection, connection_record: object) -> None:
+    """Apply the configured PRAGMAs to every new connection of the engine."""
+    set_sqlite_pragmas(dbapi_connection, app.config["SQLITE_PRAGMAS"])
+
+
+with app.app_context():
+    event.listen(db.engine, "connect", on_connect)
@@ -0,0 +1,74 @@
+"""Module limiting how many expensive requests run at once, shedding the excess load."""
+from __future__ import annotations
+
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from deps import constants
+
+
+class Gate:
+    """Lets a fixed number of requests run at once, and a bounded number wait for their turn."""
+
+    def __init__(self, max_running: int, max_waiting: int, wait_seconds: float) -> None:
+        self.max_waiting = max_waiting
+        self.wait_seconds = wait_seconds
+        self._slots = threading.BoundedSemaphore(max_running)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self.rejected = 0
+
+    def acquire(self) -> bool:
+        """Wait for a slot and return whether one was obtained."""
+        with self._lock:
+            if self._waiting >= self.max_waiting:
+                self.rejected += 1
+                return False
+            self._waiting += 1
+
+        acquired = False
+        try:
+            acquired = self._slots.acquire(timeout=self.wait_seconds)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+                if not acquired:
+                    self.rejected += 1
+        return acquired
+
+    def release(self) -> None:
+        """Give back a slot obtained with acquire()."""
+        self._slots.release()
+
+    @contextmanager
+    def admit(self) -> Iterator[bool]:
+        """Hold a slot for the duration of the block, which receives whether one was obtained."""
+        admitted = self.acquire()
+        try:
+            yield admitted
+        finally:
+            if admitted:
+                self.release()
+
+    def stats(self) -> dict[str, int]:
+        """Return the number of requests waiting and rejected."""
+        return {
+            "waiting": self._waiting,
+            "rejected": self.rejected
+        }
+
+
+login = Gate(constants.LOGIN_MAX_RUNNING, constants.LOGIN_MAX_WAITING, constants.LOGIN_WAIT_SECONDS)
+
+
+def after_fork(server_workers: int = 1) -> None:
+    """Share the login limits among the ``server_workers`` processes started by fork().
+
+    Each server worker admits its part of LOGIN_MAX_RUNNING and LOGIN_MAX_WAITING, at least one,
+    so that the limits hold for the whole server rather than for each worker.
+    """
+    global login
+    login = Gate(max(constants.LOGIN_MAX_RUNNING // server_workers, 1),
+                 max(constants.LOGIN_MAX_WAITING // server_workers, 1),
+                 constants.LOGIN_WAIT_SECONDS)
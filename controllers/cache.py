@@ -0,0 +1,40 @@
+"""This module defines the functions called when the CacheStats resource is invoked."""
+from __future__ import annotations
+
+from http import HTTPStatus
+
+from controllers import compression, instrumentation, tokens
+from models import cache, versions
+
+
+def handle_get() -> tuple[dict[str, str | dict[str, int]], int]:
+    """Handle the GET request."""
+    return {
+        "result": cache.stats(),
+        "message": "Cache statistics successfully retrieved."
+    }, HTTPStatus.OK
+
+
+def handle_get_tokens() -> tuple[dict[str, str | dict[str, int]], int]:
+    """Handle the GET request for the token cache."""
+    return {
+        "result": tokens.stats(),
+        "message": "Token cache statistics successfully retrieved."
+    }, HTTPStatus.OK
+
+
+def handle_get_compressed() -> tuple[dict[str, str | dict[str, int]], int]:
+    """Handle the GET request for the cache of compressed bodies."""
+    return {
+        "result": compression.stats(),
+        "message": "Compressed body cache statistics successfully retrieved."
+    }, HTTPStatus.OK
+
+
+def sync_versions() -> None:
+    """Invalidate the documents written by the other server processes, as a before_request hook.
+
+    Its statement is not part of the query budget of the route, so it is allowed on top of it.
+    """
+    instrumentation.allow_queries(1)
+    cache.sync(versions.current_all())
@@ -0,0 +1,123 @@
+"""Module for compressing the responses with the content coding negotiated by Accept-Encoding.
+
+gzip and deflate are the content codings the standard library implements, both through zlib.  A
+streamed response is compressed chunk by chunk, flushing after each one so the client still gets
+every batch as soon as it is fetched.  The compressed bodies of the responses that carry an ETag,
+i.e. the documents that are also in the read-through cache, are cached as well, keyed by a digest
+of the body, so a document is compressed once rather than on every request.  Their ETag is suffixed
+with the content coding, e.g. ``W/"<tag>-gzip"``, since each coding is another representation of
+the document and caches must not serve one for the other.
+"""
+from __future__ import annotations
+
+import hashlib
+import zlib
+from collections.abc import Iterable, Iterator
+
+from flask import Response, current_app, request
+
+from controllers import instrumentation
+from deps import constants
+from models.cache import MISSING, LRUCache
+
+
+# content coding -> zlib wbits, in the order of preference
+CODINGS = {
+    "gzip": 16 + zlib.MAX_WBITS,
+    "deflate": zlib.MAX_WBITS
+}
+
+store = LRUCache(constants.COMPRESSION_CACHE_MAX_ENTRIES, constants.CACHE_TTL_SECONDS)
+
+
+def _compressible(response: Response) -> bool:
+    """Check whether the response is worth compressing."""
+    return (response.status_code not in (204, 304)
+            and 200 <= response.status_code
+            and not response.direct_passthrough
+            and "Content-Encoding" not in response.headers
+            and response.mimetype in constants.COMPRESSION_MIMETYPES)
+
+
+def coded_etag(tag: str, coding: str) -> str:
+    """Return the ETag of the representation of a document compressed with the content coding."""
+    return f"{tag}-{coding}"
+
+
+def _not_modified(response: Response) -> Response:
+    """Send the suffixed ETag in a 304 response if the client's cached copy is compressed."""
+    response.vary.add("Accept-Encoding")
+    tag, weak = response.get_etag()
+    coding = request.accept_encodings.best_match(list(CODINGS))
+    if tag and coding and request.if_none_match.contains_weak(coded_etag(tag, coding)):
+        response.set_etag(coded_etag(tag, coding), weak)
+    return response
+
+
+def _compress(body: bytes, coding: str, level: int) -> bytes:
+    """Return the body compressed with the content coding."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, CODINGS[coding])
+    return compressor.compress(body) + compressor.flush()
+
+
+def _compressed_chunks(chunks: Iterable[bytes | str], coding: str, level: int) -> Iterator[bytes]:
+    """Yield the compressed chunks of a streamed body, flushing after each chunk."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, CODINGS[coding])
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        # like the WSGI server would, close the stream, e.g. when the client disconnects
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+@instrumentation.timed("compress")
+def compress(response: Response) -> Response:
+    """Compress the response if the client accepts a content coding, as an after_request hook.
+
+    Bodies smaller than COMPRESSION_MIN_BYTES are sent as they are, and 304 responses carry the
+    ETag of the copy the client named, compressed or not.
+    """
+    if response.status_code == 304:
+        return _not_modified(response)
+    if not _compressible(response):
+        return response
+    response.vary.add("Accept-Encoding")
+    coding = request.accept_encodings.best_match(list(CODINGS))
+    if coding is None:
+        return response
+    level = current_app.config["COMPRESSION_LEVEL"]
+
+    if response.is_streamed:
+        response.response = _compressed_chunks(response.response, coding, level)
+        response.headers.pop("Content-Length", None)
+    else:
+        body = response.get_data()
+        if len(body) < current_app.config["COMPRESSION_MIN_BYTES"]:
+            return response
+        if "ETag" in response.headers:
+            key = (coding, level, hashlib.blake2b(body, digest_size=16).digest())
+            compressed = store.get(key)
+            if compressed is MISSING:
+                compressed = _compress(body, coding, level)
+                store.set(key, compressed)
+        else:
+            compressed = _compress(body, coding, level)
+        response.set_data(compressed)
+
+    tag, weak = response.get_etag()
+    if tag:
+        response.set_etag(coded_etag(tag, coding), weak)
+    response.headers["Content-Encoding"] = coding
+    return response
+
+
+def stats() -> dict[str, int]:
+    """Return the counters of the cache of compressed bodies."""
+    return store.stats()
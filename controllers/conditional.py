@@ -0,0 +1,36 @@
+"""Module for answering conditional GET requests with 304 Not Modified."""
+from __future__ import annotations
+
+from datetime import datetime
+
+from flask import request
+from werkzeug.http import http_date, unquote_etag
+
+from controllers import compression
+
+
+def headers(etag: str, last_modified: datetime | None = None,
+            cache_control: str = "no-cache") -> dict[str, str]:
+    """Return the validator and caching headers of a response."""
+    result = {
+        "ETag": etag,
+        "Cache-Control": cache_control
+    }
+    if last_modified:
+        result["Last-Modified"] = http_date(last_modified)
+    return result
+
+
+def not_modified(etag: str, last_modified: datetime | None = None) -> bool:
+    """Check whether the client's cached copy, as described by its validators, is still fresh.
+
+    The copy may be compressed, in which case its ETag is suffixed with the content coding.
+    """
+    if request.if_none_match:
+        tag, _ = unquote_etag(etag)
+        return any(request.if_none_match.contains_weak(candidate)
+                   for candidate in (tag, *(compression.coded_etag(tag, coding)
+                                            for coding in compression.CODINGS)))
+    if request.if_modified_since and last_modified:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
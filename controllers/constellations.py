@@ -2,37 +2,94 @@
 from __future__ import annotations
 
 from http import HTTPStatus
+from flask import Response
 from flask_restful.reqparse import Namespace
 
-from models import constellations
+from controllers import conditional, instrumentation, streaming
+from deps import constants
+from models import constellations, hierarchy
 
 
 def handle_post(data: Namespace) -> tuple[dict[str, str], int]:
     """Handle the POST request."""
-    constellations.Constellation.create(data)
+    try:
+        constellations.Constellation.create(data)
+    except ValueError as e:
+        return {
+            "message": str(e)
+        }, HTTPStatus.CONFLICT
+
     return {
         "message": "Constellation successfully registered."
     }, HTTPStatus.CREATED
 
 
-def handle_get(constellation_id: int) -> tuple[dict[str, str | int |
-                                                         dict[str, str | int]], int]:
+def handle_bulk(rows: list[tuple[int, dict[str, str | int]]],
+                errors: list[dict[str, object]]) -> tuple[dict[str, str | int | list], int]:
+    """Handle the POST request to the bulk endpoint."""
+    failed, batches, retried = constellations.Constellation.bulk_upsert(rows) if rows else ([], 0, 0)
+    # the budget of the route covers one batch; the others and the retried rows are allowed theirs
+    instrumentation.allow_queries(constants.BULK_BATCH_QUERIES * (max(batches - 1, 0) + retried))
+    written = len(rows) - len(failed)
+    errors = sorted(errors + failed, key=lambda e: e["index"])
+
+    if not written and errors:
+        return {
+            "errors": errors,
+            "message": "No constellations were registered."
+        }, HTTPStatus.BAD_REQUEST
+
+    return {
+        "written": written,
+        "errors": errors,
+        "message": "Constellations successfully registered." if not errors
+                   else "Some constellations could not be registered."
+    }, HTTPStatus.MULTI_STATUS if errors else HTTPStatus.CREATED
+
+
+def handle_get(constellation_id: int, data: Namespace) -> tuple[dict[str, str | int |
+                                                         dict[str, str | int]] | None, int,
+                                                    dict[str, str]]:
     """Handle the GET request."""
-    obj = constellations.Constellation.retrieve(constellation_id)
+    try:
+        version = constellations.Constellation.etag(constellation_id, data["expand"])
+    except ValueError as e:
+        return {
+            "message": str(e)
+        }, HTTPStatus.BAD_REQUEST, {}
+
+    if not version:
+        return {
+            "message": "Constellation not found."
+        }, HTTPStatus.NOT_FOUND, {}
+
+    etag, last_modified = version
+    headers = conditional.headers(etag, last_modified)
+    if conditional.not_modified(etag, last_modified):
+        return None, HTTPStatus.NOT_MODIFIED, headers
+
+    obj = constellations.Constellation.retrieve(constellation_id, data["expand"])
     if not obj:
         return {
             "message": "Constellation not found."
-        }, HTTPStatus.NOT_FOUND
+        }, HTTPStatus.NOT_FOUND, {}
 
     return {
         "result": obj,
         "message": "Constellation successfully retrieved."
-    }, HTTPStatus.OK
+    }, HTTPStatus.OK, headers
 
 
 def handle_put(constellation_id: int, data: Namespace) -> tuple[dict[str, str], int]:
     """Handle the PUT request."""
-    if not constellations.Constellation.update(constellation_id, data):
+    try:
+        found = constellations.Constellation.update(constellation_id, data)
+    except ValueError as e:
+        return {
+            "message": str(e)
+        }, HTTPStatus.CONFLICT
+
+    if not found:
         return {
             "message": "Constellation to update not found."
         }, HTTPStatus.BAD_REQUEST
@@ -42,9 +99,25 @@ def handle_put(constellation_id: int, data: Namespace) -> tuple[dict[str, str],
     }, HTTPStatus.ACCEPTED
 
 
+def handle_patch(constellation_id: int, data: Namespace) -> tuple[dict[str, str], int]:
+    """Handle the PATCH request, updating only the fields sent."""
+    if not data:
+        return {
+            "message": "No fields to update."
+        }, HTTPStatus.BAD_REQUEST
+    return handle_put(constellation_id, data)
+
+
 def handle_delete(constellation_id: int) -> tuple[dict[str, str] | None, int]:
     """Handle the DELETE request."""
-    if not constellations.Constellation.delete(constellation_id):
+    try:
+        found = constellations.Constellation.delete(constellation_id)
+    except ValueError as e:
+        return {
+            "message": str(e)
+        }, HTTPStatus.CONFLICT
+
+    if not found:
         return {
             "message": "Constellation to delete not found."
         }, HTTPStatus.BAD_REQUEST
@@ -52,9 +125,66 @@ def handle_delete(constellation_id: int) -> tuple[dict[str, str] | None, int]:
     return None, HTTPStatus.NO_CONTENT
 
 
-def handle_list() -> tuple[dict[str, str | int], int]:
+def handle_list(data: Namespace) -> tuple[dict[str, str | int] | None, int, dict[str, str]]:
     """Handle the GET request."""
+    etag = constellations.Constellation.collection_etag()
+    headers = {**conditional.headers(etag), **streaming.VARY}
+    if conditional.not_modified(etag):
+        return None, HTTPStatus.NOT_MODIFIED, headers
+
+    try:
+        filters = tuple((name, data[name]) for name in constellations.FILTERS
+                        if data[name] is not None)
+        result, next_cursor = constellations.Constellation.list(data["limit"], data["next"],
+                                                                data["sort"], filters)
+    except ValueError as e:
+        return {
+            "message": str(e)
+        }, HTTPStatus.BAD_REQUEST, streaming.VARY
+
     return {
-        "result": constellations.Constellation.list(),
+        "result": result,
+        "next": next_cursor,
         "message": "Constellations successfully retrieved."
-    }, HTTPStatus.OK
+    }, HTTPStatus.OK, headers
+
+
+def handle_stars(constellation_id: int, data: Namespace
+                 ) -> tuple[dict[str, str | int] | None, int, dict[str, str]]:
+    """Handle the GET request for the stars of a constellation."""
+    etag = hierarchy.constellation_stars_etag()
+    headers = conditional.headers(etag)
+    if conditional.not_modified(etag):
+        return None, HTTPStatus.NOT_MODIFIED, headers
+
+    try:
+        result, next_cursor = hierarchy.constellation_stars(constellation_id, data["limit"],
+                                                            data["next"], data["sort"])
+    except ValueError as e:
+        return {
+            "message": str(e)
+        }, HTTPStatus.BAD_REQUEST, {}
+
+    if not result:
+        return {
+            "message": "Constellation not found."
+        }, HTTPStatus.NOT_FOUND, {}
+
+    return {
+        "result": result,
+        "next": next_cursor,
+        "message": "Stars successfully retrieved."
+    }, HTTPStatus.OK, headers
+
+
+def handle_stream(data: Namespace) -> Response | tuple[dict[str, str], int, dict[str, str]]:
+    """Handle the GET request, streaming the constellations matching the filters as NDJSON lines."""
+    try:
+        filters = tuple((name, data[name]) for name in constellations.FILTERS
+                        if data[name] is not None)
+        rows = constellations.Constellation.stream(filters)
+    except ValueError as e:
+        return {
+            "message": str(e)
+        }, HTTPStatus.BAD_REQUEST, streaming.VARY
+    return streaming.ndjson_response(rows)
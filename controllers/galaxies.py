@@ -2,37 +2,94 @@
 from __future__ import annotations
 
 from http import HTTPStatus
+from flask import Response
 from flask_restful.reqparse import Namespace
 
-from models import galaxies
+from controllers import conditional, instrumentation, streaming
+from deps import constants
+from models import galaxies, hierarchy
 
 
 def handle_post(data: Namespace) -> tuple[dict[str, str], int]:
     """Handle the POST request."""
-    galaxies.Galaxy.create(data)
+    try:
+        galaxies.Galaxy.create(data)
+    except ValueError as e:
+        return {
+            "message": str(e)
+        }, HTTPStatus.CONFLICT
+
     return {
         "message": "Galaxy successfully registered."
     }, HTTPStatus.CREATED
 
 
-def handle_get(galaxy_id: int) -> tuple[dict[str, str | int |
-                                                         dict[str, str | int]], int]:
+def handle_bulk(rows: list[tuple[int, dict[str, str | int]]],
+                errors: list[dict[str, object]]) -> tuple[dict[str, str | int | list], int]:
+    """Handle the POST request to the bulk endpoint."""
+    failed, batches, retried = galaxies.Galaxy.bulk_upsert(rows) if rows else ([], 0, 0)
+    # the budget of the route covers one batch; the others and the retried rows are allowed theirs
+    instrumentation.allow_queries(constants.BULK_BATCH_QUERIES * (max(batches - 1, 0) + retried))
+    written = len(rows) - len(failed)
+    errors = sorted(errors + failed, key=lambda e: e["index"])
+
+    if not written and errors:
+        return {
+            "errors": errors,
+            "message": "No galaxies were registered."
+        }, HTTPStatus.BAD_REQUEST
+
+    return {
+        "written": written,
+        "errors": errors,
+        "message": "Galaxies successfully registered." if not errors
+                   else "Some galaxies could not be registered."
+    }, HTTPStatus.MULTI_STATUS if errors else HTTPStatus.CREATED
+
+
+def handle_get(galaxy_id: int, data: Namespace) -> tuple[dict[str, str | int |
+                                                         dict[str, str | int]] | None, int,
+                                                    dict[str, str]]:
     """Handle the GET request."""
-    obj = galaxies.Galaxy.retrieve(galaxy_id)
+    try:
+        version = galaxies.Galaxy.etag(galaxy_id, data["expand"])
+    except ValueError as e:
+        return {
+            "message": str(e)
+        }, HTTPStatus.BAD_REQUEST, {}
+
+    if not version:
+        return {
+            "message": "Galaxy not found."
+        }, HTTPStatus.NOT_FOUND, {}
+
+    etag, last_modified = version
+    headers = conditional.headers(etag, last_modified)
+    if conditional.not_modified(etag, last_modified):
+        return None, HTTPStatus.NOT_MODIFIED, headers
+
+    obj = galaxies.Galaxy.retrieve(galaxy_id, data["expand"])
     if not obj:
         return {
             "message": "Galaxy not found."
-        }, HTTPStatus.NOT_FOUND
+        }, HTTPStatus.NOT_FOUND, {}
 
     return {
         "result": obj,
         "message": "Galaxy successfully retrieved."
-    }, HTTPStatus.OK
+    }, HTTPStatus.OK, headers
 
 
 def handle_put(galaxy_id: int, data: Namespace) -> tuple[dict[str, str], int]:
     """Handle the PUT request."""
-    if not galaxies.Galaxy.update(galaxy_id, data):
+    try:
+        found = galaxies.Galaxy.update(galaxy_id, data)
+    except ValueError as e:
+        return {
+            "message": str(e)
+        }, HTTPStatus.CONFLICT
+
+    if not found:
         return {
             "message": "Galaxy to update not found."
         }, HTTPStatus.BAD_REQUEST
@@ -42,9 +99,25 @@ def handle_put(galaxy_id: int, data: Namespace) -> tuple[dict[str, str], int]:
     }, HTTPStatus.ACCEPTED
 
 
+def handle_patch(galaxy_id: int, data: Namespace) -> tuple[dict[str, str], int]:
+    """Handle the PATCH request, updating only the fields sent."""
+    if not data:
+        return {
+            "message": "No fields to update."
+        }, HTTPStatus.BAD_REQUEST
+    return handle_put(galaxy_id, data)
+
+
 def handle_delete(galaxy_id: int) -> tuple[dict[str, str] | None, int]:
     """Handle the DELETE request."""
-    if not galaxies.Galaxy.delete(galaxy_id):
+    try:
+        found = galaxies.Galaxy.delete(galaxy_id)
+    except ValueError as e:
+        return {
+            "message": str(e)
+        }, HTTPStatus.CONFLICT
+
+    if not found:
         return {
             "message": "Galaxy to delete not found."
         }, HTTPStatus.BAD_REQUEST
@@ -52,9 +125,94 @@ def handle_delete(galaxy_id: int) -> tuple[dict[str, str] | None, int]:
     return None, HTTPStatus.NO_CONTENT
 
 
-def handle_list() -> tuple[dict[str, str | int], int]:
+def handle_list(data: Namespace) -> tuple[dict[str, str | int] | None, int, dict[str, str]]:
     """Handle the GET request."""
+    etag = galaxies.Galaxy.collection_etag()
+    headers = {**conditional.headers(etag), **streaming.VARY}
+    if conditional.not_modified(etag):
+        return None, HTTPStatus.NOT_MODIFIED, headers
+
+    try:
+        filters = tuple((name, data[name]) for name in galaxies.FILTERS
+                        if data[name] is not None)
+        result, next_cursor = galaxies.Galaxy.list(data["limit"], data["next"],
+                                                   data["sort"], filters)
+    except ValueError as e:
+        return {
+            "message": str(e)
+        }, HTTPStatus.BAD_REQUEST, streaming.VARY
+
     return {
-        "result": galaxies.Galaxy.list(),
+        "result": result,
+        "next": next_cursor,
         "message": "Galaxies successfully retrieved."
-    }, HTTPStatus.OK
+    }, HTTPStatus.OK, headers
+
+
+def handle_constellations(galaxy_id: int, data: Namespace
+                          ) -> tuple[dict[str, str | int] | None, int, dict[str, str]]:
+    """Handle the GET request for the constellations of a galaxy."""
+    etag = hierarchy.galaxy_constellations_etag()
+    headers = conditional.headers(etag)
+    if conditional.not_modified(etag):
+        return None, HTTPStatus.NOT_MODIFIED, headers
+
+    try:
+        result, next_cursor = hierarchy.galaxy_constellations(galaxy_id, data["limit"],
+                                                              data["next"], data["sort"])
+    except ValueError as e:
+        return {
+            "message": str(e)
+        }, HTTPStatus.BAD_REQUEST, {}
+
+    if not result:
+        return {
+            "message": "Galaxy not found."
+        }, HTTPStatus.NOT_FOUND, {}
+
+    return {
+        "result": result,
+        "next": next_cursor,
+        "message": "Constellations successfully retrieved."
+    }, HTTPStatus.OK, headers
+
+
+def handle_tree(galaxy_id: int, data: Namespace
+                ) -> tuple[dict[str, str | int] | None, int, dict[str, str]]:
+    """Handle the GET request for the tree of a galaxy."""
+    etag = hierarchy.galaxy_tree_etag()
+    headers = conditional.headers(etag)
+    if conditional.not_modified(etag):
+        return None, HTTPStatus.NOT_MODIFIED, headers
+
+    try:
+        result, next_cursor = hierarchy.galaxy_tree(galaxy_id, data["limit"], data["next"],
+                                                    data["star_limit"])
+    except ValueError as e:
+        return {
+            "message": str(e)
+        }, HTTPStatus.BAD_REQUEST, {}
+
+    if not result:
+        return {
+            "message": "Galaxy not found."
+        }, HTTPStatus.NOT_FOUND, {}
+
+    return {
+        "result": result,
+        "next": next_cursor,
+        "message": "Galaxy tree successfully retrieved."
+    }, HTTPStatus.OK, headers
+
+
+def handle_stream(data: Namespace) -> Response | tuple[dict[str, str], int, dict[str, str]]:
+    """Handle the GET request, streaming every galaxy matching the filters as a line of NDJSON."""
+    try:
+        filters = tuple((name, data[name]) for name in galaxies.FILTERS
+                        if data[name] is not None)
+        rows = galaxies.Galaxy.stream(filters)
+    except ValueError as e:
+        return {
+            "message": str(e)
+        }, HTTPStatus.BAD_REQUEST, streaming.VARY
+    return streaming.ndjson_response(rows)
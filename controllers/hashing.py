@@ -1,15 +1,160 @@
-"""Module for hashing and verifying passwords."""
-from passlib.context import CryptContext
+"""Module for hashing and verifying passwords.
 
+bcrypt is slow on purpose, so the work is sent to a pool of worker processes: it runs on every core
+and leaves the GIL to the threads serving the other requests.  passlib is only imported by the
+processes that hash, so the server processes do not pay for it at startup.
+"""
+from __future__ import annotations
 
-pwd_ctx = CryptContext(schemes=["bcrypt"], deprecated="auto")
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import TYPE_CHECKING, TypeVar
+
+from deps import constants
+
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+
+T = TypeVar("T")
+
+MIN_ROUNDS = 4
+MAX_ROUNDS = 31
+
+rounds = constants.BCRYPT_ROUNDS
+# number of hashing processes of this server process, one per CPU unless shared, see after_fork()
+processes = constants.HASHING_WORKERS or os.cpu_count() or 1
+_contexts: dict[int, CryptContext] = {}
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def _context(cost: int) -> CryptContext:
+    """Return the context hashing with the given cost, in the calling process."""
+    if cost not in _contexts:
+        from passlib.context import CryptContext
+        _contexts[cost] = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=cost)
+    return _contexts[cost]
+
+
+def _hash(password: str, cost: int) -> str:
+    """Return a hash of the password; runs in a worker process."""
+    return _context(cost).hash(password)
+
+
+def _verify_and_update(hashed_password: str, plaintext_string: str,
+                       cost: int) -> tuple[bool, str | None]:
+    """Verify the plaintext string and hash it again if needed; runs in a worker process."""
+    return _context(cost).verify_and_update(plaintext_string, hashed_password)
+
+
+def pool() -> ProcessPoolExecutor:
+    """Return the pool of hashing processes, started on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawned rather than forked, so the workers inherit neither threads nor connections
+            _pool = ProcessPoolExecutor(max_workers=processes,
+                                        mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def _discard(broken: ProcessPoolExecutor) -> None:
+    """Forget the broken pool, unless another thread already replaced it."""
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _run(work: Callable[[ProcessPoolExecutor], T]) -> T:
+    """Return the result of the work done with the pool.
+
+    A pool whose process died, e.g. killed for using too much memory, is broken for good: it is
+    replaced by a new one and the work is done again, once.
+    """
+    current = pool()
+    try:
+        return work(current)
+    except BrokenProcessPool:
+        _discard(current)
+        return work(pool())
+
+
+def after_fork(server_workers: int = 1) -> None:
+    """Forget the pool inherited from the parent, in a server worker started by fork().
+
+    The parent's pool processes and its management thread are not usable from the child.  Unless
+    HASHING_WORKERS is set, the CPUs are shared among the ``server_workers`` processes, each
+    starting at least one hashing process, instead of every server worker starting one per CPU.
+    """
+    global _pool, _pool_lock, processes
+    _pool = None
+    _pool_lock = threading.Lock()
+    if not constants.HASHING_WORKERS:
+        processes = max((os.cpu_count() or 1) // server_workers, 1)
+
+
+def shutdown() -> None:
+    """Stop the pool of hashing processes, if it was started."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def configure(cost: int | str) -> int:
+    """Set the bcrypt cost, calibrating it if it is "auto", and return it."""
+    global rounds
+    if cost == "auto":
+        rounds = calibrate(constants.BCRYPT_TARGET_SECONDS)
+    elif MIN_ROUNDS <= int(cost) <= MAX_ROUNDS:
+        rounds = int(cost)
+    else:
+        raise ValueError(f"The bcrypt cost must be between {MIN_ROUNDS} and {MAX_ROUNDS}.")
+    return rounds
+
+
+def calibrate(target_seconds: float) -> int:
+    """Return the highest cost whose hash takes about target_seconds on this machine."""
+    def elapsed(cost: int) -> float:
+        start = time.perf_counter()
+        _hash("calibration", cost)
+        return time.perf_counter() - start
+
+    cost = MIN_ROUNDS
+    seconds = elapsed(cost)
+    # every step doubles the work
+    while cost < MAX_ROUNDS and seconds * 2 <= target_seconds:
+        cost += 1
+        seconds = elapsed(cost)
+    return cost
 
 
 def bcrypt(password: str) -> str:
     """Return a hash of the password."""
-    return pwd_ctx.hash(password)
+    return _run(lambda executor: executor.submit(_hash, password, rounds).result())
+
+
+def bcrypt_many(passwords: Iterable[str]) -> list[str]:
+    """Return the hashes of the passwords, computed in parallel."""
+    passwords = list(passwords)
+    return _run(lambda executor: list(executor.map(_hash, passwords, itertools.repeat(rounds))))
+
 
+def verify_and_update(hashed_password: str, plaintext_string: str) -> tuple[bool, str | None]:
+    """Check whether the given plaintext string equals the hashed password.
 
-def verify(hashed_password: str, plaintext_string: str) -> bool:
-    """Check whether the given plaintext string equals the hashed password."""
-    return pwd_ctx.verify(plaintext_string, hashed_password)
+    If it does and the hash was made with another cost, the password hashed with the current cost
+    is returned as well, otherwise None.
+    """
+    return _run(lambda executor: executor.submit(_verify_and_update, hashed_password,
+                                                 plaintext_string, rounds).result())
@@ -0,0 +1,302 @@
+"""Module measuring where the time of each request goes.
+
+The layers of a request add their time to named spans of the request: ``parse`` (the request
+schemas), ``auth`` (decoding and verifying the JWT), ``db`` (the SQL statements), ``lazy`` (the
+relationship loads, whose statements are also in ``db``), ``bcrypt``, ``encode`` (the JSON
+document) and ``compress``.  ``resource`` is the time spent in the resource, and ``app`` the part
+of it spent in the resources, controllers and models themselves, outside of the other spans.  The
+spans are sent back in the Server-Timing header of the response, and the request latencies by
+route and the SQL statements are accumulated for /metrics.
+
+The statements of each request are also checked against the QUERY_BUDGETS of its route, so that an
+N+1 query is noticed when it is introduced, and the statements of the requests slower than
+SLOW_QUERY_SECONDS are logged with the shape of their parameters and the model method that ran them.
+"""
+from __future__ import annotations
+
+import bisect
+import itertools
+import logging
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from flask import Flask, Response, request
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from deps import constants
+
+
+# the spans that do not overlap each other, subtracted from the resource's time to get "app"
+EXCLUSIVE_SPANS = ("parse", "auth", "db", "bcrypt", "encode")
+# the methods failed in raise mode: the budget is checked after the request, once the writes of
+# the other methods are committed, so failing those would report an error for a completed write
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+enabled = False
+# "warn" logs the requests over their query budget, "raise" fails the safe ones and "off" lets
+# them be
+budget_mode = "off"
+slow_query_seconds: float | None = None
+_logger = logging.getLogger(__name__)
+# span -> [seconds, count] of the current request, None outside of a request; a context variable
+# rather than flask.g, which is much slower to reach from the hot paths
+_timings: ContextVar[dict[str, list] | None] = ContextVar("timings", default=None)
+_request_start: ContextVar[float] = ContextVar("request_start", default=0.0)
+# statements allowed to the current request on top of the budget of its route
+_allowance: ContextVar[int] = ContextVar("allowance", default=0)
+# (method, route, status) -> [count of each bucket and of +Inf, sum]
+_requests: dict[tuple[str, str, int], list] = {}
+# first keyword of the statement -> [count, seconds]
+_statements: dict[str, list] = {}
+_relationship_loads = [0, 0.0]
+_lock = threading.Lock()
+
+
+def _add(name: str, seconds: float) -> None:
+    """Add the time to the span of the current request."""
+    timings = _timings.get()
+    if timings is not None:
+        timing = timings.get(name)
+        if timing is None:
+            timings[name] = [seconds, 1]
+        else:
+            timing[0] += seconds
+            timing[1] += 1
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Add the time spent in the block to the span of the current request."""
+    if not enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _add(name, time.perf_counter() - start)
+
+
+def timed(name: str) -> Callable[[Callable], Callable]:
+    """Decorate a function to add the time spent in it to the span of the current request."""
+    def decorator(function: Callable) -> Callable:
+        @wraps(function)
+        def wrapper(*args: object, **kwargs: object) -> object:
+            if not enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                _add(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def _exclusive_seconds() -> float:
+    """Return the time of the current request spent in the EXCLUSIVE_SPANS so far."""
+    timings = _timings.get() or {}
+    return sum(timings[name][0] for name in EXCLUSIVE_SPANS if name in timings)
+
+
+def resource(view: Callable) -> Callable:
+    """Decorate the view of a resource to measure the resource and its own code, as "app"."""
+    @wraps(view)
+    def wrapper(*args: object, **kwargs: object) -> object:
+        if not enabled:
+            return view(*args, **kwargs)
+        start, nested = time.perf_counter(), _exclusive_seconds()
+        try:
+            return view(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            _add("resource", elapsed)
+            _add("app", max(elapsed - (_exclusive_seconds() - nested), 0.0))
+    return wrapper
+
+
+def before_request() -> None:
+    """Start measuring the request."""
+    if not enabled:
+        return
+    _timings.set({})
+    _request_start.set(time.perf_counter())
+    _allowance.set(0)
+
+
+def allow_queries(count: int) -> None:
+    """Allow the current request to run more statements than the budget of its route."""
+    _allowance.set(_allowance.get() + count)
+
+
+def after_request(response: Response) -> Response:
+    """Record the latency of the request and send its spans in the Server-Timing header."""
+    timings = _timings.get()
+    if timings is None:
+        return response
+    _timings.set(None)
+    elapsed = time.perf_counter() - _request_start.get()
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    observe(request.method, route, response.status_code, elapsed)
+
+    metrics = [f"total;dur={elapsed * 1000:.2f}"]
+    for name, (seconds, count) in timings.items():
+        metric = f"{name};dur={seconds * 1000:.2f}"
+        if name == "db":
+            metric += f';desc="{count} queries"'
+        elif name == "lazy":
+            metric += f';desc="{count} relationship loads"'
+        metrics.append(metric)
+    response.headers["Server-Timing"] = ", ".join(metrics)
+
+    if budget_mode != "off":
+        check_budget(request.method, route, timings["db"][1] if "db" in timings else 0)
+    return response
+
+
+def check_budget(method: str, route: str, count: int) -> None:
+    """Warn about, or fail, a request which ran more statements than the budget of its route.
+
+    In raise mode, only the requests with a safe method fail; the others are logged.
+    """
+    budget = constants.QUERY_BUDGETS.get(f"{method} {route}")
+    if budget is None or count <= budget + _allowance.get():
+        return
+    message = (f"{method} {route} ran {count} SQL statements, "
+               f"over its budget of {budget + _allowance.get()}.")
+    if budget_mode == "raise" and method in SAFE_METHODS:
+        raise RuntimeError(message)
+    _logger.warning(message)
+
+
+def observe(method: str, route: str, status: int, seconds: float) -> None:
+    """Record the latency of a request in the histogram of its route."""
+    bucket = bisect.bisect_left(constants.METRICS_BUCKETS, seconds)
+    with _lock:
+        histogram = _requests.get((method, route, status))
+        if histogram is None:
+            histogram = _requests[(method, route, status)] = [
+                [0] * (len(constants.METRICS_BUCKETS) + 1), 0.0]
+        histogram[0][bucket] += 1
+        histogram[1] += seconds
+
+
+def _before_cursor_execute(connection: object, cursor: object, statement: str, *args: object
+                           ) -> None:
+    if not enabled:
+        return
+    connection.info.setdefault("statement_starts", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(connection: object, cursor: object, statement: str, *args: object
+                          ) -> None:
+    starts = connection.info.get("statement_starts")
+    if not starts:
+        return
+    seconds = time.perf_counter() - starts.pop()
+    if (slow_query_seconds is not None and seconds >= slow_query_seconds
+            and _timings.get() is not None):
+        _log_slow_query(statement, args[0], args[2], seconds)
+    keyword = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else "other"
+    with _lock:
+        totals = _statements.setdefault(keyword, [0, 0.0])
+        totals[0] += 1
+        totals[1] += seconds
+    _add("db", seconds)
+
+
+def _log_slow_query(statement: str, parameters: object, executemany: bool, seconds: float
+                    ) -> None:
+    """Log the statement, the shape of its parameters, its duration and the model calling it."""
+    shape = (f"{len(parameters)} x {_shape(parameters[0])}" if executemany and parameters
+             else _shape(parameters))
+    statement = " ".join(statement.split())
+    if len(statement) > constants.SLOW_QUERY_MAX_LENGTH:
+        statement = statement[:constants.SLOW_QUERY_MAX_LENGTH] + "..."
+    _logger.warning("Slow query: %.1f ms in %s, parameters %s: %s", seconds * 1000, _caller(),
+                    shape, statement)
+
+
+def _shape(parameters: object) -> str:
+    """Return the types of the parameters, with the repeated types of a sequence counted."""
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{name}: {type(value).__name__}"
+                               for name, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        runs = [(name, len(list(group))) for name, group in
+                itertools.groupby(type(value).__name__ for value in parameters)]
+        return "(" + ", ".join(name if count == 1 else f"{count} x {name}"
+                               for name, count in runs) + ")"
+    return type(parameters).__name__
+
+
+def _caller() -> str:
+    """Return the innermost method of the models on the stack, where the statement comes from."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("models."):
+            code = frame.f_code
+            return f"{module}.{getattr(code, 'co_qualname', code.co_name)}:{frame.f_lineno}"
+        frame = frame.f_back
+    return "unknown"
+
+
+def _do_orm_execute(state: ORMExecuteState) -> object:
+    if not enabled or not state.is_relationship_load:
+        return None
+    start = time.perf_counter()
+    result = state.invoke_statement()
+    seconds = time.perf_counter() - start
+    with _lock:
+        _relationship_loads[0] += 1
+        _relationship_loads[1] += seconds
+    _add("lazy", seconds)
+    return result
+
+
+def install(app: Flask, db: SQLAlchemy) -> None:
+    """Measure the requests of the application and the statements of its engine.
+
+    Setting ``enabled`` to False afterwards stops measuring, as the benchmark does.
+    """
+    global enabled, budget_mode, slow_query_seconds, _logger
+    enabled = True
+    budget_mode = app.config["QUERY_BUDGET_MODE"]
+    slow_query_seconds = app.config["SLOW_QUERY_SECONDS"]
+    _logger = app.logger
+    app.before_request(before_request)
+    app.after_request(after_request)
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(db.engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Session, "do_orm_execute", _do_orm_execute)
+
+
+def requests() -> dict[tuple[str, str, int], tuple[list[int], float]]:
+    """Return the histograms of the request latencies, as cumulative counts and sum.
+
+    The last count is the one of the +Inf bucket, i.e. the count of requests.
+    """
+    with _lock:
+        return {key: (list(itertools.accumulate(buckets)), total)
+                for key, (buckets, total) in _requests.items()}
+
+
+def statements() -> dict[str, tuple[int, float]]:
+    """Return the count and the total seconds of the SQL statements, by first keyword."""
+    with _lock:
+        return {keyword: tuple(totals) for keyword, totals in _statements.items()}
+
+
+def relationship_loads() -> tuple[int, float]:
+    """Return the count and the total seconds of the relationship loads."""
+    with _lock:
+        return tuple(_relationship_loads)
@@ -0,0 +1,81 @@
+"""Module exposing the metrics of the application in the Prometheus text format.
+
+The metrics are those of the process answering the scrape: when several processes serve the
+application, each one exports its own.
+"""
+from __future__ import annotations
+
+from flask import Response
+
+from controllers import compression, instrumentation, tokens
+from deps import constants
+from models import cache
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+CACHES = {"documents": cache.stats, "tokens": tokens.stats, "compressed": compression.stats}
+
+
+def _escape(value: object) -> str:
+    """Return the value of a label, escaped."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: object) -> str:
+    """Return the label set of a sample."""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _metric(lines: list[str], name: str, kind: str, help_text: str) -> None:
+    """Append the HELP and TYPE lines of a metric."""
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def exposition() -> str:
+    """Return every metric in the Prometheus text format."""
+    lines: list[str] = []
+
+    _metric(lines, "starzz_request_duration_seconds", "histogram",
+            "Time taken to handle the requests, by route.")
+    for (method, route, status), (buckets, total) in sorted(instrumentation.requests().items()):
+        labels = {"method": method, "route": route, "status": status}
+        for bound, bucket in zip((*constants.METRICS_BUCKETS, "+Inf"), buckets):
+            lines.append(
+                f"starzz_request_duration_seconds_bucket{_labels(**labels, le=bound)} {bucket}")
+        count = buckets[-1]
+        lines.append(f"starzz_request_duration_seconds_sum{_labels(**labels)} {total}")
+        lines.append(f"starzz_request_duration_seconds_count{_labels(**labels)} {count}")
+
+    statements = sorted(instrumentation.statements().items())
+    _metric(lines, "starzz_sql_statements_total", "counter",
+            "SQL statements executed, by first keyword.")
+    for keyword, (count, _) in statements:
+        lines.append(f"starzz_sql_statements_total{_labels(statement=keyword)} {count}")
+    _metric(lines, "starzz_sql_duration_seconds_total", "counter",
+            "Time spent executing the SQL statements, by first keyword.")
+    for keyword, (_, seconds) in statements:
+        lines.append(f"starzz_sql_duration_seconds_total{_labels(statement=keyword)} {seconds}")
+
+    count, seconds = instrumentation.relationship_loads()
+    _metric(lines, "starzz_relationship_loads_total", "counter",
+            "Relationships loaded by separate statements.")
+    lines.append(f"starzz_relationship_loads_total {count}")
+    _metric(lines, "starzz_relationship_load_duration_seconds_total", "counter",
+            "Time spent loading relationships by separate statements.")
+    lines.append(f"starzz_relationship_load_duration_seconds_total {seconds}")
+
+    stats = {name: function() for name, function in CACHES.items()}
+    for counter in ("hits", "misses", "evictions"):
+        _metric(lines, f"starzz_cache_{counter}_total", "counter", f"Cache {counter}, by cache.")
+        for name, values in stats.items():
+            lines.append(f"starzz_cache_{counter}_total{_labels(cache=name)} {values[counter]}")
+    _metric(lines, "starzz_cache_entries", "gauge", "Entries in the cache, by cache.")
+    for name, values in stats.items():
+        lines.append(f"starzz_cache_entries{_labels(cache=name)} {values['entries']}")
+    return "\n".join(lines) + "\n"
+
+
+def handle_get() -> Response:
+    """Handle the GET request."""
+    return Response(exposition(), content_type=CONTENT_TYPE)
@@ -0,0 +1,67 @@
+"""Module for encoding the responses of the Api as JSON.
+
+The encoder is orjson when it is installed, which writes the UTF-8 bytes of the document directly
+instead of building a str first, and the stdlib encoder otherwise.  Both write compact documents:
+the indentation flask_restful adds in debug mode costs as much as the encoding on large lists.
+"""
+from __future__ import annotations
+
+import json
+from collections.abc import Callable
+
+from flask import Response, make_response
+
+from controllers import instrumentation
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional dependency
+    orjson = None
+
+
+_json_encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+
+
+def _stdlib_dumps(obj: object) -> bytes:
+    """Return the compact JSON document of the object with the stdlib encoder."""
+    return _json_encoder.encode(obj).encode()
+
+
+def _orjson_dumps(obj: object) -> bytes:
+    """Return the compact JSON document of the object with orjson."""
+    # the stdlib encoder accepts integer keys, which orjson only does with this option
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+
+ENCODERS: dict[str, Callable[[object], bytes]] = {"json": _stdlib_dumps}
+if orjson is not None:
+    ENCODERS["orjson"] = _orjson_dumps
+
+encoder = "orjson" if orjson is not None else "json"
+_dumps = ENCODERS[encoder]
+
+
+def configure(name: str) -> str:
+    """Select the encoder by name, or the fastest one installed with "auto", and return its name."""
+    global encoder, _dumps
+    if name == "auto":
+        name = "orjson" if "orjson" in ENCODERS else "json"
+    if name not in ENCODERS:
+        raise ValueError(f"The JSON encoder must be 'auto' or one of {sorted(ENCODERS)}.")
+    encoder, _dumps = name, ENCODERS[name]
+    return name
+
+
+def dumps(obj: object) -> bytes:
+    """Return the compact JSON document of the object, encoded as UTF-8."""
+    return _dumps(obj)
+
+
+def output_json(data: object, code: int, headers: dict[str, str] | None = None) -> Response:
+    """Make the response of a resource, registered as the Api's application/json representation."""
+    # like flask_restful, end the document with a new line
+    with instrumentation.span("encode"):
+        body = _dumps(data) + b"\n"
+    response = make_response(body, code)
+    response.headers.extend(headers or {})
+    return response
@@ -0,0 +1,29 @@
+"""This module defines the functions called when the Search resource is invoked."""
+from __future__ import annotations
+
+from http import HTTPStatus
+from flask_restful.reqparse import Namespace
+
+from controllers import conditional
+from models import search
+
+
+def handle_get(data: Namespace) -> tuple[dict[str, str | list] | None, int, dict[str, str]]:
+    """Handle the GET request."""
+    etag = search.etag()
+    headers = conditional.headers(etag)
+    if conditional.not_modified(etag):
+        return None, HTTPStatus.NOT_MODIFIED, headers
+
+    try:
+        result, next_cursor = search.search(data["q"], data["limit"], data["next"], data["type"])
+    except ValueError as e:
+        return {
+            "message": str(e)
+        }, HTTPStatus.BAD_REQUEST, {}
+
+    return {
+        "result": result,
+        "next": next_cursor,
+        "message": "Search results successfully retrieved."
+    }, HTTPStatus.OK, headers
@@ -2,37 +2,94 @@
 from __future__ import annotations
 
 from http import HTTPStatus
+from flask import Response
 from flask_restful.reqparse import Namespace
 
+from controllers import conditional, instrumentation, streaming
+from deps import constants
 from models import stars
 
 
 def handle_post(data: Namespace) -> tuple[dict[str, str], int]:
     """Handle the POST request."""
-    stars.Star.create(data)
+    try:
+        stars.Star.create(data)
+    except ValueError as e:
+        return {
+            "message": str(e)
+        }, HTTPStatus.CONFLICT
+
     return {
         "message": "Star successfully registered."
     }, HTTPStatus.CREATED
 
 
-def handle_get(star_id: int) -> tuple[dict[str, str | int |
-                                                         dict[str, str | int]], int]:
+def handle_bulk(rows: list[tuple[int, dict[str, str | int]]],
+                errors: list[dict[str, object]]) -> tuple[dict[str, str | int | list], int]:
+    """Handle the POST request to the bulk endpoint."""
+    failed, batches, retried = stars.Star.bulk_upsert(rows) if rows else ([], 0, 0)
+    # the budget of the route covers one batch; the others and the retried rows are allowed theirs
+    instrumentation.allow_queries(constants.BULK_BATCH_QUERIES * (max(batches - 1, 0) + retried))
+    written = len(rows) - len(failed)
+    errors = sorted(errors + failed, key=lambda e: e["index"])
+
+    if not written and errors:
+        return {
+            "errors": errors,
+            "message": "No stars were registered."
+        }, HTTPStatus.BAD_REQUEST
+
+    return {
+        "written": written,
+        "errors": errors,
+        "message": "Stars successfully registered." if not errors
+                   else "Some stars could not be registered."
+    }, HTTPStatus.MULTI_STATUS if errors else HTTPStatus.CREATED
+
+
+def handle_get(star_id: int, data: Namespace) -> tuple[dict[str, str | int |
+                                                         dict[str, str | int]] | None, int,
+                                                    dict[str, str]]:
     """Handle the GET request."""
-    obj = stars.Star.retrieve(star_id)
+    try:
+        version = stars.Star.etag(star_id, data["expand"])
+    except ValueError as e:
+        return {
+            "message": str(e)
+        }, HTTPStatus.BAD_REQUEST, {}
+
+    if not version:
+        return {
+            "message": "Star not found."
+        }, HTTPStatus.NOT_FOUND, {}
+
+    etag, last_modified = version
+    headers = conditional.headers(etag, last_modified)
+    if conditional.not_modified(etag, last_modified):
+        return None, HTTPStatus.NOT_MODIFIED, headers
+
+    obj = stars.Star.retrieve(star_id, data["expand"])
     if not obj:
         return {
             "message": "Star not found."
-        }, HTTPStatus.NOT_FOUND
+        }, HTTPStatus.NOT_FOUND, {}
 
     return {
         "result": obj,
         "message": "Star successfully retrieved."
-    }, HTTPStatus.OK
+    }, HTTPStatus.OK, headers
 
 
 def handle_put(star_id: int, data: Namespace) -> tuple[dict[str, str], int]:
     """Handle the PUT request."""
-    if not stars.Star.update(star_id, data):
+    try:
+        found = stars.Star.update(star_id, data)
+    except ValueError as e:
+        return {
+            "message": str(e)
+        }, HTTPStatus.CONFLICT
+
+    if not found:
         return {
             "message": "Star to update not found."
         }, HTTPStatus.BAD_REQUEST
@@ -42,9 +99,25 @@ def handle_put(star_id: int, data: Namespace) -> tuple[dict[str, str], int]:
     }, HTTPStatus.ACCEPTED
 
 
+def handle_patch(star_id: int, data: Namespace) -> tuple[dict[str, str], int]:
+    """Handle the PATCH request, updating only the fields sent."""
+    if not data:
+        return {
+            "message": "No fields to update."
+        }, HTTPStatus.BAD_REQUEST
+    return handle_put(star_id, data)
+
+
 def handle_delete(star_id: int) -> tuple[dict[str, str] | None, int]:
     """Handle the DELETE request."""
-    if not stars.Star.delete(star_id):
+    try:
+        found = stars.Star.delete(star_id)
+    except ValueError as e:
+        return {
+            "message": str(e)
+        }, HTTPStatus.CONFLICT
+
+    if not found:
         return {
             "message": "Star to delete not found."
         }, HTTPStatus.BAD_REQUEST
@@ -52,9 +125,63 @@ def handle_delete(star_id: int) -> tuple[dict[str, str] | None, int]:
     return None, HTTPStatus.NO_CONTENT
 
 
-def handle_list() -> tuple[dict[str, str | int], int]:
+def handle_list(data: Namespace) -> tuple[dict[str, str | int] | None, int, dict[str, str]]:
     """Handle the GET request."""
+    etag = stars.Star.collection_etag()
+    headers = {**conditional.headers(etag), **streaming.VARY}
+    if conditional.not_modified(etag):
+        return None, HTTPStatus.NOT_MODIFIED, headers
+
+    try:
+        filters = tuple((name, data[name]) for name in stars.FILTERS
+                        if data[name] is not None)
+        result, next_cursor = stars.Star.list(data["limit"], data["next"],
+                                              data["sort"], filters)
+    except ValueError as e:
+        return {
+            "message": str(e)
+        }, HTTPStatus.BAD_REQUEST, streaming.VARY
+
+    return {
+        "result": result,
+        "next": next_cursor,
+        "message": "Stars successfully retrieved."
+    }, HTTPStatus.OK, headers
+
+
+def handle_near(data: Namespace) -> tuple[dict[str, str | list] | None, int, dict[str, str]]:
+    """Handle the GET request for the stars near a position, within a radius or the k nearest."""
+    etag = stars.Star.collection_etag()
+    headers = conditional.headers(etag)
+    if conditional.not_modified(etag):
+        return None, HTTPStatus.NOT_MODIFIED, headers
+
+    try:
+        if data["k"] is not None:
+            result = stars.Star.nearest(data["ra"], data["dec"], data["k"])
+        elif data["radius"] is not None:
+            result = stars.Star.near(data["ra"], data["dec"], data["radius"], data["limit"])
+        else:
+            raise ValueError("Either radius or k must be given.")
+    except ValueError as e:
+        return {
+            "message": str(e)
+        }, HTTPStatus.BAD_REQUEST, {}
+
     return {
-        "result": stars.Star.list(),
+        "result": result,
         "message": "Stars successfully retrieved."
-    }, HTTPStatus.OK
+    }, HTTPStatus.OK, headers
+
+
+def handle_stream(data: Namespace) -> Response | tuple[dict[str, str], int, dict[str, str]]:
+    """Handle the GET request, streaming every star matching the filters as a line of NDJSON."""
+    try:
+        filters = tuple((name, data[name]) for name in stars.FILTERS
+                        if data[name] is not None)
+        rows = stars.Star.stream(filters)
+    except ValueError as e:
+        return {
+            "message": str(e)
+        }, HTTPStatus.BAD_REQUEST, streaming.VARY
+    return streaming.ndjson_response(rows)
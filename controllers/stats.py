@@ -0,0 +1,38 @@
+"""This module defines the functions called when the Stats* resources are invoked."""
+from __future__ import annotations
+
+from http import HTTPStatus
+
+from models import stats
+
+
+def handle_list() -> tuple[dict[str, str | list[str]], int]:
+    """Handle the GET request listing the statistics."""
+    return {
+        "result": list(stats.STATISTICS),
+        "message": "Statistics successfully retrieved."
+    }, HTTPStatus.OK
+
+
+def handle_get(name: str) -> tuple[dict[str, str | list[dict[str, str | int]]], int]:
+    """Handle the GET request for a statistic."""
+    try:
+        counts = stats.counts(name)
+    except ValueError:
+        return {
+            "message": "Statistic not found."
+        }, HTTPStatus.NOT_FOUND
+
+    _, column = stats.STATISTICS[name]
+    return {
+        "result": [{column: key, "count": count} for key, count in counts],
+        "message": "Statistic successfully retrieved."
+    }, HTTPStatus.OK
+
+
+def handle_get_user(user_id: int) -> tuple[dict[str, str | dict[str, int]], int]:
+    """Handle the GET request for the contributions of a user."""
+    return {
+        "result": {"user_id": user_id, **stats.contributions(user_id)},
+        "message": "User statistics successfully retrieved."
+    }, HTTPStatus.OK
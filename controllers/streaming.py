@@ -0,0 +1,38 @@
+"""Module for streaming collections to the client as newline-delimited JSON."""
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
+
+from flask import Response, request, stream_with_context
+
+from controllers import representations
+from deps import constants
+
+
+# the list endpoints send JSON or NDJSON depending on Accept, so caches must key on it
+VARY = {"Vary": "Accept"}
+
+def wants_ndjson() -> bool:
+    """Check whether the client asked for an NDJSON stream instead of a JSON page."""
+    best = request.accept_mimetypes.best_match(["application/json", constants.NDJSON_MIMETYPE])
+    return best == constants.NDJSON_MIMETYPE
+
+
+def ndjson_response(rows: Iterable[dict[str, str | int]]) -> Response:
+    """Return a chunked response that sends one JSON document per line as rows are fetched."""
+    return Response(stream_with_context(_ndjson_chunks(rows)),
+                    mimetype=constants.NDJSON_MIMETYPE, headers=VARY)
+
+
+def _ndjson_chunks(rows: Iterable[dict[str, str | int]]) -> Iterator[bytes]:
+    """Yield the rows as NDJSON, grouping them so that each chunk holds one fetched batch."""
+    lines = []
+    for row in rows:
+        lines.append(representations.dumps(row))
+        if len(lines) == constants.STREAM_BATCH_SIZE:
+            lines.append(b"")
+            yield b"\n".join(lines)
+            lines = []
+    if lines:
+        lines.append(b"")
+        yield b"\n".join(lines)
@@ -0,0 +1,95 @@
+"""Module caching the claims of verified JWTs, so a token sent again is not decoded and verified again.
+
+Entries are keyed by a digest of the token and of the key verifying it, the one returned by the
+``decode_key_loader`` callback if the application set one, and expire with the token.
+Only the signature and claims checks are skipped: the blocklist and the other callbacks of the
+manager still run on every request.  A missing, invalid or expired token is answered with 401.
+"""
+from __future__ import annotations
+
+import hashlib
+import time
+from collections.abc import Callable
+from http import HTTPStatus
+
+import jwt
+from flask import Response, jsonify
+from flask_jwt_extended import JWTManager
+from flask_jwt_extended.config import config
+from flask_jwt_extended.exceptions import JWTExtendedException
+from flask_restful import Api
+from jwt.exceptions import PyJWTError
+
+from controllers import instrumentation
+from deps import constants
+from models.cache import MISSING, LRUCache
+
+
+store = LRUCache(constants.TOKEN_CACHE_MAX_ENTRIES, constants.JWT_ACCESS_TOKEN_EXPIRES * 60)
+
+
+class CachingJWTManager(JWTManager):
+    """JWTManager remembering the claims of the tokens it has verified until they expire.
+
+    The claims are cached around _decode_jwt_from_config(), the method of JWTManager decoding and
+    verifying a token (Flask-JWT-Extended is pinned in requirements.txt).
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        self.key_loader: Callable[[dict, dict], str] | None = None
+        super().__init__(*args, **kwargs)
+
+    def decode_key_loader(self, callback: Callable[[dict, dict], str]) -> Callable[[dict, dict], str]:
+        """Set the callback returning the key verifying a token, remembered for the cache keys."""
+        self.key_loader = callback
+        return super().decode_key_loader(callback)
+
+    def decode_key(self, encoded_token: str) -> str:
+        """Return the key verifying the token, from the decode_key_loader callback if one is set."""
+        if self.key_loader is None:
+            return config.decode_key
+        claims = jwt.decode(encoded_token, algorithms=config.decode_algorithms,
+                            options={"verify_signature": False})
+        return self.key_loader(jwt.get_unverified_header(encoded_token), claims)
+
+    @instrumentation.timed("auth")
+    def _decode_jwt_from_config(self, encoded_token: str, csrf_value: str | None = None,
+                                allow_expired: bool = False) -> dict:
+        if csrf_value or allow_expired:
+            return super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+
+        key = (digest(encoded_token, self.decode_key(encoded_token)),)
+        claims = store.get(key)
+        if claims is MISSING:
+            claims = super()._decode_jwt_from_config(encoded_token)
+            store.set(key, claims, ttl=claims["exp"] - time.time() if "exp" in claims else None)
+        return dict(claims)
+
+
+class JWTApi(Api):
+    """Api leaving the errors of the JWT checks to the handlers of the JWT manager.
+
+    Flask-RESTful answers every exception other than an HTTPException with 500, unless exceptions
+    propagate, which they only do in debug mode; re-raised, a JWT error reaches the handlers the
+    manager registered on the application.
+    """
+
+    def handle_error(self, e: Exception) -> Response:
+        if isinstance(e, (JWTExtendedException, PyJWTError)):
+            raise e
+        return super().handle_error(e)
+
+
+def invalid_token(error: str) -> tuple[Response, int]:
+    """Answer a request with an invalid token with 401, like one without a token."""
+    return jsonify({config.error_msg_key: error}), HTTPStatus.UNAUTHORIZED
+
+
+def digest(encoded_token: str, decode_key: str) -> bytes:
+    """Return a digest of the token and of the key verifying it."""
+    return hashlib.blake2b(f"{decode_key}\0{encoded_token}".encode(), digest_size=16).digest()
+
+
+def stats() -> dict[str, int]:
+    """Return the counters of the token cache."""
+    return store.stats()
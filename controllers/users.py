@@ -2,10 +2,12 @@
 from __future__ import annotations
 
 from http import HTTPStatus
+from flask import Response
 from flask_restful.reqparse import Namespace
 from flask_jwt_extended import create_access_token
 
-from controllers import hashing
+from controllers import admission, conditional, hashing, instrumentation, streaming
+from deps import constants
 from models import users
 
 
@@ -13,35 +15,91 @@ def handle_post(data: Namespace) -> tuple[dict[str, str], int]:
     """Handle the POST request."""
     plaintext_password = data.get("password")
     if plaintext_password:
-        data["password"] = hashing.bcrypt(plaintext_password)
-    users.User.create(data)
+        with instrumentation.span("bcrypt"):
+            data["password"] = hashing.bcrypt(plaintext_password)
+    try:
+        users.User.create(data)
+    except ValueError as e:
+        return {
+            "message": str(e)
+        }, HTTPStatus.CONFLICT
+
     return {
         "message": "User successfully registered."
     }, HTTPStatus.CREATED
 
 
+def handle_bulk(rows: list[tuple[int, dict[str, str | int]]],
+                errors: list[dict[str, object]]) -> tuple[dict[str, str | int | list], int]:
+    """Handle the POST request to the bulk endpoint."""
+    with_password = [data for _, data in rows if data.get("password")]
+    with instrumentation.span("bcrypt"):
+        hashed_passwords = hashing.bcrypt_many(data["password"] for data in with_password)
+    for data, hashed_password in zip(with_password, hashed_passwords):
+        data["password"] = hashed_password
+
+    failed, batches, retried = users.User.bulk_upsert(rows) if rows else ([], 0, 0)
+    # the budget of the route covers one batch; the others and the retried rows are allowed theirs
+    instrumentation.allow_queries(constants.BULK_BATCH_QUERIES * (max(batches - 1, 0) + retried))
+    written = len(rows) - len(failed)
+    errors = sorted(errors + failed, key=lambda e: e["index"])
+
+    if not written and errors:
+        return {
+            "errors": errors,
+            "message": "No users were registered."
+        }, HTTPStatus.BAD_REQUEST
+
+    return {
+        "written": written,
+        "errors": errors,
+        "message": "Users successfully registered." if not errors
+                   else "Some users could not be registered."
+    }, HTTPStatus.MULTI_STATUS if errors else HTTPStatus.CREATED
+
+
 def handle_get(user_id: int) -> tuple[dict[str, str | int |
-                                                         dict[str, str | int]], int]:
+                                                         dict[str, str | int]] | None, int,
+                                           dict[str, str]]:
     """Handle the GET request."""
+    version = users.User.etag(user_id)
+    if not version:
+        return {
+            "message": "User not found."
+        }, HTTPStatus.NOT_FOUND, {}
+
+    etag, last_modified = version
+    headers = conditional.headers(etag, last_modified, cache_control="private, no-cache")
+    if conditional.not_modified(etag, last_modified):
+        return None, HTTPStatus.NOT_MODIFIED, headers
+
     obj = users.User.retrieve(user_id)
     if not obj:
         return {
             "message": "User not found."
-        }, HTTPStatus.NOT_FOUND
+        }, HTTPStatus.NOT_FOUND, {}
 
     return {
         "result": obj,
         "message": "User successfully retrieved."
-    }, HTTPStatus.OK
+    }, HTTPStatus.OK, headers
 
 
 def handle_put(user_id: int, data: Namespace) -> tuple[dict[str, str], int]:
     """Handle the PUT request."""
     plaintext_password = data.get("password")
     if plaintext_password:
-        data["password"] = hashing.bcrypt(plaintext_password)
+        with instrumentation.span("bcrypt"):
+            data["password"] = hashing.bcrypt(plaintext_password)
 
-    if not users.User.update(user_id, data):
+    try:
+        found = users.User.update(user_id, data)
+    except ValueError as e:
+        return {
+            "message": str(e)
+        }, HTTPStatus.CONFLICT
+
+    if not found:
         return {
             "message": "User to update not found."
         }, HTTPStatus.BAD_REQUEST
@@ -51,9 +109,25 @@ def handle_put(user_id: int, data: Namespace) -> tuple[dict[str, str], int]:
     }, HTTPStatus.ACCEPTED
 
 
+def handle_patch(user_id: int, data: Namespace) -> tuple[dict[str, str], int]:
+    """Handle the PATCH request, updating only the fields sent."""
+    if not data:
+        return {
+            "message": "No fields to update."
+        }, HTTPStatus.BAD_REQUEST
+    return handle_put(user_id, data)
+
+
 def handle_delete(user_id: int) -> tuple[dict[str, str] | None, int]:
     """Handle the DELETE request."""
-    if not users.User.delete(user_id):
+    try:
+        found = users.User.delete(user_id)
+    except ValueError as e:
+        return {
+            "message": str(e)
+        }, HTTPStatus.CONFLICT
+
+    if not found:
         return {
             "message": "User to delete not found."
         }, HTTPStatus.BAD_REQUEST
@@ -61,27 +135,57 @@ def handle_delete(user_id: int) -> tuple[dict[str, str] | None, int]:
     return None, HTTPStatus.NO_CONTENT
 
 
-def handle_list() -> tuple[dict[str, str | int], int]:
+def handle_list(data: Namespace) -> tuple[dict[str, str | int] | None, int, dict[str, str]]:
     """Handle the GET request."""
+    etag = users.User.collection_etag()
+    headers = {**conditional.headers(etag, cache_control="private, no-cache"), **streaming.VARY}
+    if conditional.not_modified(etag):
+        return None, HTTPStatus.NOT_MODIFIED, headers
+
+    try:
+        result, next_cursor = users.User.list(data["limit"], data["next"], data["sort"])
+    except ValueError as e:
+        return {
+            "message": str(e)
+        }, HTTPStatus.BAD_REQUEST, streaming.VARY
+
     return {
-        "result": users.User.list(),
+        "result": result,
+        "next": next_cursor,
         "message": "Users successfully retrieved."
-    }, HTTPStatus.OK
+    }, HTTPStatus.OK, headers
+
 
+def handle_stream() -> Response:
+    """Handle the GET request, streaming every user as a line of NDJSON."""
+    return streaming.ndjson_response(users.User.stream())
 
-def handle_login(data: Namespace) -> tuple[dict[str, str], int]:
+
+def handle_login(data: Namespace) -> tuple[dict[str, str], int, dict[str, str]]:
     """Handle the POST request."""
     username = data["username"]
     plaintext_password = data["password"]
 
-    obj = users.User.search_by_username(username)
-    if obj and hashing.verify(obj.password, plaintext_password):
+    with admission.login.admit() as admitted:
+        if not admitted:
+            return {
+                "message": "Too many log in attempts in progress, please retry later."
+            }, HTTPStatus.SERVICE_UNAVAILABLE, {"Retry-After": str(constants.LOGIN_RETRY_AFTER)}
+
+        obj = users.User.search_by_username(username)
+        with instrumentation.span("bcrypt"):
+            valid, new_hash = (hashing.verify_and_update(obj.password, plaintext_password) if obj
+                               else (False, None))
+
+    if valid:
+        if new_hash:
+            users.User.rehash(obj.user_id, new_hash)
         token = create_access_token(identity=username)
         return {
             "message": f"Logged in as {username}.",
             "token": token
-        }, HTTPStatus.OK
+        }, HTTPStatus.OK, {}
 
     return {
         "message": "Invalid credentials."
-    }, HTTPStatus.UNAUTHORIZED
+    }, HTTPStatus.UNAUTHORIZED, {}
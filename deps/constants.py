@@ -1,7 +1,170 @@
 """Defines application constants."""
 
+# STARZZ_DATABASE_URI overrides it
 SQLITE_URI = "sqlite:///{}/deps/db.sqlite3"
 
 VALIDATE_NOT_NULL = "This field cannot be blank."
 JWT_SECRET_KEY = "this_is_supposed_to_be_secret"
 JWT_ACCESS_TOKEN_EXPIRES = 30
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# stars listed under each constellation of a galaxy's tree
+TREE_STAR_LIMIT = 10
+STAR_SORT_KEYS = ("star_id", "star_name", "apparent_magnitude")
+CONSTELLATION_SORT_KEYS = ("constellation_id", "constellation_name")
+GALAXY_SORT_KEYS = ("galaxy_id", "galaxy_name", "distance_mly")
+USER_SORT_KEYS = ("user_id", "username", "last_name")
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+# "orjson", "json" (stdlib) or "auto" for orjson if installed; STARZZ_JSON_ENCODER overrides it
+JSON_ENCODER = "auto"
+
+# zlib level of the gzip and deflate responses; STARZZ_COMPRESSION_LEVEL overrides it
+COMPRESSION_LEVEL = 6
+# smaller bodies are sent uncompressed, the headers and framing would outweigh the savings
+COMPRESSION_MIN_BYTES = 1024
+COMPRESSION_MIMETYPES = ("application/json", NDJSON_MIMETYPE)
+COMPRESSION_CACHE_MAX_ENTRIES = 1000
+
+# "on" sends the Server-Timing header and records /metrics; STARZZ_INSTRUMENTATION overrides it
+INSTRUMENTATION = "on"
+# upper bounds in seconds of the buckets of the request latency histograms
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# "warn" logs the requests running more SQL statements than the budget of their route, "raise"
+# fails the safe ones and logs the others, whose writes are committed by then, and "off" does not
+# check them; STARZZ_QUERY_BUDGET_MODE overrides it
+QUERY_BUDGET_MODE = "warn"
+# most SQL statements a request to the route runs, by "METHOD route": the nearest stars search
+# widens its cone up to 5 times and a login may rehash the password; the bulk requests are allowed
+# BULK_BATCH_QUERIES more for every batch after the first and for every row of a batch retried row
+# by row.
+# tests/test_query_counts.py checks the exact count of each resource method.
+QUERY_BUDGETS = {
+    "GET /constellations": 2,
+    "POST /constellations": 2,
+    "POST /constellations/bulk": 4,
+    "GET /constellations/<int:constellation_id>": 2,
+    "PUT /constellations/<int:constellation_id>": 2,
+    "PATCH /constellations/<int:constellation_id>": 2,
+    "DELETE /constellations/<int:constellation_id>": 2,
+    "GET /constellations/<int:constellation_id>/stars": 3,
+    "GET /galaxies": 2,
+    "POST /galaxies": 2,
+    "POST /galaxies/bulk": 4,
+    "GET /galaxies/<int:galaxy_id>": 2,
+    "PUT /galaxies/<int:galaxy_id>": 2,
+    "PATCH /galaxies/<int:galaxy_id>": 2,
+    "DELETE /galaxies/<int:galaxy_id>": 2,
+    "GET /galaxies/<int:galaxy_id>/constellations": 3,
+    "GET /galaxies/<int:galaxy_id>/tree": 4,
+    "GET /stars": 2,
+    "POST /stars": 2,
+    "POST /stars/bulk": 4,
+    "GET /stars/near": 6,
+    "GET /stars/<int:star_id>": 2,
+    "PUT /stars/<int:star_id>": 2,
+    "PATCH /stars/<int:star_id>": 2,
+    "DELETE /stars/<int:star_id>": 2,
+    "GET /users": 2,
+    "POST /users": 2,
+    "POST /users/bulk": 4,
+    "GET /users/<int:user_id>": 2,
+    "PUT /users/<int:user_id>": 2,
+    "PATCH /users/<int:user_id>": 2,
+    "DELETE /users/<int:user_id>": 2,
+    "POST /login": 2,
+    "GET /cache": 0,
+    "GET /cache/tokens": 0,
+    "GET /cache/compressed": 0,
+    "GET /metrics": 0,
+    "GET /search": 2,
+    "GET /stats": 0,
+    "GET /stats/users/<int:user_id>": 1,
+    "GET /stats/<string:name>": 1
+}
+# statements run by each batch of a bulk upsert, and by each row of a retried batch: SAVEPOINT,
+# INSERT and RELEASE
+BULK_BATCH_QUERIES = 3
+# statements of a request taking at least this many seconds are logged, with the shape of their
+# parameters and the model method running them; STARZZ_SLOW_QUERY_SECONDS overrides it
+SLOW_QUERY_SECONDS = 0.1
+# longer statements are truncated in the log
+SLOW_QUERY_MAX_LENGTH = 1000
+STREAM_BATCH_SIZE = 1000
+
+CACHE_MAX_ENTRIES = 10000
+CACHE_TTL_SECONDS = 60
+
+BULK_MAX_ROWS = 100000
+BULK_BATCH_SIZE = 500
+
+LOAD_BATCH_SIZE = 50000
+
+# a search query must contain a word of at least this many characters
+SEARCH_MIN_PREFIX = 2
+
+# the engine profile is selected with the STARZZ_ENV environment variable
+DEFAULT_ENVIRONMENT = "development"
+SQLITE_PRAGMAS = {
+    "development": {
+        "journal_mode": "WAL",
+        "busy_timeout": 5000,
+        "foreign_keys": "ON"
+    },
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 268435456,
+        "cache_size": -65536,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+        "foreign_keys": "ON"
+    }
+}
+ENGINE_OPTIONS = {
+    "development": {},
+    "production": {
+        "pool_size": 16,
+        "max_overflow": 16,
+        "pool_timeout": 10,
+        "pool_recycle": 3600
+    }
+}
+
+# bcrypt cost (log2 of the rounds); STARZZ_BCRYPT_ROUNDS overrides it, "auto" calibrates it at startup
+BCRYPT_ROUNDS = 12
+BCRYPT_TARGET_SECONDS = 0.25
+# number of hashing processes of each server process; if None, the CPUs are shared among the
+# gunicorn workers, each starting at least one
+HASHING_WORKERS = None
+# logins running and waiting at once, shared among the gunicorn workers
+LOGIN_MAX_RUNNING = 8
+LOGIN_MAX_WAITING = 32
+LOGIN_WAIT_SECONDS = 5
+LOGIN_RETRY_AFTER = 1
+
+TOKEN_CACHE_MAX_ENTRIES = 10000
+
+# radius in degrees of the first cone tried by the nearest stars search, quadrupled until full
+NEAREST_START_RADIUS = 1.0
+
+# gunicorn.conf.py; STARZZ_BIND, STARZZ_WORKERS and STARZZ_THREADS override them
+SERVER_BIND = "127.0.0.1:8000"
+# number of worker processes, 2 * CPUs + 1 if None
+SERVER_WORKERS = None
+SERVER_THREADS = 4
+SERVER_TIMEOUT = 30
+SERVER_GRACEFUL_TIMEOUT = 30
+# a worker is replaced after serving this many requests, give or take the jitter
+SERVER_MAX_REQUESTS = 10000
+SERVER_MAX_REQUESTS_JITTER = 1000
+
+# startup budget in milliseconds, checked by python -m benchmarks.startup --check: about 20% above
+# the measured medians (703, 16, 90 and 40 ms)
+STARTUP_BUDGET_MS = {
+    "import": 850,
+    "first_party_import": 20,
+    "create_app": 110,
+    "first_request": 50
+}
@@ -0,0 +1,106 @@
+"""Generates reproducible synthetic users, galaxies, constellations and stars.
+
+Every table is generated from its own random stream seeded by ``seed``, so the same arguments
+always produce the same rows.  The values follow the ranges of the dummy data in ``assets/load.sql``.
+"""
+from __future__ import annotations
+
+import random
+import string
+from collections.abc import Iterator
+
+
+USER_COLUMNS = ["user_id", "username", "email", "password", "first_name", "last_name",
+                "date_of_birth"]
+GALAXY_COLUMNS = ["galaxy_id", "galaxy_name", "galaxy_type", "distance_mly", "redshift",
+                  "mass_solar", "diameter_ly", "added_by", "verified_by"]
+CONSTELLATION_COLUMNS = ["constellation_id", "constellation_name", "galaxy_id", "added_by",
+                         "verified_by"]
+STAR_COLUMNS = ["star_id", "star_name", "star_type", "constellation_id", "right_ascension",
+                "declination", "apparent_magnitude", "spectral_type", "added_by", "verified_by"]
+
+FIRST_NAMES = ["Eliot", "Laurel", "Torey", "Moyna", "Darius", "Sashenka", "Odette", "Ariel",
+               "Bram", "Celia", "Dov", "Esme", "Finn", "Greta", "Hugo", "Ines"]
+LAST_NAMES = ["Balducci", "Dilloway", "Perazzo", "Easen", "Barwis", "Shearmur", "Garriock",
+              "Ashby", "Brook", "Carver", "Dunne", "Ellis", "Fenn", "Gale", "Hart", "Ives"]
+EMAIL_DOMAINS = ["aol.com", "gmail.com", "yahoo.com", "outlook.com"]
+GALAXY_TYPES = ["Barred Spiral", "Spiral", "Lenticular", "Dwarf Elliptical", "Dwarf Irregular",
+                "Irregular", "Ring", "Elliptical", "Peculiar"]
+STAR_TYPES = ["red dwarf star", "eclipsing variable star", "variable star", "supergiant star",
+              "long-period variable star", "flare star", "neutron star", "giant star",
+              "white dwarf star", "binary star", "dwarf star", "brown dwarf", "pulsar",
+              "blue straggler star"]
+SPECTRAL_TYPES = ["O", "B", "A", "F", "G", "K", "M"]
+NAME_CHARACTERS = string.ascii_letters + string.digits
+
+
+def _rng(seed: int, table: str) -> random.Random:
+    """Return the random stream of the table."""
+    return random.Random(f"{seed}-{table}")
+
+
+def _code(rng: random.Random, length: int) -> str:
+    """Return a random alphanumeric code."""
+    return "".join(rng.choices(NAME_CHARACTERS, k=length))
+
+
+def _verifier(rng: random.Random, user_ids: range) -> int | None:
+    """Return a random verifying user, or None for the rows that are not verified yet."""
+    return rng.choice(user_ids) if rng.random() < 0.8 else None
+
+
+def users(ids: range, seed: int, password_hash: str) -> Iterator[tuple]:
+    """Yield the rows of the users with the given ids, all sharing the same password hash."""
+    rng = _rng(seed, "users")
+    for user_id in ids:
+        first_name = rng.choice(FIRST_NAMES)
+        last_name = rng.choice(LAST_NAMES)
+        yield (user_id,
+               f"{first_name[0].lower()}{last_name.lower()}{user_id}",
+               f"{first_name.lower()}.{last_name.lower()}{user_id}@{rng.choice(EMAIL_DOMAINS)}",
+               password_hash,
+               first_name,
+               last_name,
+               f"{rng.randint(1940, 2005)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}")
+
+
+def galaxies(ids: range, user_ids: range, seed: int) -> Iterator[tuple]:
+    """Yield the rows of the galaxies with the given ids."""
+    rng = _rng(seed, "galaxies")
+    for galaxy_id in ids:
+        yield (galaxy_id,
+               f"GAL-{_code(rng, 5)}",
+               rng.choice(GALAXY_TYPES),
+               rng.randint(100, 13000),
+               rng.randint(0, 10),
+               rng.randint(1000000, 9000000),
+               rng.randint(5000, 1000000),
+               rng.choice(user_ids),
+               _verifier(rng, user_ids))
+
+
+def constellations(ids: range, galaxy_ids: range, user_ids: range, seed: int) -> Iterator[tuple]:
+    """Yield the rows of the constellations with the given ids."""
+    rng = _rng(seed, "constellations")
+    for constellation_id in ids:
+        yield (constellation_id,
+               f"CON-{_code(rng, 5)}",
+               rng.choice(galaxy_ids),
+               rng.choice(user_ids),
+               _verifier(rng, user_ids))
+
+
+def stars(ids: range, constellation_ids: range, user_ids: range, seed: int) -> Iterator[tuple]:
+    """Yield the rows of the stars with the given ids."""
+    rng = _rng(seed, "stars")
+    for star_id in ids:
+        yield (star_id,
+               f"S-{_code(rng, 5)}",
+               rng.choice(STAR_TYPES),
+               rng.choice(constellation_ids),
+               rng.randint(0, 24),
+               rng.randint(-89, 89),
+               rng.randint(-29, 30),
+               rng.choice(SPECTRAL_TYPES),
+               rng.choice(user_ids),
+               _verifier(rng, user_ids))
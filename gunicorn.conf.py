@@ -0,0 +1,38 @@
+"""The gunicorn configuration of the application, served with ``gunicorn -c gunicorn.conf.py``.
+
+The application is loaded once in the master before the workers are forked, so they share its
+memory; each worker then opens its own database connections and hashing processes, sharing the CPUs
+and the login limits with the other workers.  Send HUP to
+the master to replace the workers gracefully, and USR2 then TERM to the old master to load new code.
+"""
+import multiprocessing
+import os
+
+from deps import constants
+
+
+os.environ.setdefault("STARZZ_ENV", "production")
+
+wsgi_app = "wsgi:application"
+bind = os.environ.get("STARZZ_BIND", constants.SERVER_BIND)
+workers = int(os.environ.get("STARZZ_WORKERS",
+                             constants.SERVER_WORKERS or 2 * multiprocessing.cpu_count() + 1))
+worker_class = "gthread"
+threads = int(os.environ.get("STARZZ_THREADS", constants.SERVER_THREADS))
+timeout = constants.SERVER_TIMEOUT
+graceful_timeout = constants.SERVER_GRACEFUL_TIMEOUT
+max_requests = constants.SERVER_MAX_REQUESTS
+max_requests_jitter = constants.SERVER_MAX_REQUESTS_JITTER
+preload_app = True
+
+
+def post_fork(server: object, worker: object) -> None:
+    """Reset the state the worker inherited from the master."""
+    import app
+    app.after_fork(server.cfg.workers)
+
+
+def worker_exit(server: object, worker: object) -> None:
+    """Release the resources of the worker."""
+    import app
+    app.worker_exit()
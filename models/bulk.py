@@ -0,0 +1,61 @@
+"""This module implements the batched upserts behind the bulk_upsert() methods of the models."""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import IntegrityError
+
+from config import db
+from deps import constants
+from models import versions
+
+
+class Upserted(NamedTuple):
+    """The errors of the failed rows of an upsert, and the batches and rows it executed."""
+    errors: list[dict[str, object]]
+    batches: int
+    retried: int
+
+
+def upsert(model: type, rows: list[tuple[int, dict[str, str | int]]]) -> Upserted:
+    """Insert or update the rows within the current transaction and return the failed ones.
+
+    Rows are written with ``INSERT ... ON CONFLICT DO UPDATE`` executed in batches.  The rows
+    sending the same fields share a statement updating only those fields, so a field left out of a
+    row keeps its value while an explicit null still clears it.  Each batch runs in a savepoint; if
+    it fails, its rows are retried one by one so that only the rows that actually fail are
+    reported.  The number of batches and of retried rows is returned with the errors, so the
+    caller can allow their statements on top of the query budget.
+    """
+    pk_name = model.__mapper__.primary_key[0].name
+    version = versions.bump(model.__tablename__)
+    updated_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    groups: dict[tuple[str, ...], list[tuple[int, dict[str, str | int]]]] = {}
+    for index, data in rows:
+        params = {**data, "version": version, "updated_at": updated_at}
+        groups.setdefault(tuple(params), []).append((index, params))
+
+    errors, batches, retried = [], 0, 0
+    for names, params in groups.items():
+        statement = insert(model.__table__)
+        statement = statement.on_conflict_do_update(
+            index_elements=[pk_name],
+            set_={name: statement.excluded[name] for name in names if name != pk_name}
+        )
+        for start in range(0, len(params), constants.BULK_BATCH_SIZE):
+            batch = params[start:start + constants.BULK_BATCH_SIZE]
+            batches += 1
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(statement, [data for _, data in batch])
+            except IntegrityError:
+                retried += len(batch)
+                for index, data in batch:
+                    try:
+                        with db.session.begin_nested():
+                            db.session.execute(statement, [data])
+                    except IntegrityError as e:
+                        errors.append({"index": index, "message": str(e.orig)})
+    return Upserted(errors, batches, retried)
@@ -0,0 +1,136 @@
+"""This module implements the read-through cache placed in front of the retrieve() and list() methods.
+
+Every table has a generation counter, and a second one for its partial JSON (the part that is
+embedded in the documents of other tables).  The generations of the tables a document depends
+on are part of its cache key, so a write only has to bump a counter: stale entries are never
+looked up again and are eventually evicted.
+"""
+from __future__ import annotations
+
+import functools
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+from deps import constants
+
+
+# returned by LRUCache.get() for a key without a live entry, as None may be a cached value
+MISSING = object()
+
+
+class LRUCache:
+    """A thread-safe LRU cache whose entries also expire after a time-to-live."""
+
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Any:
+        """Return the value stored under the key, or MISSING."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: tuple, value: Any, ttl: float | None = None) -> None:
+        """Store the value under the key, evicting the least recently used entries if full.
+
+        ``ttl`` overrides the time-to-live of the cache for this entry.
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        """Return the counters of the cache."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+
+store = LRUCache(constants.CACHE_MAX_ENTRIES, constants.CACHE_TTL_SECONDS)
+_generations: dict[str, int] = {}
+_generations_lock = threading.Lock()
+# the versions of the tables seen by sync()
+_synced_versions: dict[str, int] = {}
+
+
+def invalidate(table: str, partial: bool = True) -> None:
+    """Invalidate the cached documents of the table.
+
+    With ``partial``, the documents of other tables that embed this table's partial JSON
+    are invalidated as well.
+    """
+    with _generations_lock:
+        _generations[table] = _generations.get(table, 0) + 1
+        if partial:
+            key = f"{table}:partial"
+            _generations[key] = _generations.get(key, 0) + 1
+
+
+def sync(table_versions: dict[str, int]) -> None:
+    """Invalidate the tables whose version changed since the last call.
+
+    Each process serving the application has its own cache, which its own writes invalidate.  When
+    several processes serve it, each one calls this with the versions of every table, read from
+    the database, before handling a request, so the writes of the others invalidate it too.
+    """
+    with _generations_lock:
+        changed = [table for table, version in table_versions.items()
+                   if _synced_versions.get(table) != version]
+        _synced_versions.update(table_versions)
+    for table in changed:
+        invalidate(table)
+
+
+def stats() -> dict[str, int]:
+    """Return the counters of the cache."""
+    return store.stats()
+
+
+def cached(*depends: str) -> Callable:
+    """Cache the results of a model classmethod.
+
+    ``depends`` names the generation counters the result depends on, e.g. ``"stars"`` for
+    the star's own columns and ``"users:partial"`` for the embedded users.  Cached values
+    are shared between callers and must not be mutated.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(cls: type, *args: Any, **kwargs: Any) -> Any:
+            generations = tuple(_generations.get(name, 0) for name in depends)
+            key = (cls.__name__, func.__name__, generations, args, tuple(sorted(kwargs.items())))
+            value = store.get(key)
+            if value is MISSING:
+                value = func(cls, *args, **kwargs)
+                store.set(key, value)
+            return value
+        return wrapper
+    return decorator
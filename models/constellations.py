@@ -1,24 +1,43 @@
 """This module defines the Constellation model for the CRUD operations."""
 from __future__ import annotations
 
+from collections.abc import Iterator
+from datetime import datetime
 from typing_extensions import Self
 
 from sqlalchemy.orm import relationship
 
 from config import db
+from deps import constants
+from models import bulk, cache, filtering, loading, pagination, transactions, versions, writes
 from models.galaxies import Galaxy
 from models.users import User
 
 
+EXPANDABLE = {
+    "galaxy": "galaxy_info",
+    "added_by": "constellation_added_info",
+    "verified_by": "constellation_verified_info"
+}
+# the columns of the partial JSON, embedded in the documents of other tables
+PARTIAL_COLUMNS = ("constellation_name",)
+# the filters of list(): query parameter -> (column, comparison), all served by an index
+FILTERS = {
+    "galaxy_id": ("galaxy_id", "eq")
+}
+
+
 class Constellation(db.Model):
     """Model for Constellation objects."""
     __tablename__ = "constellations"
 
     constellation_id = db.Column(db.Integer, primary_key=True)
-    constellation_name = db.Column(db.String)
-    galaxy_id = db.Column(db.Integer, db.ForeignKey("galaxies.galaxy_id"))
-    added_by = db.Column(db.Integer, db.ForeignKey("users.user_id"))
-    verified_by = db.Column(db.Integer, db.ForeignKey("users.user_id"))
+    constellation_name = db.Column(db.String, index=True)
+    galaxy_id = db.Column(db.Integer, db.ForeignKey("galaxies.galaxy_id"), index=True)
+    added_by = db.Column(db.Integer, db.ForeignKey("users.user_id"), index=True)
+    verified_by = db.Column(db.Integer, db.ForeignKey("users.user_id"), index=True)
+    version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    updated_at = db.Column(db.DateTime)
 
     galaxy_info = relationship("Galaxy")
     constellation_added_info = relationship("User", foreign_keys=[added_by])
@@ -40,47 +59,95 @@ class Constellation(db.Model):
     def create(cls, data: dict[str, str | int]) -> None:
         """Insert a new object into the database."""
         obj = cls(data)
-        db.session.add(obj)
-        db.session.commit()
+        with transactions.write():
+            versions.stamp(obj)
+            db.session.add(obj)
+        cache.invalidate(cls.__tablename__)
 
     @classmethod
-    def retrieve(cls, constellation_id: int) -> dict[str, str | int] | None:
-        """Return a JSON representation of the object if found, otherwise return None."""
-        obj = cls.search(constellation_id)
+    @cache.cached("constellations", "galaxies:partial", "users:partial")
+    def retrieve(cls, constellation_id: int, expand: str | None = None) -> dict[str, str | int] | None:
+        """Return a JSON representation of the object if found, otherwise return None.
+
+        The expanded relations are joined into the same SELECT; the others are never loaded.
+        """
+        names = loading.parse_expand(expand, EXPANDABLE)
+        obj = db.session.get(cls, constellation_id,
+                             options=loading.eager_options(cls, EXPANDABLE, names))
         if not obj:
             return None
-        return obj.to_full_json()
+        return obj.to_full_json(names)
 
     @classmethod
-    def update(cls, constellation_id: int, data: dict[str, str | int]) -> bool:
-        """Update the object in the database."""
-        obj = cls.search(constellation_id)
-        if not obj:
-            return False
+    def etag(cls, constellation_id: int, expand: str | None = None) -> tuple[str, datetime | None] | None:
+        """Return the ETag and last modification time of the object if found, otherwise return None."""
+        names = loading.parse_expand(expand, EXPANDABLE)
+        return versions.row_etag(cls, constellation_id, EXPANDABLE, names)
 
-        data["constellation_id"] = constellation_id
-        for k, v in data.items():
-            setattr(obj, k, v)
-        db.session.add(obj)
-        db.session.commit()
-        return True
+    @classmethod
+    def collection_etag(cls) -> str:
+        """Return the ETag of the list of objects, derived from the version of the table."""
+        return versions.collection_etag(cls.__tablename__)
+
+    @classmethod
+    def update(cls, constellation_id: int, data: dict[str, str | int]) -> bool:
+        """Update the given fields of the object in the database and return whether it exists."""
+        return writes.update(cls, constellation_id, data, PARTIAL_COLUMNS)
 
     @classmethod
     def delete(cls, constellation_id: int) -> bool:
-        """Delete the object from the database."""
-        obj = cls.search(constellation_id)
-        if not obj:
-            return False
+        """Delete the object from the database and return whether it existed."""
+        return writes.delete(cls, constellation_id)
 
-        db.session.delete(obj)
+    @classmethod
+    def bulk_upsert(cls, rows: list[tuple[int, dict[str, str | int]]]) -> bulk.Upserted:
+        """Insert or update the rows in a single transaction and return the errors of the failed rows."""
+        upserted = bulk.upsert(cls, rows)
         db.session.commit()
-        return True
+        cache.invalidate(cls.__tablename__)
+        return upserted
+
+    @classmethod
+    @cache.cached("constellations")
+    def list(cls, limit: int = constants.DEFAULT_PAGE_SIZE, cursor: str | None = None,
+             sort: str | None = None, filters: tuple[tuple[str, object], ...] = ()
+             ) -> tuple[list[dict[str, str | int]], str | None]:
+        """Return a page of objects present in the database and the cursor to the next page.
+
+        ``filters`` holds (name, value) pairs of FILTERS; a combination that no index serves is
+        rejected with ValueError.
+        """
+        query = filtering.apply(cls.query, cls, FILTERS, filters)
+        list_of_objs, next_cursor = pagination.paginate(query, cls, "constellation_id",
+                                                        constants.CONSTELLATION_SORT_KEYS,
+                                                        limit, cursor, sort)
+        return [obj.to_partial_json() for obj in list_of_objs], next_cursor
+
+    @classmethod
+    @cache.cached("constellations", "users:partial")
+    def of_galaxy(cls, galaxy_id: int, limit: int = constants.DEFAULT_PAGE_SIZE,
+                  cursor: str | None = None, sort: str | None = None
+                  ) -> tuple[list[dict[str, str | int | dict[str, str | int]]], str | None]:
+        """Return a page of the constellations of the galaxy and the cursor to the next page.
+
+        The users of the page are joined into the same SELECT.
+        """
+        query = cls.query.filter(cls.galaxy_id == galaxy_id).options(
+            *loading.eager_options(cls, EXPANDABLE, loading.CONTRIBUTORS))
+        list_of_objs, next_cursor = pagination.paginate(query, cls, "constellation_id",
+                                                        constants.CONSTELLATION_SORT_KEYS,
+                                                        limit, cursor, sort)
+        return [obj.to_full_json(loading.CONTRIBUTORS) for obj in list_of_objs], next_cursor
 
     @classmethod
-    def list(cls) -> list[dict[str, str | int]]:
-        """Return a list of objects present in the database."""
-        list_of_objs = cls.query.all()
-        return [obj.to_partial_json() for obj in list_of_objs]
+    def stream(cls, filters: tuple[tuple[str, object], ...] = ()) -> Iterator[dict[str, str | int]]:
+        """Return the objects matching the filters, fetched lazily in batches from a server-side cursor.
+
+        As for list(), a combination of filters that no index serves is rejected with ValueError,
+        before any row is fetched.
+        """
+        query = filtering.apply(cls.query, cls, FILTERS, filters).order_by(cls.constellation_id)
+        return (obj.to_partial_json() for obj in query.yield_per(constants.STREAM_BATCH_SIZE))
 
     def to_partial_json(self) -> dict[str, str | int]:
         """Return a partial JSON representation of this object."""
@@ -89,14 +156,15 @@ class Constellation(db.Model):
             "constellation_name": self.constellation_name
         }
 
-    def to_full_json(self) -> dict[str, str | int | dict[str, str | int]]:
-        """Return a full JSON representation of this object."""
-        obj = self.galaxy_info
-        galaxy = obj.to_partial_json() if obj else {}
-        obj = self.constellation_added_info
-        added_by = obj.to_partial_json() if obj else {}
-        obj = self.constellation_verified_info
-        verified_by = obj.to_partial_json() if obj else {}
+    def to_full_json(self, expand: tuple[str, ...] = tuple(EXPANDABLE)
+                     ) -> dict[str, str | int | dict[str, str | int]]:
+        """Return a full JSON representation of this object, embedding the expanded relations."""
+        galaxy = loading.related_json(self, "galaxy_info", "galaxy" in expand,
+                                      "galaxy_id", self.galaxy_id)
+        added_by = loading.related_json(self, "constellation_added_info", "added_by" in expand,
+                                        "user_id", self.added_by)
+        verified_by = loading.related_json(self, "constellation_verified_info", "verified_by" in expand,
+                                           "user_id", self.verified_by)
 
         return {
             **self.to_partial_json(),
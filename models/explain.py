@@ -0,0 +1,25 @@
+"""This module asks SQLite, with EXPLAIN QUERY PLAN, how it would run a statement."""
+from __future__ import annotations
+
+from config import db
+
+
+def full_scans(statement: str, parameters: tuple | dict, filtered: bool = False) -> list[str]:
+    """Return the steps of the statement's query plan that scan a whole table.
+
+    Only a SEARCH step, which looks the rows up through an index, is bounded.  A SCAN, of the table
+    or of an index, reads every row unless SQLite can stop early, which is only certain when the
+    statement is not ``filtered`` beyond the keyset of its page, the scan returns the rows in the
+    requested order and the statement has a LIMIT: every row scanned then belongs to the page.
+    With a filter, the scan goes on until enough rows match, i.e. through the whole table for a
+    selective one.
+    """
+    with db.engine.connect() as connection:
+        plan = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    steps = [row[-1] for row in plan]
+
+    # a temp B-tree for the RIGHT PART of the ORDER BY only sorts the ties of the scanned index
+    ordered = not any(step.startswith("USE TEMP B-TREE FOR ORDER BY") for step in steps)
+    bounded = not filtered and ordered and " LIMIT " in statement.upper()
+    return [step for step in steps if step.startswith("SCAN ") and not bounded]
+
@@ -0,0 +1,56 @@
+"""This module compiles the filters of the list() methods into the WHERE clause of their query.
+
+Every model declares its filters as a mapping from the query parameter to the column it applies
+to and the comparison made; each of these columns is indexed.  A combination of filters is only
+accepted if one of them looks its rows up through an index, so that no filtered page or stream
+reads a whole table.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable
+
+from sqlalchemy.orm import Query
+
+
+COMPARISONS: dict[str, Callable] = {
+    "eq": lambda column, value: column == value,
+    "min": lambda column, value: column >= value,
+    "max": lambda column, value: column <= value,
+    # the value tells whether the column must be set, e.g. verified_by for "verified"
+    "present": lambda column, value: column.isnot(None) if value else column.is_(None)
+}
+# IS NOT NULL matches most rows of a column: the index does not narrow the search down
+UNSELECTIVE = {("present", True)}
+
+
+def apply(query: Query, model: type, filters: dict[str, tuple[str, str]],
+          values: tuple[tuple[str, object], ...]) -> Query:
+    """Return the query restricted by the given (name, value) pairs of the declared filters.
+
+    ValueError is raised if none of the filters is served by an index, see require_index().
+    """
+    for name, value in values:
+        if name not in filters:
+            raise ValueError(f"Cannot filter by '{name}'.")
+        column, comparison = filters[name]
+        query = query.filter(COMPARISONS[comparison](getattr(model, column), value))
+    if values:
+        require_index(model, filters, values)
+    return query
+
+
+def require_index(model: type, filters: dict[str, tuple[str, str]],
+                  values: tuple[tuple[str, object], ...]) -> None:
+    """Raise ValueError unless one of the filters looks its rows up through an index.
+
+    A filter does when its column leads an index of the table and its comparison is selective.
+    The check only depends on the shape of the filters and the indexes declared by the model, not
+    on the plan SQLite picks from the statistics of the tables, so the same request is accepted
+    whatever the size of the database.
+    """
+    leading = {index.columns[0].name for index in model.__table__.indexes}
+    for name, value in values:
+        column, comparison = filters[name]
+        if column in leading and (comparison, value) not in UNSELECTIVE:
+            return
+    raise ValueError("This combination of filters cannot be served by an index.")
@@ -1,27 +1,49 @@
 """This module defines the Galaxy model for the CRUD operations."""
 from __future__ import annotations
 
+from collections.abc import Iterator
+from datetime import datetime
 from typing_extensions import Self
 
 from sqlalchemy.orm import relationship
 
 from config import db
+from deps import constants
+from models import bulk, cache, filtering, loading, pagination, transactions, versions, writes
 from models.users import User
 
 
+EXPANDABLE = {
+    "added_by": "galaxy_added_info",
+    "verified_by": "galaxy_verified_info"
+}
+# the columns of the partial JSON, embedded in the documents of other tables
+PARTIAL_COLUMNS = ("galaxy_name",)
+# the filters of list(): query parameter -> (column, comparison), all served by an index
+FILTERS = {
+    "galaxy_type": ("galaxy_type", "eq"),
+    "distance_mly_min": ("distance_mly", "min"),
+    "distance_mly_max": ("distance_mly", "max"),
+    "redshift_min": ("redshift", "min"),
+    "redshift_max": ("redshift", "max")
+}
+
+
 class Galaxy(db.Model):
     """Model for Galaxy objects."""
     __tablename__ = "galaxies"
 
     galaxy_id = db.Column(db.Integer, primary_key=True)
-    galaxy_name = db.Column(db.String)
-    galaxy_type = db.Column(db.String)
-    distance_mly = db.Column(db.Integer)
-    redshift = db.Column(db.Integer)
+    galaxy_name = db.Column(db.String, index=True)
+    galaxy_type = db.Column(db.String, index=True)
+    distance_mly = db.Column(db.Integer, index=True)
+    redshift = db.Column(db.Integer, index=True)
     mass_solar = db.Column(db.Integer)
     diameter_ly = db.Column(db.Integer)
-    added_by = db.Column(db.Integer, db.ForeignKey("users.user_id"))
-    verified_by = db.Column(db.Integer, db.ForeignKey("users.user_id"))
+    added_by = db.Column(db.Integer, db.ForeignKey("users.user_id"), index=True)
+    verified_by = db.Column(db.Integer, db.ForeignKey("users.user_id"), index=True)
+    version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    updated_at = db.Column(db.DateTime)
 
     galaxy_added_info = relationship("User", foreign_keys=[added_by])
     galaxy_verified_info = relationship("User", foreign_keys=[verified_by])
@@ -46,47 +68,79 @@ class Galaxy(db.Model):
     def create(cls, data: dict[str, str | int]) -> None:
         """Insert a new object into the database."""
         obj = cls(data)
-        db.session.add(obj)
-        db.session.commit()
+        with transactions.write():
+            versions.stamp(obj)
+            db.session.add(obj)
+        cache.invalidate(cls.__tablename__)
 
     @classmethod
-    def retrieve(cls, galaxy_id: int) -> dict[str, str | int] | None:
-        """Return a JSON representation of the object if found, otherwise return None."""
-        obj = cls.search(galaxy_id)
+    @cache.cached("galaxies", "users:partial")
+    def retrieve(cls, galaxy_id: int, expand: str | None = None) -> dict[str, str | int] | None:
+        """Return a JSON representation of the object if found, otherwise return None.
+
+        The expanded relations are joined into the same SELECT; the others are never loaded.
+        """
+        names = loading.parse_expand(expand, EXPANDABLE)
+        obj = db.session.get(cls, galaxy_id,
+                             options=loading.eager_options(cls, EXPANDABLE, names))
         if not obj:
             return None
-        return obj.to_full_json()
+        return obj.to_full_json(names)
 
     @classmethod
-    def update(cls, galaxy_id: int, data: dict[str, str | int]) -> bool:
-        """Update the object in the database."""
-        obj = cls.search(galaxy_id)
-        if not obj:
-            return False
+    def etag(cls, galaxy_id: int, expand: str | None = None) -> tuple[str, datetime | None] | None:
+        """Return the ETag and last modification time of the object if found, otherwise return None."""
+        names = loading.parse_expand(expand, EXPANDABLE)
+        return versions.row_etag(cls, galaxy_id, EXPANDABLE, names)
 
-        data["galaxy_id"] = galaxy_id
-        for k, v in data.items():
-            setattr(obj, k, v)
-        db.session.add(obj)
-        db.session.commit()
-        return True
+    @classmethod
+    def collection_etag(cls) -> str:
+        """Return the ETag of the list of objects, derived from the version of the table."""
+        return versions.collection_etag(cls.__tablename__)
+
+    @classmethod
+    def update(cls, galaxy_id: int, data: dict[str, str | int]) -> bool:
+        """Update the given fields of the object in the database and return whether it exists."""
+        return writes.update(cls, galaxy_id, data, PARTIAL_COLUMNS)
 
     @classmethod
     def delete(cls, galaxy_id: int) -> bool:
-        """Delete the object from the database."""
-        obj = cls.search(galaxy_id)
-        if not obj:
-            return False
+        """Delete the object from the database and return whether it existed."""
+        return writes.delete(cls, galaxy_id)
 
-        db.session.delete(obj)
+    @classmethod
+    def bulk_upsert(cls, rows: list[tuple[int, dict[str, str | int]]]) -> bulk.Upserted:
+        """Insert or update the rows in a single transaction and return the errors of the failed rows."""
+        upserted = bulk.upsert(cls, rows)
         db.session.commit()
-        return True
+        cache.invalidate(cls.__tablename__)
+        return upserted
 
     @classmethod
-    def list(cls) -> list[dict[str, str | int]]:
-        """Return a list of objects present in the database."""
-        list_of_objs = cls.query.all()
-        return [obj.to_partial_json() for obj in list_of_objs]
+    @cache.cached("galaxies")
+    def list(cls, limit: int = constants.DEFAULT_PAGE_SIZE, cursor: str | None = None,
+             sort: str | None = None, filters: tuple[tuple[str, object], ...] = ()
+             ) -> tuple[list[dict[str, str | int]], str | None]:
+        """Return a page of objects present in the database and the cursor to the next page.
+
+        ``filters`` holds (name, value) pairs of FILTERS; a combination that no index serves is
+        rejected with ValueError.
+        """
+        query = filtering.apply(cls.query, cls, FILTERS, filters)
+        list_of_objs, next_cursor = pagination.paginate(query, cls, "galaxy_id",
+                                                        constants.GALAXY_SORT_KEYS,
+                                                        limit, cursor, sort)
+        return [obj.to_partial_json() for obj in list_of_objs], next_cursor
+
+    @classmethod
+    def stream(cls, filters: tuple[tuple[str, object], ...] = ()) -> Iterator[dict[str, str | int]]:
+        """Return the objects matching the filters, fetched lazily in batches from a server-side cursor.
+
+        As for list(), a combination of filters that no index serves is rejected with ValueError,
+        before any row is fetched.
+        """
+        query = filtering.apply(cls.query, cls, FILTERS, filters).order_by(cls.galaxy_id)
+        return (obj.to_partial_json() for obj in query.yield_per(constants.STREAM_BATCH_SIZE))
 
     def to_partial_json(self) -> dict[str, str | int]:
         """Return a partial JSON representation of this object."""
@@ -95,12 +149,13 @@ class Galaxy(db.Model):
             "galaxy_name": self.galaxy_name
         }
 
-    def to_full_json(self) -> dict[str, str | int | dict[str, str | int]]:
-        """Return a full JSON representation of this object."""
-        obj = self.galaxy_added_info
-        added_by = obj.to_partial_json() if obj else {}
-        obj = self.galaxy_verified_info
-        verified_by = obj.to_partial_json() if obj else {}
+    def to_full_json(self, expand: tuple[str, ...] = tuple(EXPANDABLE)
+                     ) -> dict[str, str | int | dict[str, str | int]]:
+        """Return a full JSON representation of this object, embedding the expanded relations."""
+        added_by = loading.related_json(self, "galaxy_added_info", "added_by" in expand,
+                                        "user_id", self.added_by)
+        verified_by = loading.related_json(self, "galaxy_verified_info", "verified_by" in expand,
+                                           "user_id", self.verified_by)
 
         return {
             **self.to_partial_json(),
@@ -0,0 +1,82 @@
+"""This module assembles the galaxy -> constellations -> stars documents of the hierarchy endpoints.
+
+Every level is fetched by one SELECT joining its users, whatever the number of children: the
+parent, the page of its children, and for a tree the first stars of every constellation of the
+page.  The documents returned by the models are shared with the cache, so they are copied here
+rather than extended.
+"""
+from __future__ import annotations
+
+from deps import constants
+from models import loading, versions
+from models.constellations import Constellation
+from models.galaxies import Galaxy
+from models.stars import Star
+
+
+_CONTRIBUTORS = ",".join(loading.CONTRIBUTORS)
+
+
+def galaxy_constellations(galaxy_id: int, limit: int = constants.DEFAULT_PAGE_SIZE,
+                          cursor: str | None = None, sort: str | None = None
+                          ) -> tuple[dict[str, object] | None, str | None]:
+    """Return the galaxy with a page of its constellations and the cursor to the next page.
+
+    Return (None, None) if the galaxy does not exist.
+    """
+    galaxy = Galaxy.retrieve(galaxy_id, _CONTRIBUTORS)
+    if not galaxy:
+        return None, None
+    constellations, next_cursor = Constellation.of_galaxy(galaxy_id, limit, cursor, sort)
+    return {**galaxy, "constellations": constellations}, next_cursor
+
+
+def galaxy_constellations_etag() -> str:
+    """Return the ETag of the documents of galaxy_constellations()."""
+    return versions.collection_etag("galaxies", "constellations", "users")
+
+
+def constellation_stars(constellation_id: int, limit: int = constants.DEFAULT_PAGE_SIZE,
+                        cursor: str | None = None, sort: str | None = None
+                        ) -> tuple[dict[str, object] | None, str | None]:
+    """Return the constellation with a page of its stars and the cursor to the next page.
+
+    Return (None, None) if the constellation does not exist.
+    """
+    constellation = Constellation.retrieve(constellation_id, _CONTRIBUTORS)
+    if not constellation:
+        return None, None
+    stars, next_cursor = Star.of_constellation(constellation_id, limit, cursor, sort)
+    return {**constellation, "stars": stars}, next_cursor
+
+
+def constellation_stars_etag() -> str:
+    """Return the ETag of the documents of constellation_stars()."""
+    return versions.collection_etag("constellations", "stars", "users")
+
+
+def galaxy_tree(galaxy_id: int, limit: int = constants.DEFAULT_PAGE_SIZE,
+                cursor: str | None = None, star_limit: int = constants.TREE_STAR_LIMIT
+                ) -> tuple[dict[str, object] | None, str | None]:
+    """Return the galaxy with a page of its constellations, each with its first stars.
+
+    The cursor returned pages through the constellations; the ``next`` of each constellation
+    pages through its stars with constellation_stars().  Return (None, None) if the galaxy does
+    not exist.
+    """
+    galaxy, next_cursor = galaxy_constellations(galaxy_id, limit, cursor)
+    if not galaxy:
+        return None, None
+    ids = tuple(constellation["constellation_id"] for constellation in galaxy["constellations"])
+    pages = Star.first_of_constellations(ids, star_limit) if ids else {}
+    constellations = [
+        {**constellation, "stars": pages[constellation["constellation_id"]][0],
+         "next": pages[constellation["constellation_id"]][1]}
+        for constellation in galaxy["constellations"]
+    ]
+    return {**galaxy, "constellations": constellations}, next_cursor
+
+
+def galaxy_tree_etag() -> str:
+    """Return the ETag of the documents of galaxy_tree()."""
+    return versions.collection_etag("galaxies", "constellations", "stars", "users")
@@ -0,0 +1,193 @@
+"""This module loads large amounts of rows into the database, bypassing the ORM."""
+from __future__ import annotations
+
+import csv
+import itertools
+import json
+import sqlite3
+from collections.abc import Iterable, Iterator, Sequence
+from contextlib import contextmanager
+
+from config import db
+from deps import constants
+from models import cache, search, sky, stats, versions
+
+
+# PRAGMAs trading durability for speed while loading; a failed load should simply be re-run
+RELAXED_PRAGMAS = {
+    "synchronous": "OFF",
+    "journal_mode": "MEMORY",
+    "cache_size": -262144,
+    "temp_store": "MEMORY"
+}
+
+
+def read_csv(path: str) -> tuple[list[str], Iterator[list[str | None]]]:
+    """Return the columns named in the header of a CSV file and an iterator over its rows."""
+    file = open(path, newline="", encoding="utf-8")
+    reader = csv.reader(file)
+    columns = next(reader)
+
+    def rows() -> Iterator[list[str | None]]:
+        with file:
+            for row in reader:
+                yield [value if value != "" else None for value in row]
+    return columns, rows()
+
+
+def read_ndjson(path: str) -> tuple[list[str], Iterator[list[str | int | None]]]:
+    """Return the keys of the first object of an NDJSON file and an iterator over its rows."""
+    file = open(path, encoding="utf-8")
+    lines = (line for line in file if line.strip())
+    first = json.loads(next(lines))
+    columns = list(first)
+
+    def rows() -> Iterator[list[str | int | None]]:
+        with file:
+            for obj in itertools.chain([first], map(json.loads, lines)):
+                yield [obj.get(column) for column in columns]
+    return columns, rows()
+
+
+@contextmanager
+def relaxed_pragmas(connection: sqlite3.Connection) -> Iterator[None]:
+    """Relax the PRAGMAs of the connection for the duration of a load, then restore them."""
+    saved = {name: connection.execute(f"PRAGMA {name}").fetchone()[0] for name in RELAXED_PRAGMAS}
+    # leaving WAL mode needs exclusive access to the database, which a running server prevents
+    if saved["journal_mode"] == "wal":
+        del saved["journal_mode"]
+    for name in saved:
+        connection.execute(f"PRAGMA {name} = {RELAXED_PRAGMAS[name]}")
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            connection.execute(f"PRAGMA {name} = {value}")
+
+
+@contextmanager
+def deferred_indexes(connection: sqlite3.Connection, table: str) -> Iterator[None]:
+    """Drop the plain indexes of the table during a load and build them again once the data is in.
+
+    The UNIQUE indexes and those enforcing a constraint stay in place, so every row is still
+    checked as it is inserted.  Both happen in the transaction of the load: if the load fails, its
+    rollback brings the dropped indexes back.  The table is analyzed again afterwards, since the
+    statistics of the kept indexes no longer match the table and those of the dropped ones are
+    gone, which would mislead the query planner.
+    """
+    deferred = [name for _, name, unique, origin, _ in
+                connection.execute(f'PRAGMA index_list("{table}")') if not unique and origin == "c"]
+    indexes = connection.execute(
+        f"SELECT name, sql FROM sqlite_master WHERE type = 'index' "
+        f"AND name IN ({', '.join('?' for _ in deferred)})",
+        deferred
+    ).fetchall()
+    for name, _ in indexes:
+        connection.execute(f'DROP INDEX "{name}"')
+    yield
+    for _, sql in indexes:
+        connection.execute(sql)
+    connection.execute(f'ANALYZE "{table}"')
+
+
+@contextmanager
+def deferred_statistics(connection: sqlite3.Connection, table: str) -> Iterator[None]:
+    """Drop the triggers counting the inserted rows during a load, then count the table again.
+
+    Counting the whole table once is much faster than updating the summary table on every row.
+    Like the indexes, the triggers are dropped and created again in the transaction of the load.
+    """
+    names = [f"{name}_insert" for name, (counted, _) in stats.STATISTICS.items() if counted == table]
+    triggers = connection.execute(
+        f"SELECT name, sql FROM sqlite_master WHERE type = 'trigger' "
+        f"AND name IN ({', '.join('?' for _ in names)})",
+        names
+    ).fetchall()
+    for name, _ in triggers:
+        connection.execute(f'DROP TRIGGER "{name}"')
+    yield
+    for name, sql in triggers:
+        connection.execute(sql)
+        statistic = name.removesuffix("_insert")
+        connection.execute("DELETE FROM summary_counts WHERE statistic = ?", (statistic,))
+        connection.execute(f"INSERT INTO summary_counts {stats.recount(statistic)}")
+
+
+@contextmanager
+def deferred_search(connection: sqlite3.Connection, table: str) -> Iterator[None]:
+    """Drop the triggers indexing the inserted rows during a load, then index the new rows at once.
+
+    The names go to the FTS index and, for the stars, the positions to the R*Tree; filling them
+    with one INSERT ... SELECT is much faster than a trigger per row.  Usually the loaded rows come
+    after the existing ones and only those are indexed; if some were inserted between them, every
+    row missing from the indexes is, which is slower.  Like the statistics, the triggers are
+    dropped and created again in the transaction of the load.
+    """
+    kinds = [kind for kind, (indexed, _, _) in search.SOURCES.items() if indexed == table]
+    names = [f"{table}_search_insert"] if kinds else []
+    if table == "stars":
+        names.append("stars_sky_insert")
+    triggers = connection.execute(
+        f"SELECT name, sql FROM sqlite_master WHERE type = 'trigger' "
+        f"AND name IN ({', '.join('?' for _ in names)})",
+        names
+    ).fetchall()
+    pk = db.metadata.tables[table].primary_key.columns.values()[0].name
+    last, existing = connection.execute(f'SELECT MAX("{pk}"), COUNT(*) FROM "{table}"').fetchone()
+    for name, _ in triggers:
+        connection.execute(f'DROP TRIGGER "{name}"')
+    yield
+    after, missing = last, False
+    if existing:
+        (below,) = connection.execute(f'SELECT COUNT(*) FROM "{table}" WHERE "{pk}" <= ?',
+                                      (last,)).fetchone()
+        if below != existing:
+            after, missing = None, True
+    for name, sql in triggers:
+        connection.execute(sql)
+        if name == "stars_sky_insert":
+            connection.execute(sky.refill(after, missing))
+        else:
+            for kind in kinds:
+                connection.execute(search.refill(kind, after, missing))
+
+
+def load_rows(table: str, columns: Sequence[str], rows: Iterable[Sequence]) -> int:
+    """Insert the rows into the table with batched executemany calls and return their number."""
+    known = db.metadata.tables[table].columns
+    for column in columns:
+        if column not in known:
+            raise ValueError(f"Table '{table}' has no column '{column}'.")
+
+    names = ", ".join(f'"{column}"' for column in columns)
+    placeholders = ", ".join("?" for _ in columns)
+    statement = f'INSERT INTO "{table}" ({names}) VALUES ({placeholders})'
+
+    count = 0
+    raw = db.engine.raw_connection()
+    try:
+        connection = raw.driver_connection
+        with relaxed_pragmas(connection):
+            # a single transaction: the rows, the dropped and rebuilt indexes, the recounted
+            # statistics and the refilled search indexes are committed together, or rolled back
+            # together
+            connection.execute("BEGIN")
+            try:
+                # the statistics are counted and the new rows indexed once the indexes are built
+                with deferred_statistics(connection, table), deferred_search(connection, table), \
+                        deferred_indexes(connection, table):
+                    iterator = iter(rows)
+                    while batch := list(itertools.islice(iterator, constants.LOAD_BATCH_SIZE)):
+                        connection.executemany(statement, batch)
+                        count += len(batch)
+                connection.commit()
+            except BaseException:
+                connection.rollback()
+                raise
+    finally:
+        raw.close()
+
+    versions.bump(table)
+    db.session.commit()
+    cache.invalidate(table)
+    return count
@@ -0,0 +1,42 @@
+"""This module implements the expand= option used to eager load the relations of the models."""
+from __future__ import annotations
+
+from sqlalchemy.orm import Load, joinedload
+
+
+# the relations expanded in the children listed under their parent, e.g. the stars of a galaxy's tree
+CONTRIBUTORS = ("added_by", "verified_by")
+
+def parse_expand(expand: str | None, expandable: dict[str, str]) -> tuple[str, ...]:
+    """Return the names of the relations to expand.
+
+    ``None`` expands every relation, an empty string expands none of them, otherwise
+    ``expand`` is a comma-separated list of keys of ``expandable``.
+    """
+    if expand is None:
+        return tuple(expandable)
+
+    names = tuple(name.strip() for name in expand.split(",") if name.strip())
+    for name in names:
+        if name not in expandable:
+            raise ValueError(f"Cannot expand '{name}'.")
+    return names
+
+
+def eager_options(model: type, expandable: dict[str, str],
+                  names: tuple[str, ...]) -> list[Load]:
+    """Return the loader options that fetch the expanded relations in the same statement."""
+    return [joinedload(getattr(model, expandable[name])) for name in names]
+
+
+def related_json(owner: object, relation: str, expanded: bool, id_key: str,
+                 id_value: int | None) -> dict[str, str | int]:
+    """Return the partial JSON of a related object.
+
+    When the relation is not expanded only the foreign key is returned, so the relation
+    is never loaded.
+    """
+    if expanded:
+        obj = getattr(owner, relation)
+        return obj.to_partial_json() if obj else {}
+    return {id_key: id_value} if id_value is not None else {}
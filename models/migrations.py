@@ -0,0 +1,135 @@
+"""This module applies the versioned SQL migrations in assets/migrations to the database.
+
+A migration is a file named ``<version>_<name>.sql``.  Each one is applied in its own
+``BEGIN IMMEDIATE`` transaction together with its row in ``schema_migrations``, so a failed
+migration leaves no trace and readers keep working (in WAL mode) while it runs.
+"""
+from __future__ import annotations
+
+import pathlib
+import re
+import sqlite3
+from datetime import datetime, timezone
+
+from config import basedir, db
+from models import search, sky, stats
+
+
+MIGRATIONS_DIR = basedir / "assets" / "migrations"
+FILENAME = re.compile(r"^(\d+)_(\w+)\.sql$")
+# version -> the statements the models run when they create the tables, which the migration must
+# also run: the tables and triggers created from the models and those migrated stay the same
+GENERATED = {
+    4: sky.INDEX_STATEMENTS,
+    5: stats.STATEMENTS,
+    6: search.STATEMENTS
+}
+
+
+class SchemaMigration(db.Model):
+    """Model for the migrations applied to the database."""
+    __tablename__ = "schema_migrations"
+
+    version = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String)
+    applied_at = db.Column(db.DateTime)
+
+
+def available() -> list[tuple[int, str, pathlib.Path]]:
+    """Return the version, name and path of every migration, in order."""
+    migrations = []
+    for path in MIGRATIONS_DIR.glob("*.sql"):
+        match = FILENAME.match(path.name)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), path))
+    return sorted(migrations)
+
+
+def applied() -> set[int]:
+    """Return the versions of the migrations already applied to the database."""
+    SchemaMigration.__table__.create(db.engine, checkfirst=True)
+    return {version for (version,) in db.session.query(SchemaMigration.version)}
+
+
+def pending() -> list[tuple[int, str, pathlib.Path]]:
+    """Return the migrations not applied to the database yet."""
+    done = applied()
+    db.session.commit()
+    return [migration for migration in available() if migration[0] not in done]
+
+
+def migrate() -> list[str]:
+    """Apply the pending migrations and return their names."""
+    names = []
+    for version, name, path in pending():
+        raw = db.engine.raw_connection()
+        try:
+            connection = raw.driver_connection
+            try:
+                connection.executescript(
+                    "BEGIN IMMEDIATE;\n"
+                    f"{path.read_text()}\n"
+                    "INSERT INTO schema_migrations (version, name, applied_at) "
+                    f"VALUES ({version}, '{name}', '{_now().isoformat(sep=' ')}');\n"
+                    "COMMIT;"
+                )
+            except BaseException:
+                if connection.in_transaction:
+                    connection.execute("ROLLBACK")
+                raise
+        finally:
+            raw.close()
+        names.append(f"{version:03d}_{name}")
+    return names
+
+
+def stamp() -> None:
+    """Record every migration as applied, for databases created directly from the models."""
+    done = applied()
+    for version, name, _ in available():
+        if version not in done:
+            db.session.add(SchemaMigration(version=version, name=name, applied_at=_now()))
+    db.session.commit()
+
+
+def statements(path: pathlib.Path) -> list[str]:
+    """Return the statements of a migration, without the comments and with single spaces."""
+    found, current = [], ""
+    for line in path.read_text().splitlines():
+        current += f" {line.split('--')[0]}"
+        if sqlite3.complete_statement(current):
+            found.append(_normalize(current))
+            current = ""
+    return found
+
+
+def check() -> list[str]:
+    """Return the differences between the migrations and the statements of the models.
+
+    Only the CREATE statements of a migration are compared, in order; its backfill is not.
+    """
+    problems = []
+    paths = {version: path for version, _, path in available()}
+    for version, expected in GENERATED.items():
+        created = [statement for statement in statements(paths[version])
+                   if statement.upper().startswith("CREATE ")]
+        expected = [_normalize(statement) for statement in expected]
+        for index, (migrated, generated) in enumerate(zip(created, expected), 1):
+            if migrated != generated:
+                problems.append(f"{paths[version].name}: statement {index} differs from the models:"
+                                f"\n  {migrated}\n  {generated}")
+        if len(created) != len(expected):
+            problems.append(f"{paths[version].name} creates {len(created)} tables and triggers, "
+                            f"the models {len(expected)}.")
+    return problems
+
+
+def _normalize(statement: str) -> str:
+    """Return the statement with single spaces, no space inside parentheses and no final ';'."""
+    statement = " ".join(statement.split()).removesuffix(";")
+    return re.sub(r"\(\s+", "(", re.sub(r"\s+\)", ")", statement))
+
+
+def _now() -> datetime:
+    """Return the current UTC time as stored in the DATETIME columns."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
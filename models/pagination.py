@@ -0,0 +1,88 @@
+"""This module implements keyset (cursor) pagination for the list() methods of the models."""
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+
+def encode_cursor(sort: str, value: str | int | None, pk: int) -> str:
+    """Return an opaque cursor pointing just past the given row."""
+    raw = json.dumps([sort, value, pk], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str | int | None, int]:
+    """Return the sort key, sort value and primary key stored in the cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort, value, pk = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor.") from e
+    if not isinstance(sort, str) or not isinstance(pk, int):
+        raise ValueError("Invalid cursor.")
+    return sort, value, pk
+
+
+def paginate(query: Query, model: type, pk_name: str, sort_keys: tuple[str, ...],
+             limit: int, cursor: str | None = None, sort: str | None = None) -> tuple[list, str | None]:
+    """Return one page of the query and the cursor to the next page.
+
+    The page is fetched as ``WHERE (sort, pk) > (?, ?) ORDER BY sort, pk LIMIT ?``, so
+    every page costs the same regardless of how deep into the table it is.  ``sort`` is
+    one of ``sort_keys``, optionally prefixed with ``-`` for descending order.
+    """
+    last_value, last_pk = None, None
+    if cursor:
+        cursor_sort, last_value, last_pk = decode_cursor(cursor)
+        if sort and sort != cursor_sort:
+            raise ValueError("Cursor does not match the requested sort.")
+        sort = cursor_sort
+    sort = sort or pk_name
+
+    descending = sort.startswith("-")
+    sort_name = sort.lstrip("-")
+    if sort_name not in sort_keys:
+        raise ValueError(f"Cannot sort by '{sort_name}'.")
+
+    pk_column = getattr(model, pk_name)
+    sort_column = getattr(model, sort_name)
+
+    if sort_name == pk_name:
+        if last_pk is not None:
+            query = query.filter(pk_column < last_pk if descending else pk_column > last_pk)
+        query = query.order_by(pk_column.desc() if descending else pk_column)
+    else:
+        if last_pk is not None:
+            query = query.filter(_after(sort_column, pk_column, descending, last_value, last_pk))
+        query = query.order_by(sort_column.desc() if descending else sort_column, pk_column)
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(sort, getattr(last, sort_name), getattr(last, pk_name))
+
+
+def _after(sort_column, pk_column, descending: bool, last_value: str | int | None,
+           last_pk: int):
+    """Return the predicate selecting the rows that come after (last_value, last_pk).
+
+    SQLite orders NULLs first ascending and last descending, so they are handled explicitly.
+    """
+    tie = and_(sort_column.is_(None), pk_column > last_pk) if last_value is None \
+        else and_(sort_column == last_value, pk_column > last_pk)
+
+    if not descending:
+        if last_value is None:
+            return or_(tie, sort_column.isnot(None))
+        return or_(sort_column > last_value, tie)
+
+    if last_value is None:
+        return tie
+    return or_(sort_column < last_value, tie, sort_column.is_(None))
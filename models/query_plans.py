@@ -0,0 +1,81 @@
+"""This module checks with EXPLAIN QUERY PLAN that the queries of the models do not scan whole tables.
+
+The read methods of every model are called with representative arguments while their statements are
+recorded; each statement is then explained.  A plan step that scans a table without an index is a
+full scan, unless the rows come out in the requested order and the statement has a LIMIT, in which
+case SQLite stops after the first page.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable
+
+from sqlalchemy import event
+
+from config import db
+from deps import constants
+from models import cache, constellations, explain, galaxies, pagination, sky, stars, users
+
+
+def _list_calls(model: type, sort_keys: tuple[str, ...]) -> list[tuple[str, Callable]]:
+    """Return the calls fetching the first and a later page of the list, for every sort."""
+    calls = []
+    for key in sort_keys:
+        for sort in (key, f"-{key}"):
+            cursor = pagination.encode_cursor(sort, 1, 1)
+            calls.append((f"{model.__name__}.list(sort={sort})",
+                          lambda model=model, sort=sort: model.list(2, None, sort)))
+            calls.append((f"{model.__name__}.list(sort={sort}, next=...)",
+                          lambda model=model, cursor=cursor: model.list(2, cursor)))
+    return calls
+
+
+def model_calls() -> list[tuple[str, Callable]]:
+    """Return the model calls whose queries are checked."""
+    calls = [
+        ("Star.retrieve", lambda: stars.Star.retrieve(1)),
+        ("Star.etag", lambda: stars.Star.etag(1)),
+        ("Star.collection_etag", stars.Star.collection_etag),
+        ("Constellation.retrieve", lambda: constellations.Constellation.retrieve(1)),
+        ("Constellation.etag", lambda: constellations.Constellation.etag(1)),
+        ("Galaxy.retrieve", lambda: galaxies.Galaxy.retrieve(1)),
+        ("Galaxy.etag", lambda: galaxies.Galaxy.etag(1)),
+        ("User.retrieve", lambda: users.User.retrieve(1)),
+        ("User.etag", lambda: users.User.etag(1)),
+        ("User.search_by_username", lambda: users.User.search_by_username("username"))
+    ]
+    calls += _list_calls(stars.Star, constants.STAR_SORT_KEYS)
+    calls += _list_calls(constellations.Constellation, constants.CONSTELLATION_SORT_KEYS)
+    calls += _list_calls(galaxies.Galaxy, constants.GALAXY_SORT_KEYS)
+    calls += _list_calls(users.User, constants.USER_SORT_KEYS)
+    return calls
+
+
+def check() -> list[str]:
+    """Run every model call and return a description of each full scan found.
+
+    Without the math functions of SQLite, the searches by position cannot run: only that is
+    reported.
+    """
+    try:
+        sky.require_math_functions()
+    except RuntimeError as e:
+        return [str(e)]
+    cache.store.clear()
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany) -> None:
+        statements.append((statement, parameters))
+
+    problems = []
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        for label, call in model_calls():
+            statements.clear()
+            call()
+            for statement, parameters in list(statements):
+                for step in explain.full_scans(statement, parameters):
+                    problems.append(f"{label}: {step} in {' '.join(statement.split())}")
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+        cache.store.clear()
+    return problems
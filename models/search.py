@@ -0,0 +1,156 @@
+"""This module searches the names of the stars, constellations, galaxies and users.
+
+``search_index`` is an SQLite FTS5 table holding one row per named object, kept in sync with the
+named tables by triggers, so every way of writing a row (the models, the bulk upserts and the
+loader) updates it.  The rowid of an indexed name encodes its table and primary key, which lets the
+triggers replace or delete it by rowid.  Every word of a query matches as a prefix, so a partially
+typed name already finds its objects, and the matches are ranked with BM25.
+"""
+from __future__ import annotations
+
+import re
+
+from sqlalchemy import DDL, event, text
+
+from config import db
+from deps import constants
+from models import pagination, versions
+
+
+# type -> (table, primary key, name columns), in the order of the types encoded in the rowids
+SOURCES = {
+    "star": ("stars", "star_id", ("star_name",)),
+    "constellation": ("constellations", "constellation_id", ("constellation_name",)),
+    "galaxy": ("galaxies", "galaxy_id", ("galaxy_name",)),
+    "user": ("users", "user_id", ("first_name", "last_name"))
+}
+_CODES = {kind: code for code, kind in enumerate(SOURCES)}
+_TYPES = len(SOURCES)
+_WORD = re.compile(r"\w+")
+
+
+def _rowid(kind: str, row: str) -> str:
+    """Return the SQL expression of the rowid of an object, from its primary key."""
+    _, pk, _ = SOURCES[kind]
+    return f"{row}.{pk} * {_TYPES} + {_CODES[kind]}"
+
+
+def _name(kind: str, row: str) -> str:
+    """Return the SQL expression of the indexed name of an object."""
+    _, _, columns = SOURCES[kind]
+    if len(columns) == 1:
+        return f"{row}.{columns[0]}"
+    return " || ' ' || ".join(f"COALESCE({row}.{column}, '')" for column in columns)
+
+
+def _statements() -> tuple[str, ...]:
+    """Return the statements of assets/migrations/006_search_index.sql, without the backfill."""
+    statements = [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index "
+        "USING fts5(name, prefix='2 3', tokenize='unicode61 remove_diacritics 2')"
+    ]
+    for kind, (table, pk, columns) in SOURCES.items():
+        insert_new = (f"INSERT INTO search_index (rowid, name) "
+                      f"VALUES ({_rowid(kind, 'NEW')}, {_name(kind, 'NEW')}); ")
+        delete_old = f"DELETE FROM search_index WHERE rowid = {_rowid(kind, 'OLD')}; "
+        statements += [
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_insert AFTER INSERT ON {table} "
+            f"BEGIN {insert_new}END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_update "
+            f"AFTER UPDATE OF {', '.join((pk,) + columns)} ON {table} "
+            f"BEGIN {delete_old}{insert_new}END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_delete AFTER DELETE ON {table} "
+            f"BEGIN {delete_old}END"
+        ]
+    return tuple(statements)
+
+
+STATEMENTS = _statements()
+for _statement in STATEMENTS:
+    event.listen(db.metadata, "after_create", DDL(_statement))
+
+
+def refill(kind: str, after: int | None = None, missing: bool = False) -> str:
+    """Return the statement indexing the names of every object of the type.
+
+    With ``after``, only the objects with a greater primary key are indexed, e.g. those appended by
+    a load; with ``missing``, only those not indexed yet are, which is much slower.
+    """
+    table, pk, _ = SOURCES[kind]
+    conditions = []
+    if after is not None:
+        conditions.append(f"{table}.{pk} > {int(after)}")
+    if missing:
+        conditions.append(f"{_rowid(kind, table)} NOT IN (SELECT rowid FROM search_index)")
+    statement = (f"INSERT INTO search_index (rowid, name) "
+                 f"SELECT {_rowid(kind, table)}, {_name(kind, table)} FROM {table}")
+    if conditions:
+        statement += f" WHERE {' AND '.join(conditions)}"
+    return statement
+
+
+def rebuild() -> None:
+    """Index the names of every object again, e.g. for a database created before the index.
+
+    The index is dropped and created again, which is much faster than deleting its rows; the
+    triggers only refer to it by name, so they keep working.
+    """
+    with db.engine.begin() as connection:
+        connection.execute(text("DROP TABLE IF EXISTS search_index"))
+        connection.execute(text(STATEMENTS[0]))
+        for kind in SOURCES:
+            connection.execute(text(refill(kind)))
+        connection.execute(text("INSERT INTO search_index (search_index) VALUES ('optimize')"))
+
+
+def match_expression(query: str) -> str:
+    """Return the FTS5 query matching every word of the user's query as a prefix.
+
+    A query made of single letters only would match, and rank, most of the names.
+    """
+    words = _WORD.findall(query)
+    if not words or max(map(len, words)) < constants.SEARCH_MIN_PREFIX:
+        raise ValueError(f"The search query must contain a word of at least "
+                         f"{constants.SEARCH_MIN_PREFIX} characters.")
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search(query: str, limit: int = constants.DEFAULT_PAGE_SIZE, cursor: str | None = None,
+           kind: str | None = None) -> tuple[list[dict[str, str | int]], str | None]:
+    """Return a page of the objects whose name matches the query, best first, and the next cursor.
+
+    ``kind`` restricts the results to one of the SOURCES.
+    """
+    if kind is not None and kind not in SOURCES:
+        raise ValueError(f"Cannot search for '{kind}'.")
+
+    parameters = {"match": match_expression(query), "limit": limit + 1}
+    matches = "search_index MATCH :match"
+    if kind is not None:
+        matches += f" AND rowid % {_TYPES} = {_CODES[kind]}"
+    after = ""
+    if cursor:
+        sort, parameters["score"], parameters["rowid"] = pagination.decode_cursor(cursor)
+        if sort != "rank" or not isinstance(parameters["score"], (int, float)):
+            raise ValueError("Invalid cursor.")
+        after = "WHERE (score, rowid) > (:score, :rowid)"
+
+    # BM25 scores are negative, the best match having the lowest
+    rows = db.session.execute(text(
+        f"SELECT rowid, name, score FROM ("
+        f"SELECT rowid, name, bm25(search_index) AS score FROM search_index WHERE {matches}"
+        f") {after} ORDER BY score, rowid LIMIT :limit"
+    ), parameters).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = pagination.encode_cursor("rank", rows[-1].score, rows[-1].rowid)
+    kinds = list(SOURCES)
+    return [{"type": kinds[rowid % _TYPES], "id": rowid // _TYPES, "name": name}
+            for rowid, name, _ in rows], next_cursor
+
+
+def etag() -> str:
+    """Return the ETag of the search results, derived from the versions of the named tables."""
+    return versions.collection_etag(*(table for table, _, _ in SOURCES.values()))
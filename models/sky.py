@@ -0,0 +1,151 @@
+"""This module searches the stars by position on the sky, through an R*Tree index.
+
+``stars_sky`` is an SQLite R*Tree holding the position of every star, kept in sync with ``stars`` by
+triggers, so every way of writing a star (the models, the bulk upserts and the loader) updates it.
+A cone search reads the candidates inside the bounding box(es) of the cone from the R*Tree, then
+keeps the ones within the radius, computing the great-circle distance in SQL so the refinement
+runs inside SQLite rather than row by row in Python.  The right ascension is stored in hours and
+the declination in degrees.
+"""
+from __future__ import annotations
+
+import math
+
+from sqlalchemy import Column, Float, Integer, MetaData, Table, func, select, union_all
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.sql import ColumnElement, Select
+
+from config import db
+
+
+# the statements of assets/migrations/004_sky_index.sql, run when the stars table is created
+INDEX_STATEMENTS = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS stars_sky "
+    "USING rtree(star_id, ra_min, ra_max, dec_min, dec_max)",
+    "CREATE TRIGGER IF NOT EXISTS stars_sky_insert AFTER INSERT ON stars "
+    "WHEN NEW.right_ascension IS NOT NULL AND NEW.declination IS NOT NULL "
+    "BEGIN "
+    "INSERT INTO stars_sky VALUES (NEW.star_id, NEW.right_ascension, NEW.right_ascension, "
+    "NEW.declination, NEW.declination); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS stars_sky_update "
+    "AFTER UPDATE OF star_id, right_ascension, declination ON stars "
+    "BEGIN "
+    "DELETE FROM stars_sky WHERE star_id = OLD.star_id; "
+    "INSERT INTO stars_sky SELECT NEW.star_id, NEW.right_ascension, NEW.right_ascension, "
+    "NEW.declination, NEW.declination "
+    "WHERE NEW.right_ascension IS NOT NULL AND NEW.declination IS NOT NULL; "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS stars_sky_delete AFTER DELETE ON stars "
+    "BEGIN "
+    "DELETE FROM stars_sky WHERE star_id = OLD.star_id; "
+    "END"
+)
+
+
+def refill(after: int | None = None, missing: bool = False) -> str:
+    """Return the statement indexing the position of every star, as the backfill of migration 004.
+
+    With ``after``, only the stars with a greater primary key are indexed, e.g. those appended by a
+    load; with ``missing``, only those not indexed yet are.
+    """
+    statement = ("INSERT INTO stars_sky "
+                 "SELECT star_id, right_ascension, right_ascension, declination, declination "
+                 "FROM stars WHERE right_ascension IS NOT NULL AND declination IS NOT NULL")
+    if after is not None:
+        statement += f" AND star_id > {int(after)}"
+    if missing:
+        statement += " AND star_id NOT IN (SELECT star_id FROM stars_sky)"
+    return statement
+
+
+# declared apart from the models' metadata, since create_all() cannot create a virtual table
+stars_sky = Table(
+    "stars_sky", MetaData(),
+    Column("star_id", Integer, primary_key=True),
+    Column("ra_min", Float),
+    Column("ra_max", Float),
+    Column("dec_min", Float),
+    Column("dec_max", Float)
+)
+
+
+def validate(ra: float, dec: float, radius: float = 0) -> None:
+    """Raise ValueError if the position or the radius is out of range."""
+    if not 0 <= ra <= 24:
+        raise ValueError("The right ascension must be between 0 and 24 hours.")
+    if not -90 <= dec <= 90:
+        raise ValueError("The declination must be between -90 and 90 degrees.")
+    if not 0 <= radius <= 180:
+        raise ValueError("The radius must be between 0 and 180 degrees.")
+
+
+def boxes(ra: float, dec: float, radius: float) -> list[tuple[float, float, float, float]]:
+    """Return the (ra_min, ra_max, dec_min, dec_max) boxes covering the cone.
+
+    A cone reaching a pole covers every right ascension; one crossing 0h is split in two.
+    """
+    dec_min, dec_max = dec - radius, dec + radius
+    if dec_min <= -90 or dec_max >= 90:
+        return [(0, 24, max(dec_min, -90), min(dec_max, 90))]
+
+    # the widest right ascension of the cone, reached away from its center's declination
+    sin_half = math.sin(math.radians(radius)) / math.cos(math.radians(dec))
+    half = math.degrees(math.asin(sin_half)) / 15
+    ra_min, ra_max = ra - half, ra + half
+    if ra_min < 0:
+        return [(ra_min + 24, 24, dec_min, dec_max), (0, ra_max, dec_min, dec_max)]
+    if ra_max > 24:
+        return [(ra_min, 24, dec_min, dec_max), (0, ra_max - 24, dec_min, dec_max)]
+    return [(ra_min, ra_max, dec_min, dec_max)]
+
+
+def distance(model: type, ra: float, dec: float) -> ColumnElement:
+    """Return the SQL expression of the great-circle distance in degrees from (ra, dec).
+
+    The haversine formula stays accurate for the small distances of a cone search.
+    """
+    half_dec = func.radians(model.declination - dec) / 2
+    half_ra = func.radians((model.right_ascension - ra) * 15) / 2
+    haversine = (func.pow(func.sin(half_dec), 2)
+                 + math.cos(math.radians(dec)) * func.cos(func.radians(model.declination))
+                 * func.pow(func.sin(half_ra), 2))
+    # rounding can push the haversine just past 1, where asin() returns NULL
+    return func.degrees(2 * func.asin(func.sqrt(func.min(haversine, 1.0))))
+
+
+def require_math_functions() -> None:
+    """Raise RuntimeError if SQLite lacks the math functions distance() computes with.
+
+    They are built into SQLite 3.35 or later compiled with SQLITE_ENABLE_MATH_FUNCTIONS, the
+    default of its own builds; without them, every search by position would fail.
+    """
+    try:
+        with db.engine.connect() as connection:
+            connection.exec_driver_sql("SELECT radians(1), degrees(1), sin(1), cos(1), asin(1), "
+                                       "sqrt(1), pow(1, 2)")
+    except OperationalError as e:
+        raise RuntimeError("The searches by position need the math functions of SQLite 3.35 or "
+                           "later, compiled with SQLITE_ENABLE_MATH_FUNCTIONS, which this one "
+                           f"lacks ({e.orig}).") from e
+
+
+def cone(model: type, ra: float, dec: float, radius: float, limit: int,
+         indexed: bool = True) -> Select:
+    """Return the statement selecting the stars within radius of (ra, dec) and their distance.
+
+    The nearest ``limit`` stars come first.  Without ``indexed``, every star is compared with the
+    center, which is only useful to measure the index against.
+    """
+    to_center = distance(model, ra, dec).label("distance")
+    statement = select(model, to_center).where(to_center <= radius)
+    if indexed:
+        candidates = union_all(*(
+            select(stars_sky.c.star_id).where(stars_sky.c.ra_max >= ra_min,
+                                              stars_sky.c.ra_min <= ra_max,
+                                              stars_sky.c.dec_max >= dec_min,
+                                              stars_sky.c.dec_min <= dec_max)
+            for ra_min, ra_max, dec_min, dec_max in boxes(ra, dec, radius)
+        ))
+        statement = statement.where(model.star_id.in_(candidates))
+    return statement.order_by(to_center, model.star_id).limit(limit)
@@ -1,29 +1,60 @@
 """This module defines the Star model for the CRUD operations."""
 from __future__ import annotations
 
+from collections.abc import Iterator
+from datetime import datetime
 from typing_extensions import Self
 
+from sqlalchemy import DDL, event, func, select
 from sqlalchemy.orm import relationship
 
 from config import db
+from deps import constants
+from models import bulk, cache, filtering, loading, pagination, sky, transactions, versions, writes
 from models.constellations import Constellation
 from models.users import User
 
 
+EXPANDABLE = {
+    "constellation": "constellation_info",
+    "added_by": "star_added_info",
+    "verified_by": "star_verified_info"
+}
+# the columns of the partial JSON, embedded in the documents of other tables
+PARTIAL_COLUMNS = ("star_name",)
+# the filters of list(): query parameter -> (column, comparison), all served by an index
+FILTERS = {
+    "constellation_id": ("constellation_id", "eq"),
+    "spectral_type": ("spectral_type", "eq"),
+    "star_type": ("star_type", "eq"),
+    "apparent_magnitude_min": ("apparent_magnitude", "min"),
+    "apparent_magnitude_max": ("apparent_magnitude", "max"),
+    "added_by": ("added_by", "eq"),
+    "verified": ("verified_by", "present")
+}
+
+
 class Star(db.Model):
     """Model for Star objects."""
     __tablename__ = "stars"
+    __table_args__ = (
+        # also serves the foreign key, and the stars of a constellation sorted by magnitude
+        db.Index("ix_stars_constellation_id_apparent_magnitude",
+                 "constellation_id", "apparent_magnitude"),
+    )
 
     star_id = db.Column(db.Integer, primary_key=True)
-    star_name = db.Column(db.String)
-    star_type = db.Column(db.String)
+    star_name = db.Column(db.String, index=True)
+    star_type = db.Column(db.String, index=True)
     constellation_id = db.Column(db.Integer, db.ForeignKey("constellations.constellation_id"))
     right_ascension = db.Column(db.Integer)
     declination = db.Column(db.Integer)
-    apparent_magnitude = db.Column(db.Integer)
-    spectral_type = db.Column(db.String)
-    added_by = db.Column(db.Integer, db.ForeignKey("users.user_id"))
-    verified_by = db.Column(db.Integer, db.ForeignKey("users.user_id"))
+    apparent_magnitude = db.Column(db.Integer, index=True)
+    spectral_type = db.Column(db.String, index=True)
+    added_by = db.Column(db.Integer, db.ForeignKey("users.user_id"), index=True)
+    verified_by = db.Column(db.Integer, db.ForeignKey("users.user_id"), index=True)
+    version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    updated_at = db.Column(db.DateTime)
 
     constellation_info = relationship("Constellation")
     star_added_info = relationship("User", foreign_keys=[added_by])
@@ -50,47 +81,152 @@ class Star(db.Model):
     def create(cls, data: dict[str, str | int]) -> None:
         """Insert a new object into the database."""
         obj = cls(data)
-        db.session.add(obj)
-        db.session.commit()
+        with transactions.write():
+            versions.stamp(obj)
+            db.session.add(obj)
+        cache.invalidate(cls.__tablename__)
 
     @classmethod
-    def retrieve(cls, star_id: int) -> dict[str, str | int] | None:
-        """Return a JSON representation of the object if found, otherwise return None."""
-        obj = cls.search(star_id)
+    @cache.cached("stars", "constellations:partial", "users:partial")
+    def retrieve(cls, star_id: int, expand: str | None = None) -> dict[str, str | int] | None:
+        """Return a JSON representation of the object if found, otherwise return None.
+
+        The expanded relations are joined into the same SELECT; the others are never loaded.
+        """
+        names = loading.parse_expand(expand, EXPANDABLE)
+        obj = db.session.get(cls, star_id,
+                             options=loading.eager_options(cls, EXPANDABLE, names))
         if not obj:
             return None
-        return obj.to_full_json()
+        return obj.to_full_json(names)
 
     @classmethod
-    def update(cls, star_id: int, data: dict[str, str | int]) -> bool:
-        """Update the object in the database."""
-        obj = cls.search(star_id)
-        if not obj:
-            return False
+    def etag(cls, star_id: int, expand: str | None = None) -> tuple[str, datetime | None] | None:
+        """Return the ETag and last modification time of the object if found, otherwise return None."""
+        names = loading.parse_expand(expand, EXPANDABLE)
+        return versions.row_etag(cls, star_id, EXPANDABLE, names)
 
-        data["star_id"] = star_id
-        for k, v in data.items():
-            setattr(obj, k, v)
-        db.session.add(obj)
-        db.session.commit()
-        return True
+    @classmethod
+    def collection_etag(cls) -> str:
+        """Return the ETag of the list of objects, derived from the version of the table."""
+        return versions.collection_etag(cls.__tablename__)
+
+    @classmethod
+    def update(cls, star_id: int, data: dict[str, str | int]) -> bool:
+        """Update the given fields of the object in the database and return whether it exists."""
+        return writes.update(cls, star_id, data, PARTIAL_COLUMNS)
 
     @classmethod
     def delete(cls, star_id: int) -> bool:
-        """Delete the object from the database."""
-        obj = cls.search(star_id)
-        if not obj:
-            return False
+        """Delete the object from the database and return whether it existed."""
+        return writes.delete(cls, star_id)
 
-        db.session.delete(obj)
+    @classmethod
+    def bulk_upsert(cls, rows: list[tuple[int, dict[str, str | int]]]) -> bulk.Upserted:
+        """Insert or update the rows in a single transaction and return the errors of the failed rows."""
+        upserted = bulk.upsert(cls, rows)
         db.session.commit()
-        return True
+        cache.invalidate(cls.__tablename__)
+        return upserted
 
     @classmethod
-    def list(cls) -> list[dict[str, str | int]]:
-        """Return a list of objects present in the database."""
-        list_of_objs = cls.query.all()
-        return [obj.to_partial_json() for obj in list_of_objs]
+    @cache.cached("stars")
+    def list(cls, limit: int = constants.DEFAULT_PAGE_SIZE, cursor: str | None = None,
+             sort: str | None = None, filters: tuple[tuple[str, object], ...] = ()
+             ) -> tuple[list[dict[str, str | int]], str | None]:
+        """Return a page of objects present in the database and the cursor to the next page.
+
+        ``filters`` holds (name, value) pairs of FILTERS; a combination that no index serves is
+        rejected with ValueError.
+        """
+        query = filtering.apply(cls.query, cls, FILTERS, filters)
+        list_of_objs, next_cursor = pagination.paginate(query, cls, "star_id",
+                                                        constants.STAR_SORT_KEYS,
+                                                        limit, cursor, sort)
+        return [obj.to_partial_json() for obj in list_of_objs], next_cursor
+
+    @classmethod
+    @cache.cached("stars")
+    def near(cls, ra: float, dec: float, radius: float,
+             limit: int = constants.DEFAULT_PAGE_SIZE) -> list[dict[str, str | int | float]]:
+        """Return the stars within radius degrees of the position, nearest first."""
+        sky.validate(ra, dec, radius)
+        rows = db.session.execute(sky.cone(cls, ra, dec, radius, limit)).all()
+        return [obj.to_sky_json(distance) for obj, distance in rows]
+
+    @classmethod
+    @cache.cached("stars")
+    def nearest(cls, ra: float, dec: float, k: int) -> list[dict[str, str | int | float]]:
+        """Return the k stars nearest to the position, nearest first.
+
+        The radius of the cone grows until it holds k stars: those are then the k nearest ones.
+        """
+        sky.validate(ra, dec)
+        radius = constants.NEAREST_START_RADIUS
+        while True:
+            rows = db.session.execute(sky.cone(cls, ra, dec, radius, k)).all()
+            if len(rows) == k or radius >= 180:
+                return [obj.to_sky_json(distance) for obj, distance in rows]
+            radius = min(radius * 4, 180)
+
+    @classmethod
+    @cache.cached("stars", "users:partial")
+    def of_constellation(cls, constellation_id: int, limit: int = constants.DEFAULT_PAGE_SIZE,
+                         cursor: str | None = None, sort: str | None = None
+                         ) -> tuple[list[dict[str, str | int | dict[str, str | int]]], str | None]:
+        """Return a page of the stars of the constellation and the cursor to the next page.
+
+        The users of the page are joined into the same SELECT.
+        """
+        query = cls.query.filter(cls.constellation_id == constellation_id).options(
+            *loading.eager_options(cls, EXPANDABLE, loading.CONTRIBUTORS))
+        list_of_objs, next_cursor = pagination.paginate(query, cls, "star_id",
+                                                        constants.STAR_SORT_KEYS,
+                                                        limit, cursor, sort)
+        return [obj.to_full_json(loading.CONTRIBUTORS) for obj in list_of_objs], next_cursor
+
+    @classmethod
+    @cache.cached("stars", "users:partial")
+    def first_of_constellations(cls, constellation_ids: tuple[int, ...], limit: int
+                                ) -> dict[int, tuple[list[dict[str, str | int | dict[str, str | int]]],
+                                                     str | None]]:
+        """Return the first page of the stars of every constellation and the cursor to its next page.
+
+        The pages of all the constellations are fetched by a single SELECT, numbering the stars of
+        each constellation with a window function; the cursors continue with of_constellation().
+        """
+        rank = func.row_number().over(partition_by=cls.constellation_id, order_by=cls.star_id)
+        ranked = (select(cls.star_id, rank.label("rank"))
+                  .where(cls.constellation_id.in_(constellation_ids))
+                  .subquery())
+        query = (cls.query.join(ranked, ranked.c.star_id == cls.star_id)
+                 .filter(ranked.c.rank <= limit + 1)
+                 .options(*loading.eager_options(cls, EXPANDABLE, loading.CONTRIBUTORS))
+                 .order_by(cls.constellation_id, cls.star_id))
+
+        grouped = {constellation_id: [] for constellation_id in constellation_ids}
+        for obj in query:
+            grouped[obj.constellation_id].append(obj)
+        pages = {}
+        for constellation_id, list_of_objs in grouped.items():
+            next_cursor = None
+            if len(list_of_objs) > limit:
+                list_of_objs = list_of_objs[:limit]
+                last = list_of_objs[-1].star_id
+                next_cursor = pagination.encode_cursor("star_id", last, last)
+            pages[constellation_id] = ([obj.to_full_json(loading.CONTRIBUTORS)
+                                        for obj in list_of_objs], next_cursor)
+        return pages
+
+    @classmethod
+    def stream(cls, filters: tuple[tuple[str, object], ...] = ()) -> Iterator[dict[str, str | int]]:
+        """Return the objects matching the filters, fetched lazily in batches from a server-side cursor.
+
+        As for list(), a combination of filters that no index serves is rejected with ValueError,
+        before any row is fetched.
+        """
+        query = filtering.apply(cls.query, cls, FILTERS, filters).order_by(cls.star_id)
+        return (obj.to_partial_json() for obj in query.yield_per(constants.STREAM_BATCH_SIZE))
 
     def to_partial_json(self) -> dict[str, str | int]:
         """Return a partial JSON representation of this object."""
@@ -99,14 +235,24 @@ class Star(db.Model):
             "star_name": self.star_name
         }
 
-    def to_full_json(self) -> dict[str, str | int | dict[str, str | int]]:
-        """Return a full JSON representation of this object."""
-        obj = self.constellation_info
-        constellation = obj.to_partial_json() if obj else {}
-        obj = self.star_added_info
-        added_by = obj.to_partial_json() if obj else {}
-        obj = self.star_verified_info
-        verified_by = obj.to_partial_json() if obj else {}
+    def to_sky_json(self, distance: float) -> dict[str, str | int | float]:
+        """Return the partial JSON representation of this object with its position and distance."""
+        return {
+            **self.to_partial_json(),
+            "right_ascension": self.right_ascension,
+            "declination": self.declination,
+            "distance": round(distance, 6)
+        }
+
+    def to_full_json(self, expand: tuple[str, ...] = tuple(EXPANDABLE)
+                     ) -> dict[str, str | int | dict[str, str | int]]:
+        """Return a full JSON representation of this object, embedding the expanded relations."""
+        constellation = loading.related_json(self, "constellation_info", "constellation" in expand,
+                                             "constellation_id", self.constellation_id)
+        added_by = loading.related_json(self, "star_added_info", "added_by" in expand,
+                                        "user_id", self.added_by)
+        verified_by = loading.related_json(self, "star_verified_info", "verified_by" in expand,
+                                           "user_id", self.verified_by)
 
         return {
             **self.to_partial_json(),
@@ -119,3 +265,7 @@ class Star(db.Model):
             "added_by": added_by,
             "verified_by": verified_by
         }
+
+
+for statement in sky.INDEX_STATEMENTS:
+    event.listen(Star.__table__, "after_create", DDL(statement))
@@ -0,0 +1,127 @@
+"""This module maintains the summary tables the statistics are read from.
+
+``summary_counts`` holds, for every statistic, the number of rows of a table sharing each value of
+one of its columns, e.g. the number of stars of every constellation.  It is kept up to date by
+triggers on the counted tables, so every way of writing a row (the models, the bulk upserts and
+the cascades of the foreign keys) updates it in the same transaction, and reading a count never
+scans the counted table.  The loader drops the triggers and counts the loaded table afterwards.
+``rebuild()`` recomputes it with ``GROUP BY`` and ``check()`` compares it with that recomputation.
+"""
+from __future__ import annotations
+
+from sqlalchemy import DDL, Column, Integer, MetaData, String, Table, event, select, text
+from sqlalchemy.types import NullType
+
+from config import db
+
+
+# statistic -> (table, column): the rows of the table are counted by the value of the column
+STATISTICS = {
+    "stars_per_constellation": ("stars", "constellation_id"),
+    "stars_per_magnitude": ("stars", "apparent_magnitude"),
+    "stars_per_spectral_type": ("stars", "spectral_type"),
+    "constellations_per_galaxy": ("constellations", "galaxy_id"),
+    "stars_added_by_user": ("stars", "added_by"),
+    "stars_verified_by_user": ("stars", "verified_by"),
+    "constellations_added_by_user": ("constellations", "added_by"),
+    "constellations_verified_by_user": ("constellations", "verified_by"),
+    "galaxies_added_by_user": ("galaxies", "added_by"),
+    "galaxies_verified_by_user": ("galaxies", "verified_by")
+}
+# the statistics counting the contributions of a user
+USER_STATISTICS = tuple(name for name in STATISTICS if name.endswith("_by_user"))
+
+_INCREMENT = ("INSERT INTO summary_counts SELECT '{name}', {row}.{column}, 1 "
+              "WHERE {row}.{column} IS NOT NULL "
+              "ON CONFLICT (statistic, key) DO UPDATE SET count = count + 1; ")
+_DECREMENT = ("UPDATE summary_counts SET count = count - 1 "
+              "WHERE statistic = '{name}' AND key = {row}.{column}; "
+              "DELETE FROM summary_counts "
+              "WHERE statistic = '{name}' AND key = {row}.{column} AND count = 0; ")
+
+
+def _statements() -> tuple[str, ...]:
+    """Return the statements of assets/migrations/005_summary_counts.sql, without the backfill."""
+    # the key has no type, so that it keeps the type of the counted column
+    statements = [
+        "CREATE TABLE IF NOT EXISTS summary_counts ("
+        "statistic TEXT NOT NULL, key NOT NULL, count INTEGER NOT NULL, "
+        "PRIMARY KEY (statistic, key)) WITHOUT ROWID"
+    ]
+    for name, (table, column) in STATISTICS.items():
+        increment_new = _INCREMENT.format(name=name, row="NEW", column=column)
+        decrement_old = _DECREMENT.format(name=name, row="OLD", column=column)
+        statements += [
+            f"CREATE TRIGGER IF NOT EXISTS {name}_insert AFTER INSERT ON {table} "
+            f"BEGIN {increment_new}END",
+            f"CREATE TRIGGER IF NOT EXISTS {name}_update AFTER UPDATE OF {column} ON {table} "
+            f"WHEN OLD.{column} IS NOT NEW.{column} "
+            f"BEGIN {decrement_old}{increment_new}END",
+            f"CREATE TRIGGER IF NOT EXISTS {name}_delete AFTER DELETE ON {table} "
+            f"BEGIN {decrement_old}END"
+        ]
+    return tuple(statements)
+
+
+STATEMENTS = _statements()
+
+# declared apart from the models' metadata, which creates the table from STATEMENTS
+summary_counts = Table(
+    "summary_counts", MetaData(),
+    Column("statistic", String, primary_key=True),
+    Column("key", NullType, primary_key=True),
+    Column("count", Integer)
+)
+for _statement in STATEMENTS:
+    event.listen(db.metadata, "after_create", DDL(_statement))
+
+
+def counts(name: str) -> list[tuple[str | int, int]]:
+    """Return the (value, count) pairs of the statistic, sorted by value."""
+    if name not in STATISTICS:
+        raise ValueError(f"Unknown statistic '{name}'.")
+    statement = (select(summary_counts.c.key, summary_counts.c.count)
+                 .where(summary_counts.c.statistic == name)
+                 .order_by(summary_counts.c.key))
+    return [tuple(row) for row in db.session.execute(statement)]
+
+
+def contributions(user_id: int) -> dict[str, int]:
+    """Return the number of rows added and verified by the user, for every table."""
+    statement = (select(summary_counts.c.statistic, summary_counts.c.count)
+                 .where(summary_counts.c.statistic.in_(USER_STATISTICS),
+                        summary_counts.c.key == user_id))
+    found = dict(db.session.execute(statement).all())
+    return {name: found.get(name, 0) for name in USER_STATISTICS}
+
+
+def recount(name: str) -> str:
+    """Return the query counting the rows of the statistic from its table."""
+    table, column = STATISTICS[name]
+    return (f"SELECT '{name}', {column}, COUNT(*) FROM {table} "
+            f"WHERE {column} IS NOT NULL GROUP BY {column}")
+
+
+def rebuild() -> None:
+    """Recompute every statistic from the counted tables."""
+    with db.engine.begin() as connection:
+        connection.execute(text("DELETE FROM summary_counts"))
+        for name in STATISTICS:
+            connection.execute(text(f"INSERT INTO summary_counts {recount(name)}"))
+
+
+def check() -> list[str]:
+    """Return the differences between the summary table and a recomputation of every statistic."""
+    problems = []
+    with db.engine.connect() as connection:
+        for name in STATISTICS:
+            expected = {key: count for _, key, count in connection.execute(text(recount(name)))}
+            stored = dict(connection.execute(
+                select(summary_counts.c.key, summary_counts.c.count)
+                .where(summary_counts.c.statistic == name)
+            ).all())
+            for key in sorted(expected.keys() | stored.keys(), key=repr):
+                if expected.get(key, 0) != stored.get(key, 0):
+                    problems.append(f"{name}[{key!r}]: stored {stored.get(key, 0)}, "
+                                    f"counted {expected.get(key, 0)}")
+    return problems
@@ -0,0 +1,24 @@
+"""This module runs the write methods of the models in a transaction."""
+from __future__ import annotations
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from sqlalchemy.exc import IntegrityError
+
+from config import db
+
+
+@contextmanager
+def write() -> Iterator[None]:
+    """Commit the changes made in the block.
+
+    If a constraint is violated, whether while flushing or committing, the session is rolled
+    back and ValueError is raised.
+    """
+    try:
+        yield
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        raise ValueError(f"{e.orig}.") from e
@@ -1,23 +1,32 @@
 """This module defines the User model for the CRUD operations."""
 from __future__ import annotations
 
+from collections.abc import Iterator
+from datetime import datetime
 from typing_extensions import Self
 
 from config import db
+from deps import constants
+from models import bulk, cache, pagination, transactions, versions, writes
 
 
+# the columns of the partial JSON, embedded in the documents of other tables
+PARTIAL_COLUMNS = ("first_name", "last_name")
+
 
 class User(db.Model):
     """Model for User objects."""
     __tablename__ = "users"
 
     user_id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String)
+    username = db.Column(db.String, unique=True, index=True)
     email = db.Column(db.String)
     password = db.Column(db.String)
     first_name = db.Column(db.String)
-    last_name = db.Column(db.String)
+    last_name = db.Column(db.String, index=True)
     date_of_birth = db.Column(db.String)
+    version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    updated_at = db.Column(db.DateTime)
 
 
     def __init__(self, data: dict[str, str | int]) -> None:
@@ -43,10 +52,13 @@ class User(db.Model):
     def create(cls, data: dict[str, str | int]) -> None:
         """Insert a new object into the database."""
         obj = cls(data)
-        db.session.add(obj)
-        db.session.commit()
+        with transactions.write():
+            versions.stamp(obj)
+            db.session.add(obj)
+        cache.invalidate(cls.__tablename__)
 
     @classmethod
+    @cache.cached("users")
     def retrieve(cls, user_id: int) -> dict[str, str | int] | None:
         """Return a JSON representation of the object if found, otherwise return None."""
         obj = cls.search(user_id)
@@ -54,36 +66,59 @@ class User(db.Model):
             return None
         return obj.to_full_json()
 
+    @classmethod
+    def etag(cls, user_id: int) -> tuple[str, datetime | None] | None:
+        """Return the ETag and last modification time of the object if found, otherwise return None."""
+        return versions.row_etag(cls, user_id, {}, ())
+
+    @classmethod
+    def collection_etag(cls) -> str:
+        """Return the ETag of the list of objects, derived from the version of the table."""
+        return versions.collection_etag(cls.__tablename__)
+
     @classmethod
     def update(cls, user_id: int, data: dict[str, str | int]) -> bool:
-        """Update the object in the database."""
-        obj = cls.search(user_id)
-        if not obj:
-            return False
+        """Update the given fields of the object in the database and return whether it exists."""
+        return writes.update(cls, user_id, data, PARTIAL_COLUMNS)
 
-        data["user_id"] = user_id
-        for k, v in data.items():
-            setattr(obj, k, v)
-        db.session.add(obj)
-        db.session.commit()
-        return True
+    @classmethod
+    def rehash(cls, user_id: int, password: str) -> None:
+        """Replace the password hash of the object, e.g. after the bcrypt cost changed.
+
+        The password is not part of any representation, so neither the version nor the cache change.
+        """
+        with transactions.write():
+            cls.query.filter(cls.user_id == user_id).update({"password": password})
 
     @classmethod
     def delete(cls, user_id: int) -> bool:
-        """Delete the object from the database."""
-        obj = cls.search(user_id)
-        if not obj:
-            return False
+        """Delete the object from the database and return whether it existed."""
+        return writes.delete(cls, user_id)
 
-        db.session.delete(obj)
+    @classmethod
+    def bulk_upsert(cls, rows: list[tuple[int, dict[str, str | int]]]) -> bulk.Upserted:
+        """Insert or update the rows in a single transaction and return the errors of the failed rows."""
+        upserted = bulk.upsert(cls, rows)
         db.session.commit()
-        return True
+        cache.invalidate(cls.__tablename__)
+        return upserted
+
+    @classmethod
+    @cache.cached("users")
+    def list(cls, limit: int = constants.DEFAULT_PAGE_SIZE, cursor: str | None = None,
+             sort: str | None = None) -> tuple[list[dict[str, str | int]], str | None]:
+        """Return a page of objects present in the database and the cursor to the next page."""
+        list_of_objs, next_cursor = pagination.paginate(cls.query, cls, "user_id",
+                                                        constants.USER_SORT_KEYS,
+                                                        limit, cursor, sort)
+        return [obj.to_partial_json() for obj in list_of_objs], next_cursor
 
     @classmethod
-    def list(cls) -> list[dict[str, str | int]]:
-        """Return a list of objects present in the database."""
-        list_of_objs = cls.query.all()
-        return [obj.to_partial_json() for obj in list_of_objs]
+    def stream(cls) -> Iterator[dict[str, str | int]]:
+        """Yield every object present in the database, fetched in batches from a server-side cursor."""
+        query = cls.query.order_by(cls.user_id).yield_per(constants.STREAM_BATCH_SIZE)
+        for obj in query:
+            yield obj.to_partial_json()
 
     def to_partial_json(self) -> dict[str, str | int]:
         """Return a partial JSON representation of this object."""
@@ -0,0 +1,106 @@
+"""This module defines the TableVersion model and the helpers to compute ETags from row versions.
+
+Every table has a version counter in ``table_versions`` that is bumped by each write.  A created or
+updated row takes the new value as its ``version``, so the counter is also the table's max version
+and the ETag of a whole collection costs a single primary-key lookup.
+"""
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime, timezone
+
+from sqlalchemy import Select, bindparam, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import aliased
+from werkzeug.http import quote_etag
+
+from config import db
+
+
+# (model, expanded names) -> the SELECT of the versions of a document, built once
+_row_statements: dict[tuple[type, tuple[str, ...]], Select] = {}
+
+class TableVersion(db.Model):
+    """Model for the version counter of each table."""
+    __tablename__ = "table_versions"
+
+    table_name = db.Column(db.String, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+def bump(table: str) -> int:
+    """Increment the version of the table within the current transaction and return it."""
+    statement = insert(TableVersion).values(table_name=table, version=1)
+    statement = statement.on_conflict_do_update(
+        index_elements=[TableVersion.table_name],
+        set_={"version": TableVersion.version + 1}
+    ).returning(TableVersion.version)
+    return db.session.execute(statement).scalar_one()
+
+
+def now() -> datetime:
+    """Return the current UTC time as stored in the updated_at columns."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def stamp(obj: db.Model) -> None:
+    """Give a created object the next version of its table."""
+    obj.version = bump(obj.__tablename__)
+    obj.updated_at = now()
+
+
+def current(table: str) -> int:
+    """Return the current version of the table."""
+    version = db.session.get(TableVersion, table)
+    return version.version if version else 0
+
+
+def current_all() -> dict[str, int]:
+    """Return the current version of every table."""
+    return dict(db.session.query(TableVersion.table_name, TableVersion.version))
+
+
+def make_etag(*parts: object) -> str:
+    """Return a weak ETag derived from the given parts."""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return quote_etag(digest, weak=True)
+
+
+def collection_etag(*tables: str) -> str:
+    """Return the ETag of the collection stored in the tables, read with a single SELECT."""
+    found = dict(db.session.query(TableVersion.table_name, TableVersion.version)
+                 .filter(TableVersion.table_name.in_(tables)))
+    return make_etag(*(part for table in tables for part in (table, found.get(table, 0))))
+
+
+def _row_statement(model: type, expandable: dict[str, str], names: tuple[str, ...]) -> Select:
+    """Return the SELECT of the versions of a row and of its expanded related rows."""
+    statement = _row_statements.get((model, names))
+    if statement is None:
+        pk_column = model.__mapper__.primary_key[0]
+        columns = [model.version, model.updated_at]
+        statement = select(model).where(pk_column == bindparam("pk"))
+        for name in names:
+            relation = getattr(model, expandable[name])
+            target = aliased(relation.property.mapper.class_)
+            statement = statement.outerjoin(relation.of_type(target))
+            columns += [target.version, target.updated_at]
+        statement = _row_statements[(model, names)] = statement.with_only_columns(*columns)
+    return statement
+
+
+def row_etag(model: type, pk: int, expandable: dict[str, str],
+             names: tuple[str, ...]) -> tuple[str, datetime | None] | None:
+    """Return the ETag and the last modification time of a document, or None if not found.
+
+    The versions of the expanded related rows are read in the same statement, since renaming
+    one of them changes the document without changing the row's own version.  The statement of
+    each expansion is built once, so SQLAlchemy compiles it once too.
+    """
+    row = db.session.execute(_row_statement(model, expandable, names), {"pk": pk}).first()
+    if row is None:
+        return None
+
+    timestamps = [value for value in row[1::2] if value is not None]
+    last_modified = max(timestamps).replace(tzinfo=timezone.utc) if timestamps else None
+    return make_etag(model.__tablename__, pk, names, tuple(row[0::2])), last_modified
@@ -0,0 +1,55 @@
+"""This module updates and deletes single rows by primary key, each with a single statement.
+
+The number of rows matched tells whether the row exists, so no SELECT is needed beforehand.  The
+upsert bumping the version of the table is the only other statement of the write.
+"""
+from __future__ import annotations
+
+from collections.abc import Collection
+
+from sqlalchemy import delete as delete_statement
+from sqlalchemy import update as update_statement
+
+from config import db
+from models import cache, transactions, versions
+
+
+def update(model: type, pk: int, data: dict[str, str | int | None],
+           partial_columns: Collection[str]) -> bool:
+    """Set the given columns of the row and return whether it exists.
+
+    The row takes the next version of its table.  The documents embedding the row are invalidated
+    too if one of ``partial_columns``, the columns of its partial JSON, is set.
+    """
+    pk_column = model.__mapper__.primary_key[0]
+    values = {k: v for k, v in data.items() if k != pk_column.key}
+
+    with transactions.write():
+        partial = any(column in values for column in partial_columns)
+        values["version"] = versions.bump(model.__tablename__)
+        values["updated_at"] = versions.now()
+        statement = update_statement(model).where(pk_column == pk).values(values)
+        result = db.session.execute(statement, execution_options={"synchronize_session": False})
+        found = result.rowcount > 0
+        if not found:
+            db.session.rollback()
+
+    if found:
+        cache.invalidate(model.__tablename__, partial=partial)
+    return found
+
+
+def delete(model: type, pk: int) -> bool:
+    """Delete the row and return whether it existed."""
+    pk_column = model.__mapper__.primary_key[0]
+
+    with transactions.write():
+        statement = delete_statement(model).where(pk_column == pk)
+        result = db.session.execute(statement, execution_options={"synchronize_session": False})
+        found = result.rowcount > 0
+        if found:
+            versions.bump(model.__tablename__)
+
+    if found:
+        cache.invalidate(model.__tablename__)
+    return found
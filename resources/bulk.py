@@ -0,0 +1,33 @@
+"""This module reads and validates the bodies sent to the bulk endpoints."""
+from __future__ import annotations
+
+import json
+from http import HTTPStatus
+
+from flask import request
+from flask_restful import abort
+
+from deps import constants
+
+
+def read_rows() -> list[object]:
+    """Return the rows of the request body, sent either as a JSON array or as NDJSON."""
+    if request.mimetype == constants.NDJSON_MIMETYPE:
+        rows = []
+        for line in request.get_data(as_text=True).splitlines():
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                rows.append(None)
+    else:
+        rows = request.get_json(silent=True)
+        if not isinstance(rows, list):
+            abort(HTTPStatus.BAD_REQUEST, message="The body must be a JSON array or NDJSON.")
+
+    if len(rows) > constants.BULK_MAX_ROWS:
+        abort(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+              message=f"At most {constants.BULK_MAX_ROWS} rows can be sent at once.")
+    return rows
+
@@ -0,0 +1,28 @@
+"""This module defines the CacheStats(), TokenCacheStats() and CompressedCacheStats() resources to handle requests to /cache."""
+from flask_restful import Resource
+
+from controllers import cache
+
+
+class CacheStats(Resource):
+    """Resource to handle requests to view the counters of the read-through cache."""
+
+    def get(self) -> tuple[dict[str, str], int]:
+        """Handle GET method."""
+        return cache.handle_get()
+
+
+class TokenCacheStats(Resource):
+    """Resource to handle requests to view the counters of the verified token cache."""
+
+    def get(self) -> tuple[dict[str, str], int]:
+        """Handle GET method."""
+        return cache.handle_get_tokens()
+
+
+class CompressedCacheStats(Resource):
+    """Resource to handle requests to view the counters of the cache of compressed bodies."""
+
+    def get(self) -> tuple[dict[str, str], int]:
+        """Handle GET method."""
+        return cache.handle_get_compressed()
@@ -1,38 +1,76 @@
-"""This module defines the ConstellationRegisterOrList() and Constellation() resources to handle requests to /user."""
+"""This module defines the ConstellationRegisterOrList(), Constellation() and ConstellationStars() resources to handle requests to /user."""
 from __future__ import annotations
 
 from flask_jwt_extended import jwt_required
-from flask_restful import Resource, reqparse
+from flask_restful import Resource, inputs, reqparse
 
-from controllers import constellations
+from controllers import constellations, streaming
 from deps import constants
+from resources import bulk, schemas
+
+
+SCHEMA = schemas.Schema(
+    schemas.Argument("constellation_id", type=int),
+    schemas.Argument("constellation_name", type=str, required=True,
+                     help=constants.VALIDATE_NOT_NULL),
+    schemas.Argument("galaxy_id", type=int, required=True, help=constants.VALIDATE_NOT_NULL),
+    schemas.Argument("added_by", type=int, required=True, help=constants.VALIDATE_NOT_NULL),
+    schemas.Argument("verified_by", type=int)
+)
+LIST_SCHEMA = schemas.Schema(
+    schemas.Argument("limit", type=inputs.int_range(1, constants.MAX_PAGE_SIZE, argument="limit"),
+                     default=constants.DEFAULT_PAGE_SIZE),
+    schemas.Argument("next", type=str),
+    schemas.Argument("sort", type=str),
+    schemas.Argument("galaxy_id", type=int),
+    location="args"
+)
+STARS_SCHEMA = schemas.Schema(
+    schemas.Argument("limit", type=inputs.int_range(1, constants.MAX_PAGE_SIZE, argument="limit"),
+                     default=constants.DEFAULT_PAGE_SIZE),
+    schemas.Argument("next", type=str),
+    schemas.Argument("sort", type=str),
+    location="args"
+)
+GET_SCHEMA = schemas.Schema(
+    schemas.Argument("expand", type=str),
+    location="args"
+)
 
 
 def parse_request() -> reqparse.Namespace:
     """Parse the user's request."""
-    parser = reqparse.RequestParser(bundle_errors=True)
-    parser.add_argument("constellation_id",
-                        type=int
-                        )
-    parser.add_argument("constellation_name",
-                        type=str,
-                        required=True,
-                        help=constants.VALIDATE_NOT_NULL
-                        )
-    parser.add_argument("galaxy_id",
-                        type=int,
-                        required=True,
-                        help=constants.VALIDATE_NOT_NULL
-                        )
-    parser.add_argument("added_by",
-                        type=int,
-                        required=True,
-                        help=constants.VALIDATE_NOT_NULL
-                        )
-    parser.add_argument("verified_by",
-                        type=int
-                        )
-    return parser.parse_args()
+    return SCHEMA.parse()
+
+
+def parse_put_request() -> reqparse.Namespace:
+    """Parse the user's update request, leaving out the optional fields not sent."""
+    return SCHEMA.parse(defaults=False)
+
+
+def parse_patch_request() -> reqparse.Namespace:
+    """Parse the fields sent in the user's partial update request."""
+    return SCHEMA.parse(partial=True)
+
+
+def parse_list_request() -> reqparse.Namespace:
+    """Parse the user's request for a page of the list."""
+    return LIST_SCHEMA.parse()
+
+
+def parse_stars_request() -> reqparse.Namespace:
+    """Parse the user's request for a page of the stars of a constellation."""
+    return STARS_SCHEMA.parse()
+
+
+def parse_get_request() -> reqparse.Namespace:
+    """Parse the user's request for a single object."""
+    return GET_SCHEMA.parse()
+
+
+def parse_bulk_request() -> tuple[list[tuple[int, dict[str, str | int]]], list[dict[str, object]]]:
+    """Parse the rows of the user's bulk request, leaving out the optional fields not sent."""
+    return SCHEMA.validate_many(bulk.read_rows(), defaults=False)
 
 
 class ConstellationRegisterOrList(Resource):
@@ -46,7 +84,20 @@ class ConstellationRegisterOrList(Resource):
 
     def get(self) -> tuple[dict[str, str], int]:
         """Handle GET method."""
-        return constellations.handle_list()
+        data = parse_list_request()
+        if streaming.wants_ndjson():
+            return constellations.handle_stream(data)
+        return constellations.handle_list(data)
+
+
+class ConstellationBulk(Resource):
+    """Resource to handle requests to register or update many constellations at once."""
+
+    @jwt_required()
+    def post(self) -> tuple[dict[str, str], int]:
+        """Handle POST method."""
+        rows, errors = parse_bulk_request()
+        return constellations.handle_bulk(rows, errors)
 
 
 class Constellation(Resource):
@@ -54,15 +105,31 @@ class Constellation(Resource):
 
     def get(self, constellation_id: int) -> tuple[dict[str, str], int]:
         """Handle GET method."""
-        return constellations.handle_get(constellation_id)
+        data = parse_get_request()
+        return constellations.handle_get(constellation_id, data)
 
     @jwt_required()
     def put(self, constellation_id: int) -> tuple[dict[str, str], int]:
         """Handle PUT method."""
-        data = parse_request()
+        data = parse_put_request()
         return constellations.handle_put(constellation_id, data)
 
+    @jwt_required()
+    def patch(self, constellation_id: int) -> tuple[dict[str, str], int]:
+        """Handle PATCH method."""
+        data = parse_patch_request()
+        return constellations.handle_patch(constellation_id, data)
+
     @jwt_required()
     def delete(self, constellation_id: int) -> tuple[None, int]:
         """Handle DELETE method."""
         return constellations.handle_delete(constellation_id)
+
+
+class ConstellationStars(Resource):
+    """Resource to handle requests to view a constellation with a page of its stars."""
+
+    def get(self, constellation_id: int) -> tuple[dict[str, str], int]:
+        """Handle GET method."""
+        data = parse_stars_request()
+        return constellations.handle_stars(constellation_id, data)
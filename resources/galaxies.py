@@ -1,46 +1,97 @@
-"""This module defines the GalaxyRegisterOrList() and Galaxy() resources to handle requests to /user."""
+"""This module defines the GalaxyRegisterOrList(), Galaxy(), GalaxyConstellations() and GalaxyTree() resources to handle requests to /user."""
+from __future__ import annotations
+
 from flask_jwt_extended import jwt_required
-from flask_restful import Resource, reqparse
+from flask_restful import Resource, inputs, reqparse
 
-from controllers import galaxies
+from controllers import galaxies, streaming
 from deps import constants
+from resources import bulk, schemas
+
+
+SCHEMA = schemas.Schema(
+    schemas.Argument("galaxy_id", type=int),
+    schemas.Argument("galaxy_name", type=str, required=True, help=constants.VALIDATE_NOT_NULL),
+    schemas.Argument("galaxy_type", type=str),
+    schemas.Argument("distance_mly", type=int),
+    schemas.Argument("redshift", type=int),
+    schemas.Argument("mass_solar", type=int),
+    schemas.Argument("diameter_ly", type=int),
+    schemas.Argument("added_by", type=int, required=True, help=constants.VALIDATE_NOT_NULL),
+    schemas.Argument("verified_by", type=int)
+)
+LIST_SCHEMA = schemas.Schema(
+    schemas.Argument("limit", type=inputs.int_range(1, constants.MAX_PAGE_SIZE, argument="limit"),
+                     default=constants.DEFAULT_PAGE_SIZE),
+    schemas.Argument("next", type=str),
+    schemas.Argument("sort", type=str),
+    schemas.Argument("galaxy_type", type=str),
+    schemas.Argument("distance_mly_min", type=int),
+    schemas.Argument("distance_mly_max", type=int),
+    schemas.Argument("redshift_min", type=int),
+    schemas.Argument("redshift_max", type=int),
+    location="args"
+)
+CONSTELLATIONS_SCHEMA = schemas.Schema(
+    schemas.Argument("limit", type=inputs.int_range(1, constants.MAX_PAGE_SIZE, argument="limit"),
+                     default=constants.DEFAULT_PAGE_SIZE),
+    schemas.Argument("next", type=str),
+    schemas.Argument("sort", type=str),
+    location="args"
+)
+TREE_SCHEMA = schemas.Schema(
+    schemas.Argument("limit", type=inputs.int_range(1, constants.MAX_PAGE_SIZE, argument="limit"),
+                     default=constants.DEFAULT_PAGE_SIZE),
+    schemas.Argument("next", type=str),
+    schemas.Argument("star_limit",
+                     type=inputs.int_range(1, constants.MAX_PAGE_SIZE, argument="star_limit"),
+                     default=constants.TREE_STAR_LIMIT),
+    location="args"
+)
+GET_SCHEMA = schemas.Schema(
+    schemas.Argument("expand", type=str),
+    location="args"
+)
 
 
 def parse_request() -> reqparse.Namespace:
     """Parse the user's request."""
-    parser = reqparse.RequestParser(bundle_errors=True)
-    parser.add_argument("galaxy_id",
-                        type=int
-                        )
-    parser.add_argument("galaxy_name",
-                        type=str,
-                        required=True,
-                        help=constants.VALIDATE_NOT_NULL
-                        )
-    parser.add_argument("galaxy_type",
-                        type=str
-                        )
-    parser.add_argument("distance_mly",
-                        type=int
-                        )
-    parser.add_argument("redshift",
-                        type=int
-                        )
-    parser.add_argument("mass_solar",
-                        type=int
-                        )
-    parser.add_argument("diameter_ly",
-                        type=int
-                        )
-    parser.add_argument("added_by",
-                        type=int,
-                        required=True,
-                        help=constants.VALIDATE_NOT_NULL
-                        )
-    parser.add_argument("verified_by",
-                        type=int
-                        )
-    return parser.parse_args()
+    return SCHEMA.parse()
+
+
+def parse_put_request() -> reqparse.Namespace:
+    """Parse the user's update request, leaving out the optional fields not sent."""
+    return SCHEMA.parse(defaults=False)
+
+
+def parse_patch_request() -> reqparse.Namespace:
+    """Parse the fields sent in the user's partial update request."""
+    return SCHEMA.parse(partial=True)
+
+
+def parse_list_request() -> reqparse.Namespace:
+    """Parse the user's request for a page of the list."""
+    return LIST_SCHEMA.parse()
+
+
+def parse_constellations_request() -> reqparse.Namespace:
+    """Parse the user's request for a page of the constellations of a galaxy."""
+    return CONSTELLATIONS_SCHEMA.parse()
+
+
+def parse_tree_request() -> reqparse.Namespace:
+    """Parse the user's request for a page of the tree of a galaxy."""
+    return TREE_SCHEMA.parse()
+
+
+def parse_get_request() -> reqparse.Namespace:
+    """Parse the user's request for a single object."""
+    return GET_SCHEMA.parse()
+
+
+def parse_bulk_request() -> tuple[list[tuple[int, dict[str, str | int]]], list[dict[str, object]]]:
+    """Parse the rows of the user's bulk request, leaving out the optional fields not sent."""
+    return SCHEMA.validate_many(bulk.read_rows(), defaults=False)
 
 
 class GalaxyRegisterOrList(Resource):
@@ -54,7 +105,20 @@ class GalaxyRegisterOrList(Resource):
 
     def get(self) -> tuple[dict[str, str], int]:
         """Handle GET method."""
-        return galaxies.handle_list()
+        data = parse_list_request()
+        if streaming.wants_ndjson():
+            return galaxies.handle_stream(data)
+        return galaxies.handle_list(data)
+
+
+class GalaxyBulk(Resource):
+    """Resource to handle requests to register or update many galaxies at once."""
+
+    @jwt_required()
+    def post(self) -> tuple[dict[str, str], int]:
+        """Handle POST method."""
+        rows, errors = parse_bulk_request()
+        return galaxies.handle_bulk(rows, errors)
 
 
 class Galaxy(Resource):
@@ -62,15 +126,40 @@ class Galaxy(Resource):
 
     def get(self, galaxy_id: int) -> tuple[dict[str, str], int]:
         """Handle GET method."""
-        return galaxies.handle_get(galaxy_id)
+        data = parse_get_request()
+        return galaxies.handle_get(galaxy_id, data)
 
     @jwt_required()
     def put(self, galaxy_id: int) -> tuple[dict[str, str], int]:
         """Handle PUT method."""
-        data = parse_request()
+        data = parse_put_request()
         return galaxies.handle_put(galaxy_id, data)
 
+    @jwt_required()
+    def patch(self, galaxy_id: int) -> tuple[dict[str, str], int]:
+        """Handle PATCH method."""
+        data = parse_patch_request()
+        return galaxies.handle_patch(galaxy_id, data)
+
     @jwt_required()
     def delete(self, galaxy_id: int) -> tuple[None, int]:
         """Handle DELETE method."""
         return galaxies.handle_delete(galaxy_id)
+
+
+class GalaxyConstellations(Resource):
+    """Resource to handle requests to view a galaxy with a page of its constellations."""
+
+    def get(self, galaxy_id: int) -> tuple[dict[str, str], int]:
+        """Handle GET method."""
+        data = parse_constellations_request()
+        return galaxies.handle_constellations(galaxy_id, data)
+
+
+class GalaxyTree(Resource):
+    """Resource to handle requests to view a galaxy with its constellations and their stars."""
+
+    def get(self, galaxy_id: int) -> tuple[dict[str, str], int]:
+        """Handle GET method."""
+        data = parse_tree_request()
+        return galaxies.handle_tree(galaxy_id, data)
@@ -0,0 +1,13 @@
+"""This module defines the Metrics() resource to handle requests to /metrics."""
+from flask import Response
+from flask_restful import Resource
+
+from controllers import metrics
+
+
+class Metrics(Resource):
+    """Resource to handle requests to scrape the metrics of the application."""
+
+    def get(self) -> Response:
+        """Handle GET method."""
+        return metrics.handle_get()
@@ -0,0 +1,136 @@
+"""This module defines the schemas validating the user's requests, compiled once at import.
+
+A schema accepts the same arguments as a ``reqparse.RequestParser(bundle_errors=True)`` and
+reports its errors in the same format, without building a parser on every request.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable, Mapping
+from http import HTTPStatus
+from typing import Any, NamedTuple
+
+from flask import request
+from flask_restful import abort, reqparse
+
+from controllers import instrumentation
+
+
+_FRIENDLY_LOCATIONS = {
+    "json": "the JSON body",
+    "values": "the post body or the query string",
+    "args": "the query string"
+}
+
+
+class Argument(NamedTuple):
+    """An argument of a schema, named after the parameters of ``RequestParser.add_argument``."""
+    name: str
+    type: Callable[[Any], Any] = str
+    required: bool = False
+    help: str | None = None
+    default: Any = None
+
+
+class Schema:
+    """Validates the body or the query string of a request against a fixed list of arguments.
+
+    ``location`` is either ``("json", "values")``, the default of reqparse, where an argument
+    missing from the JSON body is looked up in the form and the query string, or ``"args"``.
+    """
+
+    def __init__(self, *arguments: Argument, location: tuple[str, ...] | str = ("json", "values")
+                 ) -> None:
+        self.arguments = arguments
+        self.location = location
+        locations = (location,) if isinstance(location, str) else location
+        self._fields = tuple(self._compile(argument, locations) for argument in arguments)
+        self._bulk_fields = tuple(self._compile(argument, ("json",)) for argument in arguments)
+
+    @staticmethod
+    def _compile(argument: Argument, locations: tuple[str, ...]) -> tuple:
+        """Return the name, converter, default and precomputed messages of the argument."""
+        def message(error: str) -> str:
+            return argument.help.format(error_msg=error) if argument.help else error
+
+        friendly = " or ".join(_FRIENDLY_LOCATIONS[location] for location in locations)
+        missing = None
+        if argument.required:
+            missing = message(f"Missing required parameter in {friendly}")
+        return argument.name, argument.type, argument.default, missing, message
+
+    def _sources(self) -> tuple[Mapping[str, Any], ...]:
+        """Return the parts of the current request the arguments are looked up in, in order."""
+        if self.location == "args":
+            return (request.args,)
+        # like reqparse, this answers 415 or 400 if the body is not JSON
+        body = request.json
+        return (body if isinstance(body, dict) else {}, request.values)
+
+    @staticmethod
+    def _validate(fields: tuple, sources: tuple[Mapping[str, Any], ...], partial: bool = False,
+                  defaults: bool = True) -> tuple[dict[str, Any], dict[str, str]]:
+        """Return the converted values of the fields and the errors of the invalid ones.
+
+        With ``partial``, the missing fields are left out instead of being required or defaulted;
+        without ``defaults``, the missing optional fields are left out, the required ones are not.
+        """
+        data, errors = {}, {}
+        for name, convert, default, missing, message in fields:
+            for source in sources:
+                if name in source:
+                    value = source[name]
+                    break
+            else:
+                if partial:
+                    continue
+                if missing:
+                    errors[name] = missing
+                elif not defaults:
+                    continue
+                data[name] = default
+                continue
+
+            if value is None:
+                data[name] = None
+                continue
+            try:
+                data[name] = convert(value)
+            # reqparse reports any exception raised by the type as a validation error
+            except Exception as e:
+                errors[name] = message(str(e))
+        return data, errors
+
+    @instrumentation.timed("parse")
+    def parse(self, partial: bool = False, defaults: bool = True) -> reqparse.Namespace:
+        """Return the arguments of the current request, or abort with 400 and every error.
+
+        With ``partial``, only the arguments present in the request are returned, as for PATCH.
+        Without ``defaults``, the required arguments must still be present but the optional ones
+        missing from the request are left out rather than defaulted, as for PUT.
+        """
+        data, errors = self._validate(self._fields, self._sources(), partial, defaults)
+        if errors:
+            abort(HTTPStatus.BAD_REQUEST, message=errors)
+        return reqparse.Namespace(data)
+
+    @instrumentation.timed("parse")
+    def validate_many(self, rows: list[object], defaults: bool = True
+                      ) -> tuple[list[tuple[int, dict[str, Any]]], list[dict[str, object]]]:
+        """Validate every row as the JSON body of a request.
+
+        Return the valid rows paired with their index, and the errors of the other rows, in the
+        same format as ``parse()``.  Without ``defaults``, the optional fields missing from a row
+        are left out of it, as for PUT.
+        """
+        valid, errors = [], []
+        for index, row in enumerate(rows):
+            if not isinstance(row, dict):
+                errors.append({"index": index, "message": "Each row must be a JSON object."})
+                continue
+
+            data, row_errors = self._validate(self._bulk_fields, (row,), defaults=defaults)
+            if row_errors:
+                errors.append({"index": index, "message": row_errors})
+            else:
+                valid.append((index, data))
+        return valid, errors
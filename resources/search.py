@@ -0,0 +1,32 @@
+"""This module defines the Search() resource to handle requests to /search."""
+from __future__ import annotations
+
+from flask_restful import Resource, inputs, reqparse
+
+from controllers import search
+from deps import constants
+from resources import schemas
+
+
+SEARCH_SCHEMA = schemas.Schema(
+    schemas.Argument("q", type=str, required=True, help=constants.VALIDATE_NOT_NULL),
+    schemas.Argument("limit", type=inputs.int_range(1, constants.MAX_PAGE_SIZE, argument="limit"),
+                     default=constants.DEFAULT_PAGE_SIZE),
+    schemas.Argument("next", type=str),
+    schemas.Argument("type", type=str),
+    location="args"
+)
+
+
+def parse_search_request() -> reqparse.Namespace:
+    """Parse the user's search request."""
+    return SEARCH_SCHEMA.parse()
+
+
+class Search(Resource):
+    """Resource to handle requests to search the stars, constellations, galaxies and users by name."""
+
+    def get(self) -> tuple[dict[str, str], int]:
+        """Handle GET method."""
+        data = parse_search_request()
+        return search.handle_get(data)
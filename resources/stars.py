@@ -1,51 +1,88 @@
-"""This module defines the StarRegisterOrList() and Star() resources to handle requests to /user."""
+"""This module defines the StarRegisterOrList(), StarNear() and Star() resources to handle requests to /user."""
+from __future__ import annotations
+
 from flask_jwt_extended import jwt_required
-from flask_restful import Resource, reqparse
+from flask_restful import Resource, inputs, reqparse
 
-from controllers import stars
+from controllers import stars, streaming
 from deps import constants
+from resources import bulk, schemas
+
+
+SCHEMA = schemas.Schema(
+    schemas.Argument("star_id", type=int),
+    schemas.Argument("star_name", type=str, required=True, help=constants.VALIDATE_NOT_NULL),
+    schemas.Argument("star_type", type=str),
+    schemas.Argument("constellation_id", type=int, required=True, help=constants.VALIDATE_NOT_NULL),
+    schemas.Argument("right_ascension", type=int),
+    schemas.Argument("declination", type=int),
+    schemas.Argument("apparent_magnitude", type=int),
+    schemas.Argument("spectral_type", type=str),
+    schemas.Argument("added_by", type=int, required=True, help=constants.VALIDATE_NOT_NULL),
+    schemas.Argument("verified_by", type=int)
+)
+LIST_SCHEMA = schemas.Schema(
+    schemas.Argument("limit", type=inputs.int_range(1, constants.MAX_PAGE_SIZE, argument="limit"),
+                     default=constants.DEFAULT_PAGE_SIZE),
+    schemas.Argument("next", type=str),
+    schemas.Argument("sort", type=str),
+    schemas.Argument("constellation_id", type=int),
+    schemas.Argument("spectral_type", type=str),
+    schemas.Argument("star_type", type=str),
+    schemas.Argument("apparent_magnitude_min", type=int),
+    schemas.Argument("apparent_magnitude_max", type=int),
+    schemas.Argument("added_by", type=int),
+    schemas.Argument("verified", type=inputs.boolean),
+    location="args"
+)
+NEAR_SCHEMA = schemas.Schema(
+    schemas.Argument("ra", type=float, required=True, help=constants.VALIDATE_NOT_NULL),
+    schemas.Argument("dec", type=float, required=True, help=constants.VALIDATE_NOT_NULL),
+    schemas.Argument("radius", type=float),
+    schemas.Argument("limit", type=inputs.int_range(1, constants.MAX_PAGE_SIZE, argument="limit"),
+                     default=constants.DEFAULT_PAGE_SIZE),
+    schemas.Argument("k", type=inputs.int_range(1, constants.MAX_PAGE_SIZE, argument="k")),
+    location="args"
+)
+GET_SCHEMA = schemas.Schema(
+    schemas.Argument("expand", type=str),
+    location="args"
+)
 
 
 def parse_request() -> reqparse.Namespace:
     """Parse the user's request."""
-    parser = reqparse.RequestParser(bundle_errors=True)
-    parser.add_argument("star_id",
-                        type=int
-                        )
-    parser.add_argument("star_name",
-                        type=str,
-                        required=True,
-                        help=constants.VALIDATE_NOT_NULL
-                        )
-    parser.add_argument("star_type",
-                        type=str
-                        )
-    parser.add_argument("constellation_id",
-                        type=int,
-                        required=True,
-                        help=constants.VALIDATE_NOT_NULL
-                        )
-    parser.add_argument("right_ascension",
-                        type=int
-                        )
-    parser.add_argument("declination",
-                        type=int
-                        )
-    parser.add_argument("apparent_magnitude",
-                        type=int
-                        )
-    parser.add_argument("spectral_type",
-                        type=str
-                        )
-    parser.add_argument("added_by",
-                        type=int,
-                        required=True,
-                        help=constants.VALIDATE_NOT_NULL
-                        )
-    parser.add_argument("verified_by",
-                        type=int
-                        )
-    return parser.parse_args()
+    return SCHEMA.parse()
+
+
+def parse_put_request() -> reqparse.Namespace:
+    """Parse the user's update request, leaving out the optional fields not sent."""
+    return SCHEMA.parse(defaults=False)
+
+
+def parse_patch_request() -> reqparse.Namespace:
+    """Parse the fields sent in the user's partial update request."""
+    return SCHEMA.parse(partial=True)
+
+
+def parse_list_request() -> reqparse.Namespace:
+    """Parse the user's request for a page of the list."""
+    return LIST_SCHEMA.parse()
+
+
+def parse_near_request() -> reqparse.Namespace:
+    """Parse the user's request for the stars near a position."""
+    return NEAR_SCHEMA.parse()
+
+
+def parse_get_request() -> reqparse.Namespace:
+    """Parse the user's request for a single object."""
+    return GET_SCHEMA.parse()
+
+
+def parse_bulk_request() -> tuple[list[tuple[int, dict[str, str | int]]], list[dict[str, object]]]:
+    """Parse the rows of the user's bulk request, leaving out the optional fields not sent."""
+    return SCHEMA.validate_many(bulk.read_rows(), defaults=False)
 
 
 class StarRegisterOrList(Resource):
@@ -59,7 +96,29 @@ class StarRegisterOrList(Resource):
 
     def get(self) -> tuple[dict[str, str], int]:
         """Handle GET method."""
-        return stars.handle_list()
+        data = parse_list_request()
+        if streaming.wants_ndjson():
+            return stars.handle_stream(data)
+        return stars.handle_list(data)
+
+
+class StarNear(Resource):
+    """Resource to handle requests to find the stars near a position on the sky."""
+
+    def get(self) -> tuple[dict[str, str], int]:
+        """Handle GET method."""
+        data = parse_near_request()
+        return stars.handle_near(data)
+
+
+class StarBulk(Resource):
+    """Resource to handle requests to register or update many stars at once."""
+
+    @jwt_required()
+    def post(self) -> tuple[dict[str, str], int]:
+        """Handle POST method."""
+        rows, errors = parse_bulk_request()
+        return stars.handle_bulk(rows, errors)
 
 
 class Star(Resource):
@@ -67,14 +126,21 @@ class Star(Resource):
 
     def get(self, star_id: int) -> tuple[dict[str, str], int]:
         """Handle GET method."""
-        return stars.handle_get(star_id)
+        data = parse_get_request()
+        return stars.handle_get(star_id, data)
 
     @jwt_required()
     def put(self, star_id: int) -> tuple[dict[str, str], int]:
         """Handle PUT method."""
-        data = parse_request()
+        data = parse_put_request()
         return stars.handle_put(star_id, data)
 
+    @jwt_required()
+    def patch(self, star_id: int) -> tuple[dict[str, str], int]:
+        """Handle PATCH method."""
+        data = parse_patch_request()
+        return stars.handle_patch(star_id, data)
+
     @jwt_required()
     def delete(self, star_id: int) -> tuple[None, int]:
         """Handle DELETE method."""
@@ -0,0 +1,28 @@
+"""This module defines the StatsList(), Stats() and UserStats() resources to handle requests to /stats."""
+from flask_restful import Resource
+
+from controllers import stats
+
+
+class StatsList(Resource):
+    """Resource to handle requests to list the statistics."""
+
+    def get(self) -> tuple[dict[str, str], int]:
+        """Handle GET method."""
+        return stats.handle_list()
+
+
+class Stats(Resource):
+    """Resource to handle requests to view a statistic, read from the summary tables."""
+
+    def get(self, name: str) -> tuple[dict[str, str], int]:
+        """Handle GET method."""
+        return stats.handle_get(name)
+
+
+class UserStats(Resource):
+    """Resource to handle requests to view the contributions of a user."""
+
+    def get(self, user_id: int) -> tuple[dict[str, str], int]:
+        """Handle GET method."""
+        return stats.handle_get_user(user_id)
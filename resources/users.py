@@ -1,48 +1,59 @@
 """This module defines the UserRegister(), User(), and UserLogin() resources to handle requests to /user."""
-from flask_restful import Resource, reqparse
+from __future__ import annotations
+
+from flask_restful import Resource, inputs, reqparse
 from flask_jwt_extended import jwt_required
 
-from controllers import users
+from controllers import users, streaming
 from deps import constants
+from resources import bulk, schemas
+
+
+SCHEMA = schemas.Schema(
+    schemas.Argument("username", type=str, required=True, help=constants.VALIDATE_NOT_NULL),
+    schemas.Argument("password", type=str, required=True, help=constants.VALIDATE_NOT_NULL),
+    schemas.Argument("user_id", type=int),
+    schemas.Argument("email", type=str, required=True, help=constants.VALIDATE_NOT_NULL),
+    schemas.Argument("first_name", type=str, required=True, help=constants.VALIDATE_NOT_NULL),
+    schemas.Argument("last_name", type=str, required=True, help=constants.VALIDATE_NOT_NULL),
+    schemas.Argument("date_of_birth", type=str)
+)
+LOGIN_SCHEMA = schemas.Schema(
+    schemas.Argument("username", type=str, required=True, help=constants.VALIDATE_NOT_NULL),
+    schemas.Argument("password", type=str, required=True, help=constants.VALIDATE_NOT_NULL)
+)
+LIST_SCHEMA = schemas.Schema(
+    schemas.Argument("limit", type=inputs.int_range(1, constants.MAX_PAGE_SIZE, argument="limit"),
+                     default=constants.DEFAULT_PAGE_SIZE),
+    schemas.Argument("next", type=str),
+    schemas.Argument("sort", type=str),
+    location="args"
+)
 
 
 def parse_request(for_login: bool =False) -> reqparse.Namespace:
     """Parse the user's request."""
-    parser = reqparse.RequestParser(bundle_errors=True)
-    parser.add_argument("username",
-                        type=str,
-                        required=True,
-                        help=constants.VALIDATE_NOT_NULL
-                        )
-    parser.add_argument("password",
-                        type=str,
-                        required=True,
-                        help=constants.VALIDATE_NOT_NULL
-                        )
-    if not for_login:
-        parser.add_argument("user_id",
-                            type=int
-                            )
-        parser.add_argument("email",
-                            type=str,
-                            required=True,
-                            help=constants.VALIDATE_NOT_NULL
-                            )
-        parser.add_argument("first_name",
-                            type=str,
-                            required=True,
-                            help=constants.VALIDATE_NOT_NULL
-                            )
-        parser.add_argument("last_name",
-                            type=str,
-                            required=True,
-                            help=constants.VALIDATE_NOT_NULL
-                            )
-        parser.add_argument("date_of_birth",
-                            type=str
-                            )
-
-    return parser.parse_args()
+    return (LOGIN_SCHEMA if for_login else SCHEMA).parse()
+
+
+def parse_put_request() -> reqparse.Namespace:
+    """Parse the user's update request, leaving out the optional fields not sent."""
+    return SCHEMA.parse(defaults=False)
+
+
+def parse_patch_request() -> reqparse.Namespace:
+    """Parse the fields sent in the user's partial update request."""
+    return SCHEMA.parse(partial=True)
+
+
+def parse_list_request() -> reqparse.Namespace:
+    """Parse the user's request for a page of the list."""
+    return LIST_SCHEMA.parse()
+
+
+def parse_bulk_request() -> tuple[list[tuple[int, dict[str, str | int]]], list[dict[str, object]]]:
+    """Parse the rows of the user's bulk request, leaving out the optional fields not sent."""
+    return SCHEMA.validate_many(bulk.read_rows(), defaults=False)
 
 
 class UserRegisterOrList(Resource):
@@ -57,7 +68,20 @@ class UserRegisterOrList(Resource):
     @jwt_required()
     def get(self) -> tuple[dict[str, str], int]:
         """Handle GET method."""
-        return users.handle_list()
+        if streaming.wants_ndjson():
+            return users.handle_stream()
+        data = parse_list_request()
+        return users.handle_list(data)
+
+
+class UserBulk(Resource):
+    """Resource to handle requests to register or update many users at once."""
+
+    @jwt_required()
+    def post(self) -> tuple[dict[str, str], int]:
+        """Handle POST method."""
+        rows, errors = parse_bulk_request()
+        return users.handle_bulk(rows, errors)
 
 
 class User(Resource):
@@ -71,14 +95,21 @@ class User(Resource):
     @jwt_required()
     def put(self, user_id: int) -> tuple[dict[str, str], int]:
         """Handle PUT method."""
-        data = parse_request()
+        data = parse_put_request()
         return users.handle_put(user_id, data)
 
+    @jwt_required()
+    def patch(self, user_id: int) -> tuple[dict[str, str], int]:
+        """Handle PATCH method."""
+        data = parse_patch_request()
+        return users.handle_patch(user_id, data)
+
     @jwt_required()
     def delete(self, user_id: int) -> tuple[None, int]:
         """Handle DELETE method."""
         return users.handle_delete(user_id)
 
+
 class UserLogin(Resource):
     """Resource to handle log in requests."""
 
@@ -0,0 +1,29 @@
+"""Tests of the SQL statements each resource method runs, see benchmarks/query_counts.py."""
+from __future__ import annotations
+
+import os
+from collections.abc import Iterator
+from unittest import mock
+
+import pytest
+
+from benchmarks import query_counts
+
+
+@pytest.fixture(scope="module")
+def checked(tmp_path_factory: pytest.TempPathFactory
+            ) -> Iterator[tuple[dict[str, list[int]], list[str]]]:
+    """Return the statement counts by route and the problems found, every route requested once."""
+    with mock.patch.dict(os.environ):
+        username = query_counts.prepare(tmp_path_factory.mktemp("query_counts"))
+        yield query_counts.check(username)
+
+    from controllers import hashing
+    hashing.shutdown()
+
+
+def test_statement_counts(checked: tuple[dict[str, list[int]], list[str]]) -> None:
+    """Every request runs the statements it expects, within the budget of its route."""
+    counts, problems = checked
+    assert counts
+    assert not problems, "\n".join(problems)
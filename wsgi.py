@@ -0,0 +1,5 @@
+"""The WSGI entrypoint of the application, served by gunicorn with ``gunicorn -c gunicorn.conf.py``."""
+from app import create_app
+
+
+application = create_app(multiprocess=True)